@@ -1,6 +1,28 @@
-"""Celery application configuration"""
+"""
+Celery application configuration.
+
+Work is split across three queues so user-triggered tasks never wait
+behind the nightly sweep:
+    interactive  - manual project checks and keyword refreshes
+    batch        - nightly rank-check batches and standard-queue posts
+    maintenance  - the scheduler tick, tasks_ready polling, partition upkeep
+                   and raw archive pruning
+Run one worker per queue with its configured concurrency:
+    python -m app.celery_app interactive|batch|maintenance
+or a single worker for all queues (interactive first):
+    python -m app.celery_app
+"""
+import sys
+from typing import List, Optional
+
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
+from kombu import Exchange, Queue
+from app.core.async_runtime import start_async_runtime, stop_async_runtime
 from app.core.config import settings
+from app.core.http import reset_http_clients
+from app.core.redis import reset_async_redis
 
 # Create Celery instance
 celery_app = Celery(
@@ -10,6 +32,7 @@ celery_app = Celery(
     include=[
         "app.tasks.rank_tracking",
         "app.tasks.keyword_research",
+        "app.tasks.maintenance",
     ]
 )
 
@@ -25,10 +48,95 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
 )
 
+# Queues, in the order a worker consuming several of them should drain them
+INTERACTIVE_QUEUE = "interactive"
+BATCH_QUEUE = "batch"
+MAINTENANCE_QUEUE = "maintenance"
+QUEUE_CONCURRENCY = {
+    INTERACTIVE_QUEUE: settings.CELERY_INTERACTIVE_CONCURRENCY,
+    BATCH_QUEUE: settings.CELERY_BATCH_CONCURRENCY,
+    MAINTENANCE_QUEUE: settings.CELERY_MAINTENANCE_CONCURRENCY,
+}
+
+celery_app.conf.update(
+    # Each queue gets its own exchange and routing key; queues sharing the default
+    # binding would each receive a copy of every task
+    task_queues=[Queue(name, Exchange(name), routing_key=name) for name in QUEUE_CONCURRENCY],
+    task_default_queue=BATCH_QUEUE,
+    task_default_exchange=BATCH_QUEUE,
+    task_default_routing_key=BATCH_QUEUE,
+    task_routes={
+        "app.tasks.rank_tracking.check_keyword_rank": {"queue": INTERACTIVE_QUEUE},
+        "app.tasks.rank_tracking.check_project_ranks": {"queue": INTERACTIVE_QUEUE},
+        "app.tasks.keyword_research.refresh_project_keywords": {"queue": INTERACTIVE_QUEUE},
+        "app.tasks.rank_tracking.check_keyword_ranks_batch": {"queue": BATCH_QUEUE},
+        "app.tasks.rank_tracking.post_rank_check_tasks": {"queue": BATCH_QUEUE},
+        "app.tasks.rank_tracking.daily_rank_check_job": {"queue": BATCH_QUEUE},
+        "app.tasks.rank_tracking.schedule_rank_checks": {"queue": MAINTENANCE_QUEUE},
+        "app.tasks.rank_tracking.poll_serp_tasks_ready": {"queue": MAINTENANCE_QUEUE},
+        "app.tasks.maintenance.maintain_partitions": {"queue": MAINTENANCE_QUEUE},
+        "app.tasks.maintenance.prune_raw_archive": {"queue": MAINTENANCE_QUEUE},
+    },
+    # Workers listening on several queues check them in the order given to -Q
+    broker_transport_options={"queue_order_strategy": "priority"},
+    # Take one task per free process, so a batch worker never sits on a backlog
+    worker_prefetch_multiplier=1,
+)
+
 # Celery Beat schedule for periodic tasks
 celery_app.conf.beat_schedule = {
-    "daily-rank-checks": {
-        "task": "app.tasks.rank_tracking.daily_rank_check_job",
-        "schedule": 3600.0 * 24,  # Every 24 hours
+    "rank-check-scheduler": {
+        "task": "app.tasks.rank_tracking.schedule_rank_checks",
+        # Each tick enqueues the nightly checks that fall inside it
+        "schedule": crontab(minute=f"*/{settings.RANK_CHECK_TICK_MINUTES}"),
+    },
+    "poll-serp-tasks-ready": {
+        "task": "app.tasks.rank_tracking.poll_serp_tasks_ready",
+        "schedule": settings.SERP_TASKS_POLL_INTERVAL,
+    },
+    "maintain-partitions": {
+        "task": "app.tasks.maintenance.maintain_partitions",
+        # Before the nightly check window opens
+        "schedule": crontab(hour=0, minute=30),
+    },
+    "prune-raw-archive": {
+        "task": "app.tasks.maintenance.prune_raw_archive",
+        "schedule": crontab(hour=1, minute=0),
     },
 }
+
+
+@worker_process_init.connect
+def init_worker_http_clients(**kwargs):
+    """
+    Give each forked worker process its own provider connection pools and a
+    long-lived event loop, so pools survive from one task to the next.
+    """
+    reset_http_clients()
+    reset_async_redis()
+    start_async_runtime()
+
+
+@worker_process_shutdown.connect
+def close_worker_http_clients(**kwargs):
+    """Close provider connection pools and stop the worker loop when a process exits"""
+    stop_async_runtime()
+    reset_http_clients()
+    reset_async_redis()
+
+
+def worker_argv(queue: Optional[str] = None) -> List[str]:
+    """Worker arguments for one queue (with its concurrency) or for all queues"""
+    if queue is None:
+        return ["worker", "--loglevel=info", "-Q", ",".join(QUEUE_CONCURRENCY)]
+    if queue not in QUEUE_CONCURRENCY:
+        raise SystemExit(f"Unknown queue {queue!r}; expected one of {list(QUEUE_CONCURRENCY)}")
+    return [
+        "worker", "--loglevel=info", "-Q", queue,
+        "-c", str(QUEUE_CONCURRENCY[queue]),
+        "-n", f"{queue}@%h",
+    ]
+
+
+if __name__ == "__main__":
+    celery_app.worker_main(worker_argv(sys.argv[1] if len(sys.argv) > 1 else None))
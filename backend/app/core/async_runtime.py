@@ -0,0 +1,110 @@
+"""
+Long-lived event loop for Celery worker processes.
+The loop runs in a daemon thread started from worker_process_init, so
+provider HTTP pools, the async Redis client and singleflight state stay
+alive across tasks instead of being rebuilt by asyncio.run() every time.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+from app.core.http import close_http_clients
+from app.core.redis import close_async_redis
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def start_async_runtime() -> asyncio.AbstractEventLoop:
+    """Start the process-wide loop thread (no-op if already running)"""
+    global _loop, _thread
+    with _lock:
+        if _loop is not None and _thread is not None and _thread.is_alive():
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="async-runtime", daemon=True)
+        thread.start()
+        ready.wait()
+        _loop, _thread = loop, thread
+        return loop
+
+
+def async_runtime_running() -> bool:
+    return _loop is not None and _loop.is_running()
+
+
+def run_in_runtime(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the worker loop and block until it finishes.
+    Safe to call from any thread except the loop thread itself. If the
+    caller is interrupted (e.g. a Celery soft time limit), the coroutine
+    is cancelled.
+    """
+    if not async_runtime_running():
+        raise RuntimeError("Async runtime is not running; call start_async_runtime() first")
+    if threading.current_thread() is _thread:
+        raise RuntimeError("run_in_runtime() cannot be called from the runtime loop")
+
+    future = asyncio.run_coroutine_threadsafe(coro, _loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Coroutine did not finish within {timeout}s") from None
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine from synchronous code: on the runtime loop when it is
+    running, otherwise on a fresh loop whose pooled clients are closed
+    before returning.
+    """
+    if async_runtime_running():
+        return run_in_runtime(coro)
+
+    async def run() -> Any:
+        try:
+            return await coro
+        finally:
+            await close_http_clients()
+            await close_async_redis()
+
+    return asyncio.run(run())
+
+
+def stop_async_runtime(timeout: float = 10.0) -> None:
+    """Close pooled clients on the loop, then stop and join the loop thread"""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+    if loop is None:
+        return
+
+    async def shutdown() -> None:
+        await close_http_clients()
+        await close_async_redis()
+
+    if loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join(timeout)
+    if not loop.is_running():
+        loop.close()
@@ -32,6 +32,84 @@ class Settings(BaseSettings):
     # DataForSEO API (Optional - users provide their own)
     DATAFORSEO_LOGIN: Optional[str] = None
     DATAFORSEO_PASSWORD: Optional[str] = None
+    DATAFORSEO_BASE_URL: str = Field(default="https://api.dataforseo.com/v3")  # point at benchmarks/dataforseo_standin.py for load tests
+    DATAFORSEO_MAX_CONCURRENCY: int = Field(default=5)  # concurrent batch requests
+
+    # DataForSEO rate limiting (per login, shared across processes via Redis)
+    DATAFORSEO_RATE_LIMIT_ENABLED: bool = Field(default=True)
+    DATAFORSEO_REQUESTS_PER_SECOND: float = Field(default=25.0)  # token bucket refill rate
+    DATAFORSEO_BURST: int = Field(default=50)  # token bucket capacity
+    DATAFORSEO_CONCURRENCY_INITIAL: int = Field(default=10)  # AIMD window start
+    DATAFORSEO_CONCURRENCY_MIN: int = Field(default=1)
+    DATAFORSEO_CONCURRENCY_MAX: int = Field(default=30)  # DataForSEO simultaneous request limit
+    DATAFORSEO_THROTTLE_BACKOFF: float = Field(default=5.0)  # seconds paused after a throttle
+    DATAFORSEO_THROTTLE_RETRIES: int = Field(default=3)
+
+    # Coalescing of identical in-flight provider calls
+    SINGLEFLIGHT_ENABLED: bool = Field(default=True)
+    SINGLEFLIGHT_DISTRIBUTED: bool = Field(default=True)  # also coalesce across processes via Redis
+    SINGLEFLIGHT_LOCK_TTL: float = Field(default=90.0)  # seconds a follower waits for the leader
+    SINGLEFLIGHT_RESULT_TTL: float = Field(default=30.0)  # seconds a published result is kept
+
+    # Decrypted credential / provider service cache (per process, invalidated via Redis pub/sub)
+    CREDENTIAL_CACHE_ENABLED: bool = Field(default=True)
+    CREDENTIAL_CACHE_SIZE: int = Field(default=1024)  # cached services per process (LRU)
+    CREDENTIAL_CACHE_TTL: float = Field(default=300.0)  # seconds; bounds staleness if an invalidation is missed
+
+    # Parse large provider responses incrementally with ijson (when installed)
+    STREAMING_PARSE_ENABLED: bool = Field(default=True)
+    STREAMING_PARSE_MIN_BYTES: int = Field(default=1024 * 1024)  # smaller bodies use json.loads (faster)
+
+    # Raw DataForSEO response archive (content-addressed, for offline re-parsing; opt-in)
+    RAW_ARCHIVE_ENABLED: bool = Field(default=False)
+    RAW_ARCHIVE_DIR: str = Field(default="/var/lib/seo-dashboard/raw_archive")  # must be absolute
+    RAW_ARCHIVE_RETENTION_DAYS: int = Field(default=90)  # prune_raw_archive drops older fetches
+
+    # Keyword research
+    KEYWORD_METRICS_MAX_AGE_DAYS: int = Field(default=30)  # reuse shared metrics fetched within this window
+    KEYWORD_METRICS_NO_DATA_MAX_AGE_DAYS: int = Field(default=7)  # skip keywords the provider had no data for
+    KEYWORD_REFRESH_STALE_DAYS: int = Field(default=7)  # refresh-all skips keywords refreshed within this window
+
+    # Rank tracking
+    RANK_CHECK_MODE: str = Field(default="standard")  # "standard" (task_post queue) or "live"
+    SERP_TASKS_POLL_INTERVAL: float = Field(default=120.0)  # seconds between tasks_ready polls
+    SERP_TASKS_POLL_MAX_PAGES: int = Field(default=20)  # tasks_ready calls per account per poll
+    RANK_INGEST_BATCH_SIZE: int = Field(default=100)  # ready tasks fetched and committed together
+    RANK_INGEST_INSERT_CHUNK: int = Field(default=1000)  # snapshot rows per multi-row INSERT ... ON CONFLICT
+    RANK_INGEST_COPY_MIN_ROWS: int = Field(default=5000)  # larger snapshot batches are loaded with COPY
+    RANK_CHECK_BATCH_SIZE: int = Field(default=100)  # keywords per live check_keyword_ranks_batch task
+    RANK_POST_BATCH_SIZE: int = Field(default=1000)  # keywords per standard-queue post_rank_check_tasks task
+    RANK_ENQUEUE_GROUP_SIZE: int = Field(default=200)  # tasks published per Celery group by the daily sweep
+    RANK_ENQUEUE_FETCH_SIZE: int = Field(default=5000)  # rows per server-side cursor fetch in the daily sweep
+    RANK_CHECK_WINDOW_START_HOUR: int = Field(default=2)  # hour the nightly check window opens (UTC unless local time)
+    RANK_CHECK_WINDOW_HOURS: float = Field(default=6.0)  # checks are spread evenly across this window
+    RANK_CHECK_LOCAL_TIME: bool = Field(default=False)  # open each user's window in their own timezone
+    RANK_CHECK_TICK_MINUTES: int = Field(default=15)  # scheduler tick; must divide 60
+    RANK_CHECK_SLOT_SECONDS: int = Field(default=60)  # checks within a slot are batched into one task
+    RANK_CHECK_ADAPTIVE: bool = Field(default=True)  # back off checks for keywords whose rank is stable
+    RANK_CHECK_MAX_INTERVAL_DAYS: int = Field(default=7)  # longest gap between checks of a stable keyword
+    RANK_HISTORY_CHECKS: int = Field(default=5)  # latest days checked used to judge volatility (and needed to back off)
+    RANK_VOLATILE_SPREAD: int = Field(default=3)  # best-to-worst position spread that keeps a keyword nightly
+    SERP_KEYFRAME_INTERVAL_DAYS: int = Field(default=7)  # stored SERPs get a full keyframe at least this often
+    SERP_DELTA_MAX_RATIO: float = Field(default=0.5)  # write a keyframe when more of the SERP than this changed
+    PARTITION_MONTHS_AHEAD: int = Field(default=3)  # monthly history partitions created ahead of time
+    RANK_RAW_RETENTION_MONTHS: int = Field(default=13)  # older months are rolled up to weekly and detached
+    PARTITION_DROP_DETACHED: bool = Field(default=False)  # drop expired partitions instead of keeping them detached
+    SERP_CACHE_TTL: int = Field(default=6 * 3600)  # seconds; 0 disables the Redis SERP cache
+
+    # Celery worker concurrency per queue (see app/celery_app.py)
+    CELERY_INTERACTIVE_CONCURRENCY: int = Field(default=4)  # user-triggered checks and refreshes
+    CELERY_BATCH_CONCURRENCY: int = Field(default=8)  # nightly rank-check batches
+    CELERY_MAINTENANCE_CONCURRENCY: int = Field(default=1)  # scheduler tick and tasks_ready polling
+
+    # Outbound HTTP connection pool (shared per provider)
+    HTTP2_ENABLED: bool = Field(default=True)
+    HTTP_MAX_CONNECTIONS: int = Field(default=100)
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20)
+    HTTP_KEEPALIVE_EXPIRY: float = Field(default=30.0)  # seconds
+    HTTP_CONNECT_TIMEOUT: float = Field(default=10.0)  # seconds
+    DATAFORSEO_TIMEOUT: float = Field(default=60.0)  # seconds
+    ANTHROPIC_TIMEOUT: float = Field(default=60.0)  # seconds
 
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
@@ -0,0 +1,74 @@
+"""Shared HTTP client pool for outbound provider calls"""
+import asyncio
+import httpx
+from typing import Dict, Tuple
+
+from app.core.config import settings
+
+# Clients are keyed by provider and remember the event loop they were created
+# on: httpx connections cannot be reused across loops.
+_clients: Dict[str, Tuple[httpx.AsyncClient, asyncio.AbstractEventLoop]] = {}
+
+PROVIDER_TIMEOUTS = {
+    "dataforseo": lambda: settings.DATAFORSEO_TIMEOUT,
+    "anthropic": lambda: settings.ANTHROPIC_TIMEOUT,
+}
+
+
+def _build_client(provider: str) -> httpx.AsyncClient:
+    """Create a keep-alive client configured from settings"""
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        PROVIDER_TIMEOUTS[provider](),
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(http2=settings.HTTP2_ENABLED, limits=limits, timeout=timeout)
+
+
+def get_http_client(provider: str) -> httpx.AsyncClient:
+    """
+    Get the pooled client for a provider.
+    Must be called from a running event loop; a client is created lazily
+    the first time a provider is used on that loop.
+    """
+    if provider not in PROVIDER_TIMEOUTS:
+        raise ValueError(f"Unknown HTTP provider: {provider}")
+
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(provider)
+    if entry is not None:
+        client, client_loop = entry
+        if client_loop is loop and not client.is_closed:
+            return client
+
+    client = _build_client(provider)
+    _clients[provider] = (client, loop)
+    return client
+
+
+async def init_http_clients() -> None:
+    """Create pooled clients for every provider on the current loop"""
+    for provider in PROVIDER_TIMEOUTS:
+        get_http_client(provider)
+
+
+async def close_http_clients() -> None:
+    """Close every pooled client that belongs to the current loop"""
+    loop = asyncio.get_running_loop()
+    for provider, (client, client_loop) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+        _clients.pop(provider, None)
+
+
+def reset_http_clients() -> None:
+    """
+    Forget all pooled clients without closing them.
+    Used after fork in Celery workers, where inherited sockets must not be shared.
+    """
+    _clients.clear()
+
@@ -0,0 +1,41 @@
+"""Redis client helpers"""
+import asyncio
+import redis.asyncio as aioredis
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+# Async clients are bound to the event loop their connections were opened on
+_async_client: Optional[Tuple[aioredis.Redis, asyncio.AbstractEventLoop]] = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    """
+    Get the async Redis client for the running event loop.
+    Created lazily from REDIS_URL; a new client is made if the loop changed.
+    """
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is not None and _async_client[1] is loop:
+        return _async_client[0]
+
+    client = aioredis.from_url(settings.REDIS_URL)
+    _async_client = (client, loop)
+    return client
+
+
+async def close_async_redis() -> None:
+    """Close the async Redis client if it belongs to the running loop"""
+    global _async_client
+    if _async_client is None:
+        return
+    client, loop = _async_client
+    _async_client = None
+    if loop is asyncio.get_running_loop():
+        await client.aclose()
+
+
+def reset_async_redis() -> None:
+    """Forget the async Redis client without closing it (after fork)"""
+    global _async_client
+    _async_client = None
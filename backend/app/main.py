@@ -5,6 +5,8 @@ from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.http import init_http_clients, close_http_clients
+from app.core.redis import close_async_redis
 from app.routers import auth, projects, api_credentials, keywords, rank_tracking, competitors, ai_assistant, backlinks, webhooks
 
 # Create FastAPI application
@@ -28,14 +30,16 @@ app.add_middleware(
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize Supabase connection on startup"""
+    """Initialize Supabase connection and provider HTTP pools on startup"""
     init_db()
+    await init_http_clients()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
-    pass
+    await close_http_clients()
+    await close_async_redis()
 
 
 # Health check endpoint
@@ -2,9 +2,10 @@
 from app.models.user import User
 from app.models.project import Project
 from app.models.keyword import Keyword
-from app.models.rank_tracking import RankTracking
+from app.models.keyword_metrics import KeywordMetrics
+from app.models.rank_tracking import CurrentRank, RankDaily, RankTracking, RankTrackingWeekly
 from app.models.competitor import CompetitorDomain
-from app.models.serp_snapshot import SerpSnapshot
+from app.models.serp_snapshot import SerpSnapshot, SerpSnapshotFrame, SerpSnapshotRef, SerpSnapshotWeekly
 from app.models.api_credential import ApiCredential
 from app.models.api_usage_log import ApiUsageLog
 
@@ -12,9 +13,16 @@ __all__ = [
     "User",
     "Project",
     "Keyword",
+    "KeywordMetrics",
     "RankTracking",
+    "RankTrackingWeekly",
+    "RankDaily",
+    "CurrentRank",
     "CompetitorDomain",
     "SerpSnapshot",
+    "SerpSnapshotFrame",
+    "SerpSnapshotRef",
+    "SerpSnapshotWeekly",
     "ApiCredential",
     "ApiUsageLog",
 ]
@@ -19,6 +19,7 @@ class Keyword(Base):
     cpc = Column(Numeric(10, 2), nullable=True)
     competition = Column(Numeric(5, 2), nullable=True)
     last_refreshed_at = Column(DateTime, nullable=True)
+    next_rank_check_at = Column(DateTime, nullable=True)  # nightly slot; set by schedule_rank_checks
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
@@ -29,4 +30,5 @@ class Keyword(Base):
     # Indexes
     __table_args__ = (
         Index("idx_project_keyword", "project_id", "keyword_text"),
+        Index("idx_keywords_next_rank_check", "next_rank_check_at"),
     )
@@ -0,0 +1,30 @@
+"""Keyword Metrics model"""
+from sqlalchemy import Column, String, Integer, DateTime, Numeric, Index
+from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+import uuid
+
+from app.core.database import Base
+
+
+class KeywordMetrics(Base):
+    """
+    Project-independent keyword metrics from DataForSEO, shared by every
+    project tracking the same keyword text and locale.
+    """
+    __tablename__ = "keyword_metrics"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    keyword = Column(String(500), nullable=False)  # normalized keyword text
+    location_code = Column(Integer, nullable=False)
+    language_code = Column(String(10), nullable=False)
+    search_volume = Column(Integer, nullable=True)
+    keyword_difficulty = Column(Integer, nullable=True)
+    cpc = Column(Numeric(10, 2), nullable=True)
+    competition = Column(Numeric(5, 2), nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        Index("idx_keyword_metrics_lookup", "keyword", "location_code", "language_code", unique=True),
+    )
@@ -1,5 +1,5 @@
 """Project model"""
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,6 +17,7 @@ class Project(Base):
     domain = Column(String(255), nullable=False)
     gsc_connected = Column(Boolean, default=False)
     gsc_refresh_token = Column(Text, nullable=True)  # Encrypted
+    rank_check_max_interval_days = Column(Integer, nullable=True)  # caps adaptive rank checks; 1 = nightly
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
@@ -1,5 +1,5 @@
 """Rank Tracking model"""
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import BigInteger, Column, Date, String, Integer, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -25,7 +25,7 @@ class RankTracking(Base):
     search_engine = Column(Enum(SearchEngine), default=SearchEngine.google, nullable=False)
     location_code = Column(Integer, nullable=False)  # DataForSEO location code
     language_code = Column(String(10), nullable=False, default="en")
-    checked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    checked_at = Column(DateTime, default=datetime.utcnow, primary_key=True)  # monthly partition key
 
     # Relationships
     keyword = relationship("Keyword", back_populates="rank_tracking")
@@ -34,4 +34,66 @@ class RankTracking(Base):
     # Indexes
     __table_args__ = (
         Index("idx_keyword_checked", "keyword_id", "checked_at"),
+        Index("idx_project_checked", "project_id", "checked_at"),
+        {"postgresql_partition_by": "RANGE (checked_at)"},
+    )
+
+
+class RankTrackingWeekly(Base):
+    """Weekly aggregate of rank checks whose monthly partition has expired"""
+    __tablename__ = "rank_tracking_weekly"
+
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    tracked_url = Column(String(2048), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    best_position = Column(Integer, nullable=True)
+    worst_position = Column(Integer, nullable=True)
+    position_sum = Column(BigInteger, nullable=False, default=0)  # over checks that ranked
+    ranked_checks = Column(Integer, nullable=False, default=0)
+    checks = Column(Integer, nullable=False, default=0)
+
+
+class RankDaily(Base):
+    """
+    Per-day rollup of rank checks, one row per keyword, tracked URL and day
+    (UTC), maintained by RankIngest at write time. Positions ignore checks
+    where the URL did not rank; last_position is the day's latest check and
+    position_sum / ranked_checks its average position.
+    """
+    __tablename__ = "rank_daily"
+
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    tracked_url = Column(String(2048), primary_key=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    best_position = Column(Integer, nullable=True)
+    worst_position = Column(Integer, nullable=True)
+    last_position = Column(Integer, nullable=True)
+    last_checked_at = Column(DateTime, nullable=False)
+    position_sum = Column(BigInteger, nullable=False, default=0)  # over checks that ranked
+    ranked_checks = Column(Integer, nullable=False, default=0)
+    checks = Column(Integer, nullable=False, default=1)
+
+
+class CurrentRank(Base):
+    """
+    Latest check per project, keyword and tracked URL, maintained by
+    RankIngest at write time. previous_position is the check before it.
+    """
+    __tablename__ = "current_rank"
+
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    tracked_url = Column(String(2048), primary_key=True)
+    rank_id = Column(UUID(as_uuid=True), nullable=False)  # the rank_tracking row
+    rank_position = Column(Integer, nullable=True)
+    previous_position = Column(Integer, nullable=True)
+    search_engine = Column(Enum(SearchEngine), default=SearchEngine.google, nullable=False)
+    location_code = Column(Integer, nullable=False)
+    language_code = Column(String(10), nullable=False, default="en")
+    checked_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_current_rank_keyword", "keyword_id", "checked_at"),
     )
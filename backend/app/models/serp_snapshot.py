@@ -1,5 +1,5 @@
-"""SERP Snapshot model"""
-from sqlalchemy import Column, String, Integer, Date, ForeignKey, Text, Index
+"""SERP Snapshot models"""
+from sqlalchemy import Boolean, Column, String, Integer, Date, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from datetime import date
@@ -28,3 +28,57 @@ class SerpSnapshot(Base):
     __table_args__ = (
         Index("idx_keyword_snapshot", "keyword_id", "snapshot_date"),
     )
+
+
+class SerpSnapshotFrame(Base):
+    """
+    One keyword's SERP for one day, as a keyframe (every result) or a delta
+    against the keyframe on base_date (see app/services/serp_delta.py).
+    Replaces the row-per-result SerpSnapshot layout for new snapshots.
+    """
+    __tablename__ = "serp_snapshot_frames"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, default=date.today, primary_key=True)  # monthly partition key
+    is_keyframe = Column(Boolean, nullable=False)
+    base_date = Column(Date, nullable=False)  # keyframe the delta applies to (snapshot_date for keyframes)
+    serp_features = Column(JSONB, nullable=True)  # page-level features for the day
+    data = Column(JSONB, nullable=False)  # {"items": rows} or {"moved", "entered", "left"}
+
+    # Indexes
+    __table_args__ = (
+        Index("idx_snapshot_frame_keyword_date", "keyword_id", "snapshot_date", unique=True),
+        {"postgresql_partition_by": "RANGE (snapshot_date)"},
+    )
+
+
+class SerpSnapshotWeekly(Base):
+    """First keyframe of a week, kept after the frames' monthly partition has expired"""
+    __tablename__ = "serp_snapshot_weekly"
+
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), primary_key=True)
+    week_start = Column(Date, primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+    serp_features = Column(JSONB, nullable=True)
+    items = Column(JSONB, nullable=False)
+
+
+class SerpSnapshotRef(Base):
+    """
+    Points a keyword's snapshot for a day at another keyword's rows.
+    Written when several tracked keywords share one SERP (same normalized
+    text and locale), so the 100 result rows are stored only once.
+    """
+    __tablename__ = "serp_snapshot_refs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), nullable=False)
+    source_keyword_id = Column(UUID(as_uuid=True), ForeignKey("keywords.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date = Column(Date, default=date.today, nullable=False)
+
+    # Indexes
+    __table_args__ = (
+        Index("idx_snapshot_ref_keyword_date", "keyword_id", "snapshot_date", unique=True),
+        Index("idx_snapshot_ref_source", "source_keyword_id", "snapshot_date"),
+    )
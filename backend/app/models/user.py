@@ -16,6 +16,7 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     api_credits_remaining = Column(Numeric(10, 2), default=0.00)
+    timezone = Column(String(64), nullable=True)  # IANA name, e.g. "America/Chicago"
 
     # Relationships
     projects = relationship("Project", back_populates="user", cascade="all, delete-orphan")
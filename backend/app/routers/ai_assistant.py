@@ -3,12 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from uuid import UUID
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-import json
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.core.security import decrypt_data
 from app.services.claude_ai import ClaudeAIService
+from app.services.credential_cache import get_cached_service
+from app.services.serp_snapshots import get_latest_serp
 
 router = APIRouter(prefix="/api/ai", tags=["ai-assistant"])
 
@@ -38,27 +38,22 @@ def get_user_claude_service(
     db: Session = Depends(get_db)
 ) -> ClaudeAIService:
     """Get Claude service for current user"""
-    cred = db.query(ApiCredential).filter(
-        ApiCredential.user_id == current_user.id,
-        ApiCredential.provider == "anthropic",
-        ApiCredential.is_active == True
-    ).first()
-
-    if not cred:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Anthropic API key not configured. Please add your API key in settings."
-        )
-
     try:
-        credentials = json.loads(decrypt_data(cred.credentials_encrypted))
-        return ClaudeAIService(api_key=credentials["api_key"])
+        service = get_cached_service(db, current_user.id, ClaudeAIService)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to load credentials: {str(e)}"
         )
 
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Anthropic API key not configured. Please add your API key in settings."
+        )
+
+    return service
+
 
 @router.post("/chat")
 async def chat_with_assistant(
@@ -203,11 +198,7 @@ async def analyze_serp(
         )
 
     # Get latest SERP snapshot
-    latest_date = db.query(
-        func.max(SerpSnapshot.snapshot_date)
-    ).filter(
-        SerpSnapshot.keyword_id == request.keyword_id
-    ).scalar()
+    latest_date, serp_results = get_latest_serp(db, request.keyword_id, limit=10)
 
     if not latest_date:
         return {
@@ -215,18 +206,13 @@ async def analyze_serp(
             "message": "No SERP data available. Enable rank tracking first."
         }
 
-    serp_results = db.query(SerpSnapshot).filter(
-        SerpSnapshot.keyword_id == request.keyword_id,
-        SerpSnapshot.snapshot_date == latest_date
-    ).order_by(SerpSnapshot.rank_position).limit(10).all()
-
     # Format for Claude
     serp_data = [
         {
-            "position": s.rank_position,
-            "domain": s.domain,
-            "title": s.title,
-            "url": s.url
+            "position": s["position"],
+            "domain": s["domain"],
+            "title": s["title"],
+            "url": s["url"]
         }
         for s in serp_results
     ]
@@ -276,21 +262,8 @@ async def generate_content_brief(
         )
 
     # Get competitor titles from SERP
-    latest_date = db.query(
-        func.max(SerpSnapshot.snapshot_date)
-    ).filter(
-        SerpSnapshot.keyword_id == request.keyword_id
-    ).scalar()
-
-    competitor_titles = []
-    if latest_date:
-        serp_results = db.query(SerpSnapshot.title).filter(
-            SerpSnapshot.keyword_id == request.keyword_id,
-            SerpSnapshot.snapshot_date == latest_date,
-            SerpSnapshot.title.isnot(None)
-        ).limit(5).all()
-
-        competitor_titles = [s[0] for s in serp_results]
+    _, serp_results = get_latest_serp(db, request.keyword_id)
+    competitor_titles = [s["title"] for s in serp_results if s["title"]][:5]
 
     response = await claude.generate_content_brief(
         keyword=keyword.keyword_text,
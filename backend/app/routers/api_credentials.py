@@ -1,16 +1,20 @@
 """API Credentials router"""
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
 from datetime import datetime
 import json
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.core.security import encrypt_data, decrypt_data
+from app.core.security import encrypt_data
+from app.models.api_credential import ApiCredential
+from app.models.user import User
 from app.schemas.api_credential import (
     ApiCredentialCreate,
     ApiCredentialResponse,
     ApiCredentialCheck
 )
+from app.services.credential_cache import get_cached_service, invalidate_credentials
 from app.services.dataforseo import DataForSEOService
 
 router = APIRouter(prefix="/api/credentials", tags=["credentials"])
@@ -98,6 +102,7 @@ async def setup_api_credentials(
 
     db.commit()
     db.refresh(cred_record)
+    invalidate_credentials(current_user.id, provider)
 
     return {
         "success": True,
@@ -171,6 +176,7 @@ async def remove_credentials(
         .update({"is_active": False})
 
     db.commit()
+    invalidate_credentials(current_user.id, provider)
     return None
 
 
@@ -182,29 +188,18 @@ def get_user_dataforseo_service(
     Dependency to get DataForSEO service for current user.
     Raises 404 if credentials not found.
     """
-    cred = db.query(ApiCredential)\
-        .filter(
-            ApiCredential.user_id == current_user.id,
-            ApiCredential.provider == "dataforseo",
-            ApiCredential.is_active == True
-        )\
-        .first()
-
-    if not cred:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="DataForSEO credentials not configured. Please add your API credentials in settings."
-        )
-
-    # Decrypt credentials
     try:
-        credentials = json.loads(decrypt_data(cred.credentials_encrypted))
-        return DataForSEOService(
-            login=credentials["login"],
-            password=credentials["password"]
-        )
+        service = get_cached_service(db, current_user.id, DataForSEOService)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to load credentials: {str(e)}"
         )
+
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="DataForSEO credentials not configured. Please add your API credentials in settings."
+        )
+
+    return service
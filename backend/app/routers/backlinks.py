@@ -3,12 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from uuid import UUID
 from pydantic import BaseModel
 from typing import List
-import json
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.core.security import decrypt_data
 from app.services.backlinks import BacklinkService
+from app.services.credential_cache import get_cached_service
 
 router = APIRouter(prefix="/api/projects/{project_id}/backlinks", tags=["backlinks"])
 
@@ -45,30 +44,22 @@ def get_backlink_service(
     db: Session = Depends(get_db)
 ) -> BacklinkService:
     """Get backlink service for current user"""
-    cred = db.query(ApiCredential).filter(
-        ApiCredential.user_id == current_user.id,
-        ApiCredential.provider == "dataforseo",
-        ApiCredential.is_active == True
-    ).first()
-
-    if not cred:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="DataForSEO credentials not configured"
-        )
-
     try:
-        credentials = json.loads(decrypt_data(cred.credentials_encrypted))
-        return BacklinkService(
-            login=credentials["login"],
-            password=credentials["password"]
-        )
+        service = get_cached_service(db, current_user.id, BacklinkService)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to load credentials: {str(e)}"
         )
 
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="DataForSEO credentials not configured"
+        )
+
+    return service
+
 
 @router.get("/summary")
 async def get_backlink_summary(
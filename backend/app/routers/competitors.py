@@ -6,6 +6,7 @@ from pydantic import BaseModel
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
+from app.services.serp_snapshots import get_latest_serps
 
 router = APIRouter(prefix="/api/projects/{project_id}/competitors", tags=["competitors"])
 
@@ -116,42 +117,30 @@ def analyze_keyword_overlap(
     if not competitors:
         return {"overlap": [], "total_keywords": len(keywords), "message": "No competitors added yet"}
 
+    # Latest SERP for every keyword (shared snapshots resolved)
+    latest_serps = get_latest_serps(db, [keyword.id for keyword in keywords])
+
     # For each keyword, check which competitors rank for it
     overlap_data = []
 
     for keyword in keywords:
-        # Get latest SERP snapshot
-        latest_snapshot = db.query(
-            func.max(SerpSnapshot.snapshot_date)
-        ).filter(
-            SerpSnapshot.keyword_id == keyword.id
-        ).scalar()
-
-        if not latest_snapshot:
+        if keyword.id not in latest_serps:
             continue
 
-        # Get all domains ranking for this keyword
-        ranking_domains = db.query(SerpSnapshot.domain).filter(
-            SerpSnapshot.keyword_id == keyword.id,
-            SerpSnapshot.snapshot_date == latest_snapshot
-        ).distinct().all()
+        _, serp_results = latest_serps[keyword.id]
 
-        ranking_domains_set = {d[0] for d in ranking_domains}
+        # Best position per domain ranking for this keyword
+        ranking_positions = {}
+        for result in serp_results:
+            ranking_positions.setdefault(result["domain"], result["position"])
 
         # Check which competitors rank
         competitors_ranking = []
         for comp in competitors:
-            if comp.domain in ranking_domains_set:
-                # Get their position
-                position = db.query(SerpSnapshot.rank_position).filter(
-                    SerpSnapshot.keyword_id == keyword.id,
-                    SerpSnapshot.snapshot_date == latest_snapshot,
-                    SerpSnapshot.domain == comp.domain
-                ).first()
-
+            if comp.domain in ranking_positions:
                 competitors_ranking.append({
                     "domain": comp.domain,
-                    "position": position[0] if position else None
+                    "position": ranking_positions[comp.domain]
                 })
 
         # Get our position
@@ -198,20 +187,19 @@ def gap_analysis(
         )
 
     # Get keywords we're tracking
-    our_keywords = db.query(Keyword.keyword_text).filter(
+    our_keywords = db.query(Keyword.id, Keyword.keyword_text).filter(
         Keyword.project_id == project_id
     ).all()
-    our_keywords_set = {k[0] for k in our_keywords}
-
-    # Get all SERP snapshots where competitor appears
-    competitor_serps = db.query(
-        SerpSnapshot.keyword_id,
-        SerpSnapshot.rank_position,
-        Keyword.keyword_text
-    ).join(Keyword).filter(
-        SerpSnapshot.domain == competitor.domain,
-        Keyword.project_id == project_id
-    ).distinct(SerpSnapshot.keyword_id).all()
+    keyword_texts = {keyword_id: keyword_text for keyword_id, keyword_text in our_keywords}
+
+    # Latest SERPs where competitor appears (shared snapshots resolved)
+    latest_serps = get_latest_serps(db, list(keyword_texts))
+    competitor_serps = []
+    for keyword_id, (_, serp_results) in latest_serps.items():
+        for result in serp_results:
+            if result["domain"] == competitor.domain:
+                competitor_serps.append((keyword_id, result["position"], keyword_texts[keyword_id]))
+                break
 
     # Find gaps (keywords they rank for, we don't track or don't rank well)
     gaps = []
@@ -258,30 +246,23 @@ def analyze_serp_features(
     """
     keywords = db.query(Keyword).filter(Keyword.project_id == project_id).all()
 
+    latest_serps = get_latest_serps(db, [keyword.id for keyword in keywords])
+
     features_summary = []
 
     for keyword in keywords:
-        # Get latest snapshot
-        latest_date = db.query(
-            func.max(SerpSnapshot.snapshot_date)
-        ).filter(
-            SerpSnapshot.keyword_id == keyword.id
-        ).scalar()
-
-        if not latest_date:
+        if keyword.id not in latest_serps:
             continue
 
+        latest_date, serp_results = latest_serps[keyword.id]
+
         # Get SERP features
-        serp_with_features = db.query(SerpSnapshot).filter(
-            SerpSnapshot.keyword_id == keyword.id,
-            SerpSnapshot.snapshot_date == latest_date,
-            SerpSnapshot.serp_features.isnot(None)
-        ).first()
+        features = next((r["serp_features"] for r in serp_results if r["serp_features"]), None)
 
-        if serp_with_features and serp_with_features.serp_features:
+        if features:
             features_summary.append({
                 "keyword": keyword.keyword_text,
-                "features": serp_with_features.serp_features,
+                "features": features,
                 "snapshot_date": str(latest_date)
             })
 
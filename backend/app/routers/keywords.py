@@ -2,8 +2,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import List
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.schemas.keyword import (
@@ -13,7 +14,9 @@ from app.schemas.keyword import (
     KeywordUpdate
 )
 from app.services.dataforseo import DataForSEOService
+from app.services.keyword_metrics import count_stale_keywords, refresh_keyword_metrics
 from app.routers.api_credentials import get_user_dataforseo_service
+from app.tasks.keyword_research import refresh_project_keywords
 
 router = APIRouter(prefix="/api/projects/{project_id}/keywords", tags=["keywords"])
 
@@ -181,8 +184,8 @@ async def refresh_keyword_data(
             detail="Keyword not found"
         )
 
-    # Fetch data from DataForSEO
-    result = await dataforseo.get_keyword_data([keyword.keyword_text])
+    # Fetch data from the shared metrics store, or DataForSEO if stale
+    result = await refresh_keyword_metrics(db, dataforseo, [keyword.keyword_text])
 
     if not result["success"]:
         raise HTTPException(
@@ -190,25 +193,16 @@ async def refresh_keyword_data(
             detail=f"DataForSEO API error: {result.get('error')}"
         )
 
-    # Update keyword with data
-    if result["keywords"]:
-        kw_data = result["keywords"][0]
-        keyword.search_volume = kw_data.get("search_volume")
-        keyword.keyword_difficulty = kw_data.get("keyword_difficulty")
-        keyword.cpc = kw_data.get("cpc")
-        keyword.competition = kw_data.get("competition")
-        keyword.last_refreshed_at = datetime.utcnow()
-
     # Log API usage
-    cost = DataForSEOService.estimate_keyword_research_cost(1)
-    api_log = ApiUsageLog(
-        user_id=current_user.id,
-        api_provider="dataforseo",
-        endpoint="bulk_keyword_difficulty",
-        cost=cost,
-        response_status=200
-    )
-    db.add(api_log)
+    if result["fetched"]:
+        api_log = ApiUsageLog(
+            user_id=current_user.id,
+            api_provider="dataforseo",
+            endpoint="bulk_keyword_difficulty",
+            cost=result["cost"],
+            response_status=200
+        )
+        db.add(api_log)
 
     db.commit()
     db.refresh(keyword)
@@ -216,7 +210,7 @@ async def refresh_keyword_data(
     return keyword
 
 
-@router.post("/refresh-all")
+@router.post("/refresh-all", status_code=status.HTTP_202_ACCEPTED)
 async def refresh_all_keywords(
     project_id: UUID,
     project: Project = Depends(get_user_project),
@@ -225,61 +219,24 @@ async def refresh_all_keywords(
     db: Session = Depends(get_db)
 ):
     """
-    Refresh all keywords in the project from DataForSEO.
-    Batches up to 1000 keywords per request.
+    Refresh all stale keywords in the project from DataForSEO.
+    Runs in the background in 1000-keyword batches; only keywords not
+    refreshed within KEYWORD_REFRESH_STALE_DAYS are processed.
     """
-    keywords = db.query(Keyword).filter(
-        Keyword.project_id == project_id
-    ).all()
-
-    if not keywords:
-        return {"success": True, "updated": 0, "message": "No keywords to refresh"}
-
-    # Get keyword texts
-    keyword_texts = [k.keyword_text for k in keywords]
-
-    # Fetch data from DataForSEO (max 1000 per request)
-    result = await dataforseo.get_keyword_data(keyword_texts[:1000])
-
-    if not result["success"]:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"DataForSEO API error: {result.get('error')}"
-        )
+    stale_after = datetime.utcnow() - timedelta(days=settings.KEYWORD_REFRESH_STALE_DAYS)
+    stale_count = count_stale_keywords(db, project_id, stale_after)
 
-    # Update keywords with data
-    keyword_map = {k.keyword_text: k for k in keywords}
-    updated_count = 0
-
-    for kw_data in result["keywords"]:
-        keyword_text = kw_data.get("keyword")
-        if keyword_text in keyword_map:
-            keyword = keyword_map[keyword_text]
-            keyword.search_volume = kw_data.get("search_volume")
-            keyword.keyword_difficulty = kw_data.get("keyword_difficulty")
-            keyword.cpc = kw_data.get("cpc")
-            keyword.competition = kw_data.get("competition")
-            keyword.last_refreshed_at = datetime.utcnow()
-            updated_count += 1
+    if not stale_count:
+        return {"success": True, "keywords": 0, "message": "All keywords are up to date"}
 
-    # Log API usage
-    cost = DataForSEOService.estimate_keyword_research_cost(len(keyword_texts[:1000]))
-    api_log = ApiUsageLog(
-        user_id=current_user.id,
-        api_provider="dataforseo",
-        endpoint="bulk_keyword_difficulty",
-        cost=cost,
-        response_status=200
-    )
-    db.add(api_log)
-
-    db.commit()
+    task = refresh_project_keywords.delay(str(project_id), str(current_user.id))
 
     return {
         "success": True,
-        "updated": updated_count,
-        "cost": float(cost),
-        "message": f"Refreshed {updated_count} keywords"
+        "task_id": task.id,
+        "keywords": stale_count,
+        "estimated_cost": float(DataForSEOService.estimate_keyword_research_cost(stale_count)),
+        "message": f"Refreshing {stale_count} keywords"
     }
 
 
@@ -289,10 +246,9 @@ async def estimate_refresh_cost(
     project: Project = Depends(get_user_project),
     db: Session = Depends(get_db)
 ):
-    """Estimate cost to refresh all keywords"""
-    keyword_count = db.query(Keyword).filter(
-        Keyword.project_id == project_id
-    ).count()
+    """Estimate cost to refresh all stale keywords"""
+    stale_after = datetime.utcnow() - timedelta(days=settings.KEYWORD_REFRESH_STALE_DAYS)
+    keyword_count = count_stale_keywords(db, project_id, stale_after)
 
     cost = DataForSEOService.estimate_keyword_research_cost(keyword_count)
 
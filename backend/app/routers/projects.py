@@ -96,6 +96,8 @@ def update_project(
         project.domain = project_data.domain
     if project_data.gsc_connected is not None:
         project.gsc_connected = project_data.gsc_connected
+    if project_data.rank_check_max_interval_days is not None:
+        project.rank_check_max_interval_days = project_data.rank_check_max_interval_days
 
     db.commit()
     db.refresh(project)
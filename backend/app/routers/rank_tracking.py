@@ -1,5 +1,7 @@
 """Rank Tracking router"""
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta, date
@@ -7,7 +9,15 @@ import json
 
 from app.core.database import get_db
 from app.core.deps import get_current_user
+from app.models.api_usage_log import ApiUsageLog
+from app.models.keyword import Keyword
+from app.models.project import Project
+from app.models.rank_tracking import CurrentRank, RankDaily, RankTracking, RankTrackingWeekly, SearchEngine
+from app.models.serp_snapshot import SerpSnapshot, SerpSnapshotFrame, SerpSnapshotRef, SerpSnapshotWeekly
+from app.models.user import User
 from app.services.dataforseo import DataForSEOService
+from app.services.rank_ingest import RankIngest, find_rank_position
+from app.services.serp_snapshots import get_latest_serp as load_latest_serp, hand_over_snapshots
 from app.routers.api_credentials import get_user_dataforseo_service
 from pydantic import BaseModel
 
@@ -28,6 +38,7 @@ class RankTrackingResponse(BaseModel):
     keyword_text: str
     tracked_url: str
     rank_position: Optional[int]
+    previous_position: Optional[int] = None
     search_engine: str
     location_code: int
     language_code: str
@@ -115,64 +126,46 @@ async def enable_rank_tracking(
             detail=f"Failed to fetch SERP data: {serp_result.get('error')}"
         )
 
-    # Find rank position for tracked URL
-    rank_position = None
-    for result in serp_result["results"]:
-        if tracking_data.tracked_url in result["url"]:
-            rank_position = result["position"]
-            break
+    rank_position = find_rank_position(tracking_data.tracked_url, serp_result["results"])
 
-    # Store rank tracking record
-    rank_record = RankTracking(
+    # Store rank tracking record and SERP snapshot
+    tracking = RankTracking(
         keyword_id=tracking_data.keyword_id,
         project_id=project_id,
         tracked_url=tracking_data.tracked_url,
-        rank_position=rank_position,
         search_engine=tracking_data.search_engine,
         location_code=tracking_data.location_code,
-        language_code=tracking_data.language_code,
-        checked_at=datetime.utcnow()
+        language_code=tracking_data.language_code
     )
-    db.add(rank_record)
-
-    # Store SERP snapshot
-    snapshot_date = date.today()
-    for result in serp_result["results"]:
-        serp_snapshot = SerpSnapshot(
-            keyword_id=tracking_data.keyword_id,
-            rank_position=result["position"],
-            url=result["url"],
-            domain=result["domain"],
-            title=result.get("title"),
-            description=result.get("description"),
-            snapshot_date=snapshot_date
+    ingest = RankIngest()
+    rank_record = ingest.add_rank(tracking, rank_position)
+    ingest.add_snapshot(tracking_data.keyword_id, serp_result["results"])
+
+    # Log API usage (cached SERPs cost nothing)
+    if not serp_result.get("cached"):
+        cost = DataForSEOService.estimate_rank_check_cost(1, live=True)
+        api_log = ApiUsageLog(
+            user_id=current_user.id,
+            api_provider="dataforseo",
+            endpoint="serp/organic/live",
+            cost=cost,
+            response_status=200
         )
-        db.add(serp_snapshot)
-
-    # Log API usage
-    cost = DataForSEOService.estimate_rank_check_cost(1, live=True)
-    api_log = ApiUsageLog(
-        user_id=current_user.id,
-        api_provider="dataforseo",
-        endpoint="serp/organic/live",
-        cost=cost,
-        response_status=200
-    )
-    db.add(api_log)
+        db.add(api_log)
 
+    ingest.flush(db)
     db.commit()
-    db.refresh(rank_record)
 
     return RankTrackingResponse(
-        id=rank_record.id,
-        keyword_id=rank_record.keyword_id,
+        id=rank_record["id"],
+        keyword_id=rank_record["keyword_id"],
         keyword_text=keyword.keyword_text,
-        tracked_url=rank_record.tracked_url,
-        rank_position=rank_record.rank_position,
-        search_engine=rank_record.search_engine.value,
-        location_code=rank_record.location_code,
-        language_code=rank_record.language_code,
-        checked_at=rank_record.checked_at
+        tracked_url=rank_record["tracked_url"],
+        rank_position=rank_record["rank_position"],
+        search_engine=rank_record["search_engine"].value,
+        location_code=rank_record["location_code"],
+        language_code=rank_record["language_code"],
+        checked_at=rank_record["checked_at"]
     )
 
 
@@ -186,29 +179,21 @@ async def list_tracked_keywords(
     List all keywords being tracked for this project.
     Returns the latest rank check for each keyword.
     """
-    # Get latest rank for each keyword
-    subquery = db.query(
-        RankTracking.keyword_id,
-        func.max(RankTracking.checked_at).label('max_checked_at')
+    # Latest check per tracked URL, kept current at ingest
+    results = db.query(CurrentRank, Keyword.keyword_text).join(
+        Keyword, Keyword.id == CurrentRank.keyword_id
     ).filter(
-        RankTracking.project_id == project_id
-    ).group_by(RankTracking.keyword_id).subquery()
-
-    results = db.query(RankTracking, Keyword.keyword_text).join(
-        subquery,
-        (RankTracking.keyword_id == subquery.c.keyword_id) &
-        (RankTracking.checked_at == subquery.c.max_checked_at)
-    ).join(Keyword).filter(
-        RankTracking.project_id == project_id
+        CurrentRank.project_id == project_id
     ).all()
 
     return [
         RankTrackingResponse(
-            id=rank.id,
+            id=rank.rank_id,
             keyword_id=rank.keyword_id,
             keyword_text=keyword_text,
             tracked_url=rank.tracked_url,
             rank_position=rank.rank_position,
+            previous_position=rank.previous_position,
             search_engine=rank.search_engine.value,
             location_code=rank.location_code,
             language_code=rank.language_code,
@@ -241,19 +226,20 @@ async def get_rank_history(
             detail="Keyword not found in this project"
         )
 
-    # Get rank history
-    since_date = datetime.utcnow() - timedelta(days=days)
+    # Average position per day, from the daily rollup maintained at ingest
+    since_date = datetime.utcnow().date() - timedelta(days=days)
     history = db.query(
-        func.date(RankTracking.checked_at).label('date'),
-        func.avg(RankTracking.rank_position).label('avg_position')
+        RankDaily.day.label('date'),
+        func.sum(RankDaily.position_sum).label('position_sum'),
+        func.sum(RankDaily.ranked_checks).label('ranked_checks')
     ).filter(
-        RankTracking.keyword_id == keyword_id,
-        RankTracking.project_id == project_id,
-        RankTracking.checked_at >= since_date
+        RankDaily.keyword_id == keyword_id,
+        RankDaily.project_id == project_id,
+        RankDaily.day >= since_date
     ).group_by(
-        func.date(RankTracking.checked_at)
+        RankDaily.day
     ).order_by(
-        func.date(RankTracking.checked_at)
+        RankDaily.day
     ).all()
 
     return {
@@ -263,7 +249,7 @@ async def get_rank_history(
         "history": [
             {
                 "date": str(h.date),
-                "position": int(h.avg_position) if h.avg_position else None
+                "position": int(h.position_sum) // int(h.ranked_checks) if h.ranked_checks else None
             }
             for h in history
         ]
@@ -292,10 +278,8 @@ async def get_latest_serp(
             detail="Keyword not found in this project"
         )
 
-    # Get latest SERP snapshot
-    latest_snapshot_date = db.query(func.max(SerpSnapshot.snapshot_date)).filter(
-        SerpSnapshot.keyword_id == keyword_id
-    ).scalar()
+    # Get latest SERP snapshot (may be shared with other keywords)
+    latest_snapshot_date, serp_results = load_latest_serp(db, keyword_id)
 
     if not latest_snapshot_date:
         return {
@@ -304,22 +288,17 @@ async def get_latest_serp(
             "results": []
         }
 
-    serp_results = db.query(SerpSnapshot).filter(
-        SerpSnapshot.keyword_id == keyword_id,
-        SerpSnapshot.snapshot_date == latest_snapshot_date
-    ).order_by(SerpSnapshot.rank_position).all()
-
     return {
         "keyword_id": str(keyword_id),
         "keyword_text": keyword.keyword_text,
         "snapshot_date": str(latest_snapshot_date),
         "results": [
             {
-                "position": s.rank_position,
-                "url": s.url,
-                "domain": s.domain,
-                "title": s.title,
-                "description": s.description
+                "position": s["position"],
+                "url": s["url"],
+                "domain": s["domain"],
+                "title": s["title"],
+                "description": s["description"]
             }
             for s in serp_results
         ]
@@ -330,6 +309,7 @@ async def get_latest_serp(
 async def check_rank_now(
     project_id: UUID,
     keyword_id: UUID,
+    force_refresh: bool = False,
     project: Project = Depends(get_user_project),
     current_user: User = Depends(get_current_user),
     dataforseo: DataForSEOService = Depends(get_user_dataforseo_service),
@@ -337,6 +317,7 @@ async def check_rank_now(
 ):
     """
     Manually trigger a rank check for a keyword.
+    Reuses a SERP fetched earlier today unless force_refresh is set.
     """
     # Verify keyword belongs to project and is being tracked
     keyword = db.query(Keyword).filter(
@@ -366,7 +347,8 @@ async def check_rank_now(
     serp_result = await dataforseo.get_serp_results(
         keyword=keyword.keyword_text,
         location_code=existing_tracking.location_code,
-        language_code=existing_tracking.language_code
+        language_code=existing_tracking.language_code,
+        force_refresh=force_refresh
     )
 
     if not serp_result["success"]:
@@ -375,64 +357,33 @@ async def check_rank_now(
             detail=f"Failed to fetch SERP data: {serp_result.get('error')}"
         )
 
-    # Find rank position
-    rank_position = None
-    for result in serp_result["results"]:
-        if existing_tracking.tracked_url in result["url"]:
-            rank_position = result["position"]
-            break
-
-    # Store new rank record
-    rank_record = RankTracking(
-        keyword_id=keyword_id,
-        project_id=project_id,
-        tracked_url=existing_tracking.tracked_url,
-        rank_position=rank_position,
-        search_engine=existing_tracking.search_engine,
-        location_code=existing_tracking.location_code,
-        language_code=existing_tracking.language_code,
-        checked_at=datetime.utcnow()
-    )
-    db.add(rank_record)
-
-    # Store SERP snapshot
-    snapshot_date = date.today()
-    # Delete old snapshots from today (if any)
-    db.query(SerpSnapshot).filter(
-        SerpSnapshot.keyword_id == keyword_id,
-        SerpSnapshot.snapshot_date == snapshot_date
-    ).delete()
-
-    for result in serp_result["results"]:
-        serp_snapshot = SerpSnapshot(
-            keyword_id=keyword_id,
-            rank_position=result["position"],
-            url=result["url"],
-            domain=result["domain"],
-            title=result.get("title"),
-            description=result.get("description"),
-            snapshot_date=snapshot_date
+    # Store new rank record and today's SERP snapshot (replacing any earlier one)
+    ingest = RankIngest()
+    rank_position = find_rank_position(existing_tracking.tracked_url, serp_result["results"])
+    rank_record = ingest.add_rank(existing_tracking, rank_position)
+    ingest.add_snapshot(keyword_id, serp_result["results"])
+
+    # Log API usage (cached SERPs cost nothing)
+    if not serp_result.get("cached"):
+        cost = DataForSEOService.estimate_rank_check_cost(1, live=True)
+        api_log = ApiUsageLog(
+            user_id=current_user.id,
+            api_provider="dataforseo",
+            endpoint="serp/organic/live",
+            cost=cost,
+            response_status=200
         )
-        db.add(serp_snapshot)
-
-    # Log API usage
-    cost = DataForSEOService.estimate_rank_check_cost(1, live=True)
-    api_log = ApiUsageLog(
-        user_id=current_user.id,
-        api_provider="dataforseo",
-        endpoint="serp/organic/live",
-        cost=cost,
-        response_status=200
-    )
-    db.add(api_log)
+        db.add(api_log)
 
+    ingest.flush(db)
     db.commit()
 
     return {
         "success": True,
         "keyword_text": keyword.keyword_text,
         "rank_position": rank_position,
-        "checked_at": rank_record.checked_at.isoformat()
+        "checked_at": rank_record["checked_at"].isoformat(),
+        "cached": bool(serp_result.get("cached"))
     }
 
 
@@ -458,10 +409,34 @@ async def stop_tracking(
             detail="Keyword tracking not found"
         )
 
-    # Delete SERP snapshots
+    db.query(RankDaily).filter(
+        RankDaily.keyword_id == keyword_id,
+        RankDaily.project_id == project_id
+    ).delete()
+    db.query(CurrentRank).filter(
+        CurrentRank.keyword_id == keyword_id,
+        CurrentRank.project_id == project_id
+    ).delete()
+    db.query(RankTrackingWeekly).filter(
+        RankTrackingWeekly.keyword_id == keyword_id,
+        RankTrackingWeekly.project_id == project_id
+    ).delete()
+
+    # Other keywords may share this keyword's SERPs; hand those days over first,
+    # then delete its snapshots and its references to shared snapshots
+    hand_over_snapshots(db, keyword_id)
+    db.query(SerpSnapshotWeekly).filter(
+        SerpSnapshotWeekly.keyword_id == keyword_id
+    ).delete()
     db.query(SerpSnapshot).filter(
         SerpSnapshot.keyword_id == keyword_id
     ).delete()
+    db.query(SerpSnapshotFrame).filter(
+        SerpSnapshotFrame.keyword_id == keyword_id
+    ).delete()
+    db.query(SerpSnapshotRef).filter(
+        SerpSnapshotRef.keyword_id == keyword_id
+    ).delete()
 
     db.commit()
 
@@ -18,12 +18,14 @@ class ProjectUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     domain: Optional[str] = Field(None, min_length=1, max_length=255)
     gsc_connected: Optional[bool] = None
+    rank_check_max_interval_days: Optional[int] = Field(None, ge=1, le=7)
 
 
 class ProjectResponse(ProjectBase):
     id: UUID
     user_id: UUID
     gsc_connected: bool
+    rank_check_max_interval_days: Optional[int] = None
     created_at: datetime
 
     class Config:
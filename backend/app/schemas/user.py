@@ -22,6 +22,7 @@ class UserResponse(UserBase):
     id: UUID
     created_at: datetime
     api_credits_remaining: Decimal
+    timezone: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -30,6 +31,7 @@ class UserResponse(UserBase):
 class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     password: Optional[str] = Field(None, min_length=8)
+    timezone: Optional[str] = None
 
 
 class Token(BaseModel):
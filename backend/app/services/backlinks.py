@@ -1,19 +1,55 @@
 """Backlink analysis service using DataForSEO"""
 import httpx
 import base64
+import json
 from typing import List, Dict, Optional
 from decimal import Decimal
 
+from app.core.config import settings
+from app.core.http import get_http_client
+from app.services.provider_types import Backlink, ReferringDomain, decode_records
+from app.services.json_stream import first_item, iter_items, streaming_enabled
+from app.services.raw_archive import RawArchive, get_raw_archive
+from app.services.rate_limiter import RateLimiter, get_dataforseo_limiter
+from app.services.singleflight import SingleFlight, coalesced, get_singleflight
+
 
 class BacklinkService:
     """Service for backlink analysis via DataForSEO"""
 
-    BASE_URL = "https://api.dataforseo.com/v3"
+    BASE_URL = settings.DATAFORSEO_BASE_URL.rstrip("/")
+    ITEMS_PREFIX = "tasks.item.result.item.items.item"  # ijson path of result items
 
-    def __init__(self, login: str, password: str):
+    def __init__(
+        self,
+        login: str,
+        password: str,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[RateLimiter] = None,
+        singleflight: Optional[SingleFlight] = None,
+        archive: Optional[RawArchive] = None
+    ):
         self.login = login
         self.password = password
         self.auth = self._get_auth_header()
+        self._client = client
+        # Shares the per-login limiter with DataForSEOService
+        self.limiter = limiter or get_dataforseo_limiter(login)
+        self.singleflight = singleflight or get_singleflight()
+        self.archive = archive or get_raw_archive()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client to use; defaults to the shared DataForSEO pool"""
+        return self._client or get_http_client("dataforseo")
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the per-login rate limiter and archive the raw response"""
+        send = lambda: self.client.request(method, url, **kwargs)
+        response = await send() if self.limiter is None else await self.limiter.call(send)
+        if self.archive is not None and response.status_code == 200:
+            await self.archive.aput(url[len(self.BASE_URL) + 1:], response.content)
+        return response
 
     def _get_auth_header(self) -> str:
         """Generate Basic Auth header"""
@@ -21,6 +57,7 @@ class BacklinkService:
         encoded = base64.b64encode(credentials.encode()).decode()
         return f"Basic {encoded}"
 
+    @coalesced("backlinks/summary")
     async def get_backlink_summary(self, target_domain: str) -> Dict:
         """
         Get backlink summary for a domain.
@@ -33,22 +70,21 @@ class BacklinkService:
                 "limit": 1
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/backlinks/summary/live",
-                    json=[payload],
-                    headers={
-                        "Authorization": self.auth,
-                        "Content-Type": "application/json"
-                    },
-                    timeout=60.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_summary_response(data)
-                else:
-                    return {"success": False, "error": f"API error: {response.status_code}"}
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/backlinks/summary/live",
+                json=[payload],
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                return self._parse_summary_response(data)
+            else:
+                return {"success": False, "error": f"API error: {response.status_code}"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -76,6 +112,7 @@ class BacklinkService:
         except Exception as e:
             return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    @coalesced("backlinks/backlinks", decode=lambda r: decode_records(r, "backlinks", Backlink))
     async def get_backlinks(
         self,
         target_domain: str,
@@ -95,22 +132,20 @@ class BacklinkService:
                 "order_by": ["rank,desc"]
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/backlinks/backlinks/live",
-                    json=[payload],
-                    headers={
-                        "Authorization": self.auth,
-                        "Content-Type": "application/json"
-                    },
-                    timeout=60.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_backlinks_response(data)
-                else:
-                    return {"success": False, "error": f"API error: {response.status_code}"}
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/backlinks/backlinks/live",
+                json=[payload],
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code == 200:
+                return self._parse_backlinks_body(response.content)
+            else:
+                return {"success": False, "error": f"API error: {response.status_code}"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -123,19 +158,7 @@ class BacklinkService:
 
             items = tasks[0].get("result", [{}])[0].get("items", [])
 
-            backlinks = []
-            for item in items:
-                backlinks.append({
-                    "url_from": item.get("url_from"),
-                    "url_to": item.get("url_to"),
-                    "domain_from": item.get("domain_from"),
-                    "page_from_rank": item.get("page_from_rank"),
-                    "domain_from_rank": item.get("domain_from_rank"),
-                    "anchor": item.get("anchor"),
-                    "link_attribute": item.get("link_attribute"),
-                    "first_seen": item.get("first_seen"),
-                    "last_seen": item.get("last_seen")
-                })
+            backlinks = [self._backlink(item) for item in items]
 
             return {
                 "success": True,
@@ -145,6 +168,38 @@ class BacklinkService:
         except Exception as e:
             return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    def _parse_backlinks_body(self, body: bytes) -> Dict:
+        """Parse a backlinks response body, streaming item by item when enabled"""
+        if not streaming_enabled(body):
+            return self._parse_backlinks_response(json.loads(body))
+        try:
+            if first_item(body, "tasks.item.status_code") != 20000:
+                return {"success": False, "error": "No data returned"}
+            backlinks = [self._backlink(item) for item in iter_items(body, self.ITEMS_PREFIX)]
+            return {
+                "success": True,
+                "backlinks": backlinks,
+                "count": len(backlinks)
+            }
+        except Exception as e:
+            return {"success": False, "error": f"Parse error: {str(e)}"}
+
+    @staticmethod
+    def _backlink(item: Dict) -> Backlink:
+        """Keep the fields we show from one backlink item"""
+        return Backlink(
+            url_from=item.get("url_from"),
+            url_to=item.get("url_to"),
+            domain_from=item.get("domain_from"),
+            page_from_rank=item.get("page_from_rank"),
+            domain_from_rank=item.get("domain_from_rank"),
+            anchor=item.get("anchor"),
+            link_attribute=item.get("link_attribute"),
+            first_seen=item.get("first_seen"),
+            last_seen=item.get("last_seen")
+        )
+
+    @coalesced("backlinks/referring_domains", decode=lambda r: decode_records(r, "domains", ReferringDomain))
     async def get_referring_domains(
         self,
         target_domain: str,
@@ -158,22 +213,20 @@ class BacklinkService:
                 "order_by": ["rank,desc"]
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/backlinks/referring_domains/live",
-                    json=[payload],
-                    headers={
-                        "Authorization": self.auth,
-                        "Content-Type": "application/json"
-                    },
-                    timeout=60.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_referring_domains_response(data)
-                else:
-                    return {"success": False, "error": f"API error: {response.status_code}"}
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/backlinks/referring_domains/live",
+                json=[payload],
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code == 200:
+                return self._parse_referring_domains_body(response.content)
+            else:
+                return {"success": False, "error": f"API error: {response.status_code}"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -186,15 +239,7 @@ class BacklinkService:
 
             items = tasks[0].get("result", [{}])[0].get("items", [])
 
-            domains = []
-            for item in items:
-                domains.append({
-                    "domain": item.get("domain"),
-                    "backlinks": item.get("backlinks"),
-                    "rank": item.get("rank"),
-                    "first_seen": item.get("first_seen"),
-                    "last_seen": item.get("last_seen")
-                })
+            domains = [self._referring_domain(item) for item in items]
 
             return {
                 "success": True,
@@ -204,6 +249,33 @@ class BacklinkService:
         except Exception as e:
             return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    def _parse_referring_domains_body(self, body: bytes) -> Dict:
+        """Parse a referring domains response body, streaming item by item when enabled"""
+        if not streaming_enabled(body):
+            return self._parse_referring_domains_response(json.loads(body))
+        try:
+            if first_item(body, "tasks.item.status_code") != 20000:
+                return {"success": False, "error": "No data returned"}
+            domains = [self._referring_domain(item) for item in iter_items(body, self.ITEMS_PREFIX)]
+            return {
+                "success": True,
+                "domains": domains,
+                "count": len(domains)
+            }
+        except Exception as e:
+            return {"success": False, "error": f"Parse error: {str(e)}"}
+
+    @staticmethod
+    def _referring_domain(item: Dict) -> ReferringDomain:
+        """Keep the fields we show from one referring domain item"""
+        return ReferringDomain(
+            domain=item.get("domain"),
+            backlinks=item.get("backlinks"),
+            rank=item.get("rank"),
+            first_seen=item.get("first_seen"),
+            last_seen=item.get("last_seen")
+        )
+
     @staticmethod
     def estimate_cost(operation: str, count: int = 1) -> Decimal:
         """Estimate API costs"""
@@ -4,6 +4,7 @@ from typing import List, Dict, Optional
 import json
 
 from app.core.config import settings
+from app.core.http import get_http_client
 
 
 class ClaudeAIService:
@@ -12,13 +13,19 @@ class ClaudeAIService:
     BASE_URL = "https://api.anthropic.com/v1"
     MODEL = "claude-3-5-sonnet-20241022"
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, client: Optional[httpx.AsyncClient] = None):
         self.api_key = api_key
         self.headers = {
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01",
             "content-type": "application/json"
         }
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client to use; defaults to the shared Anthropic pool"""
+        return self._client or get_http_client("anthropic")
 
     async def test_credentials(self) -> Dict:
         """Test if API key is valid"""
@@ -58,18 +65,16 @@ class ClaudeAIService:
         if system:
             payload["system"] = system
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.BASE_URL}/messages",
-                headers=self.headers,
-                json=payload,
-                timeout=60.0
-            )
+        response = await self.client.post(
+            f"{self.BASE_URL}/messages",
+            headers=self.headers,
+            json=payload
+        )
 
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"Claude API error: {response.status_code} - {response.text}")
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Claude API error: {response.status_code} - {response.text}")
 
     async def analyze_keyword_opportunities(
         self,
@@ -0,0 +1,199 @@
+"""
+Per-process cache of ready-to-use provider services built from stored
+API credentials.
+A hit skips the ApiCredential query, the Fernet key derivation and the
+decrypt. Entries expire after CREDENTIAL_CACHE_TTL and are dropped as soon
+as credentials change: the writer invalidates its own process directly and
+publishes on a Redis channel that every API and worker process listens to.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.backlinks import BacklinkService
+from app.services.claude_ai import ClaudeAIService
+from app.services.dataforseo import DataForSEOService
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "credentials:invalidate"
+
+# Service class -> (provider, builder from decrypted credentials)
+SERVICE_BUILDERS: Dict[type, Tuple[str, Callable[[Dict], Any]]] = {
+    DataForSEOService: ("dataforseo", lambda c: DataForSEOService(login=c["login"], password=c["password"])),
+    BacklinkService: ("dataforseo", lambda c: BacklinkService(login=c["login"], password=c["password"])),
+    ClaudeAIService: ("anthropic", lambda c: ClaudeAIService(api_key=c["api_key"])),
+}
+
+CacheKey = Tuple[str, str, str]  # (user_id, provider, service class name)
+
+
+def credential_version(credentials_encrypted: str) -> str:
+    """Identify a stored credential; every save re-encrypts, so any change yields a new version"""
+    return hashlib.sha256(credentials_encrypted.encode()).hexdigest()[:16]
+
+
+class CredentialCache:
+    """
+    Thread-safe LRU + TTL map of (user_id, provider, service) to
+    (credential version, service). Loads that overlap an invalidation
+    are not stored, so a stale credential cannot be re-cached.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None, redis_client=None):
+        self.maxsize = maxsize or settings.CREDENTIAL_CACHE_SIZE
+        self.ttl = ttl or settings.CREDENTIAL_CACHE_TTL
+        self._redis = redis_client
+        self._entries: "OrderedDict[CacheKey, Tuple[float, str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped on every invalidation
+        self._listener = None
+        self._listener_pid: Optional[int] = None
+        self._listener_retry_at = 0.0
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, service = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return service
+
+    def put(self, key: CacheKey, version: str, service: Any, generation: int) -> None:
+        """Store a service loaded while the cache was at `generation`"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, version, service)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str, provider: Optional[str] = None) -> None:
+        """Drop a user's entries in this process (all providers when provider is None)"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if k[0] == user_id and provider in (None, k[1])]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def publish_invalidation(self, user_id: str, provider: str) -> None:
+        """Invalidate locally and tell every other process. Redis errors are logged."""
+        self.invalidate(user_id, provider)
+        try:
+            self.redis.publish(INVALIDATION_CHANNEL, json.dumps({"user_id": user_id, "provider": provider}))
+        except redis.RedisError as e:
+            logger.warning(f"Credential invalidation publish failed; peers rely on TTL: {e}")
+
+    def _on_message(self, message: Dict) -> None:
+        try:
+            data = json.loads(message["data"])
+            self.invalidate(data["user_id"], data.get("provider"))
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Ignoring malformed credential invalidation: {message.get('data')!r}")
+
+    def ensure_listener(self) -> None:
+        """
+        Subscribe to invalidations on a background thread (once per process,
+        restarted after fork or disconnect). Entries cached before the
+        subscription may have missed messages, so they are dropped.
+        """
+        pid = os.getpid()
+        if self._listener_pid == pid and self._listener is not None and self._listener.is_alive():
+            return
+        if time.monotonic() < self._listener_retry_at:
+            return
+
+        if self._listener_pid != pid:
+            self._redis = None  # never share a socket with the parent process
+        self._listener_pid = pid
+        self.clear()
+        try:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_message})
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except redis.RedisError as e:
+            self._listener = None
+            self._listener_retry_at = time.monotonic() + 30
+            logger.warning(f"Credential invalidation listener unavailable; relying on TTL: {e}")
+
+
+_cache: Optional[CredentialCache] = None
+
+
+def get_credential_cache() -> Optional[CredentialCache]:
+    """Process-wide credential cache (None when disabled)"""
+    global _cache
+    if not settings.CREDENTIAL_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = CredentialCache()
+    _cache.ensure_listener()
+    return _cache
+
+
+def get_cached_service(db: Session, user_id, service_cls: type) -> Optional[Any]:
+    """
+    Get a provider service for the user's active credentials.
+    Returns None if the user has no active credentials for the provider.
+    Decryption or parsing errors are raised to the caller.
+    """
+    from app.core.security import decrypt_data
+    from app.models.api_credential import ApiCredential
+
+    provider, build = SERVICE_BUILDERS[service_cls]
+    cache = get_credential_cache()
+    key = (str(user_id), provider, service_cls.__name__)
+    if cache is not None:
+        service = cache.get(key)
+        if service is not None:
+            return service
+        generation = cache.generation
+
+    cred = db.query(ApiCredential).filter(
+        ApiCredential.user_id == user_id,
+        ApiCredential.provider == provider,
+        ApiCredential.is_active == True
+    ).first()
+
+    if not cred:
+        return None
+
+    service = build(json.loads(decrypt_data(cred.credentials_encrypted)))
+    if cache is not None:
+        cache.put(key, credential_version(cred.credentials_encrypted), service, generation)
+    return service
+
+
+def invalidate_credentials(user_id, provider: str) -> None:
+    """Call after credentials are saved or removed"""
+    cache = get_credential_cache()
+    if cache is not None:
+        cache.publish_invalidation(str(user_id), provider)
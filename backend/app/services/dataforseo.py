@@ -1,21 +1,81 @@
 """DataForSEO API service wrapper"""
+import asyncio
 import httpx
 import base64
-from typing import List, Dict, Optional
+import json
+from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 
 from app.core.config import settings
+from app.core.http import get_http_client
+from app.services.provider_types import KeywordData, SerpItem, decode_records
+from app.services.json_stream import first_item, iter_items, streaming_enabled
+from app.services.raw_archive import RawArchive, get_raw_archive
+from app.services.rate_limiter import RateLimiter, get_dataforseo_limiter
+from app.services.singleflight import SingleFlight, coalesced, get_singleflight
+from app.services.serp_cache import SerpCache
+
+
+SerpSignature = Tuple[str, int, str, str, int]
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalize keyword text for matching identical searches (trimmed, lowercase)"""
+    return keyword.strip().lower()
+
+
+def serp_signature(
+    keyword: str,
+    location_code: int = 2840,
+    language_code: str = "en",
+    device: str = "desktop",
+    depth: int = 100
+) -> SerpSignature:
+    """Identify a SERP request; equal signatures return the same results"""
+    return (normalize_keyword(keyword), location_code, language_code, device, depth)
 
 
 class DataForSEOService:
     """Service for interacting with DataForSEO APIs"""
 
-    BASE_URL = "https://api.dataforseo.com/v3"
+    BASE_URL = settings.DATAFORSEO_BASE_URL.rstrip("/")
+    MAX_TASKS_PER_REQUEST = 100  # DataForSEO v3 limit per POST
+    ITEMS_PREFIX = "tasks.item.result.item.items.item"  # ijson path of result items
 
-    def __init__(self, login: str, password: str):
+    def __init__(
+        self,
+        login: str,
+        password: str,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[SerpCache] = None,
+        limiter: Optional[RateLimiter] = None,
+        singleflight: Optional[SingleFlight] = None,
+        archive: Optional[RawArchive] = None
+    ):
         self.login = login
         self.password = password
         self.auth = self._get_auth_header()
+        self._client = client
+        self.limiter = limiter or get_dataforseo_limiter(login)
+        self.singleflight = singleflight or get_singleflight()
+        self.archive = archive or get_raw_archive()
+        # SERP results are not account-specific, so the cache is shared by all users
+        if cache is None and settings.SERP_CACHE_TTL > 0:
+            cache = SerpCache()
+        self.cache = cache
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP client to use; defaults to the shared DataForSEO pool"""
+        return self._client or get_http_client("dataforseo")
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request through the per-login rate limiter and archive the raw response"""
+        send = lambda: self.client.request(method, url, **kwargs)
+        response = await send() if self.limiter is None else await self.limiter.call(send)
+        if self.archive is not None and response.status_code == 200:
+            await self.archive.aput(url[len(self.BASE_URL) + 1:], response.content)
+        return response
 
     def _get_auth_header(self) -> str:
         """Generate Basic Auth header"""
@@ -26,23 +86,24 @@ class DataForSEOService:
     async def test_credentials(self) -> Dict:
         """Test if credentials are valid"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.BASE_URL}/dataforseo_labs/google/available_filters",
-                    headers={"Authorization": self.auth},
-                    timeout=30.0
-                )
-
-                if response.status_code == 200:
-                    return {"success": True, "message": "Credentials valid"}
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Invalid credentials: {response.status_code}"
-                    }
+            response = await self._request(
+                "GET",
+                f"{self.BASE_URL}/dataforseo_labs/google/available_filters",
+                headers={"Authorization": self.auth},
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                return {"success": True, "message": "Credentials valid"}
+            else:
+                return {
+                    "success": False,
+                    "error": f"Invalid credentials: {response.status_code}"
+                }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    @coalesced("dataforseo/keyword_data", decode=lambda r: decode_records(r, "keywords", KeywordData))
     async def get_keyword_data(
         self,
         keywords: List[str],
@@ -60,26 +121,24 @@ class DataForSEOService:
                 "language_code": language_code
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/dataforseo_labs/google/bulk_keyword_difficulty/live",
-                    json=[payload],
-                    headers={
-                        "Authorization": self.auth,
-                        "Content-Type": "application/json"
-                    },
-                    timeout=60.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_keyword_response(data)
-                else:
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}",
-                        "details": response.text
-                    }
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/dataforseo_labs/google/bulk_keyword_difficulty/live",
+                json=[payload],
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code == 200:
+                return self._parse_keyword_body(response.content)
+            else:
+                return {
+                    "success": False,
+                    "error": f"API error: {response.status_code}",
+                    "details": response.text
+                }
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -95,17 +154,23 @@ class DataForSEOService:
                     for result in task_results:
                         items = result.get("items", [])
                         for item in items:
-                            keyword_info = item.get("keyword_info", {})
-                            keyword_properties = item.get("keyword_properties", {})
+                            results.append(self._keyword_metrics(item))
 
-                            results.append({
-                                "keyword": item.get("keyword"),
-                                "search_volume": keyword_info.get("search_volume"),
-                                "cpc": keyword_info.get("cpc"),
-                                "competition": keyword_info.get("competition"),
-                                "keyword_difficulty": keyword_properties.get("keyword_difficulty"),
-                            })
+            return {
+                "success": True,
+                "keywords": results,
+                "count": len(results)
+            }
+        except Exception as e:
+            return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    def _parse_keyword_body(self, body: bytes) -> Dict:
+        """Parse a keyword response body, streaming item by item when enabled"""
+        if not streaming_enabled(body):
+            return self._parse_keyword_response(json.loads(body))
+        try:
+            # Failed tasks carry no result items, so every item belongs to a successful task
+            results = [self._keyword_metrics(item) for item in iter_items(body, self.ITEMS_PREFIX)]
             return {
                 "success": True,
                 "keywords": results,
@@ -114,69 +179,385 @@ class DataForSEOService:
         except Exception as e:
             return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    @staticmethod
+    def _keyword_metrics(item: Dict) -> KeywordData:
+        """Keep the metrics we store from one keyword item"""
+        keyword_info = item.get("keyword_info") or {}
+        keyword_properties = item.get("keyword_properties") or {}
+        return KeywordData(
+            keyword=item.get("keyword"),
+            search_volume=keyword_info.get("search_volume"),
+            cpc=keyword_info.get("cpc"),
+            competition=keyword_info.get("competition"),
+            keyword_difficulty=keyword_properties.get("keyword_difficulty"),
+        )
+
+    @coalesced("dataforseo/serp", decode=lambda r: decode_records(r, "results", SerpItem))
     async def get_serp_results(
         self,
         keyword: str,
         location_code: int = 2840,
         language_code: str = "en",
-        depth: int = 100
+        depth: int = 100,
+        force_refresh: bool = False
     ) -> Dict:
         """
         Get SERP results for rank tracking
         Cost: $0.002 (live) or $0.0006 (standard)
+        Results fetched earlier the same day are served from the SERP cache
+        (marked "cached": True) unless force_refresh is set.
         """
+        signature = serp_signature(keyword, location_code, language_code, "desktop", depth)
+        if self.cache and not force_refresh:
+            cached = await self.cache.get(signature)
+            if cached is not None:
+                return {**decode_records(cached, "results", SerpItem), "cached": True}
+
         try:
-            payload = {
-                "keyword": keyword,
-                "location_code": location_code,
-                "language_code": language_code,
-                "device": "desktop",
-                "depth": depth
-            }
+            payload = self._serp_task_payload(keyword, location_code, language_code, depth)
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.BASE_URL}/serp/google/organic/live/advanced",
-                    json=[payload],
-                    headers={
-                        "Authorization": self.auth,
-                        "Content-Type": "application/json"
-                    },
-                    timeout=60.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_serp_response(data)
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/serp/google/organic/live/advanced",
+                json=[payload],
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code == 200:
+                result = self._parse_serp_body(response.content)
+                if self.cache:
+                    await self.cache.set(signature, result)
+                return result
+            else:
+                return {
+                    "success": False,
+                    "error": f"API error: {response.status_code}"
+                }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def get_serp_results_batch(
+        self,
+        requests: List[Dict],
+        force_refresh: bool = False
+    ) -> Dict[str, Dict]:
+        """
+        Get SERP results for many keywords, packing up to 100 tasks per POST.
+        Cached results are reused unless force_refresh is set.
+
+        Args:
+            requests: List of {"id", "keyword", "location_code"?, "language_code"?, "depth"?}.
+                      "id" is caller-supplied and must be unique within the batch.
+
+        Returns:
+            {id: result} where each result has the same shape as get_serp_results.
+        """
+        results: Dict[str, Dict] = {}
+        misses = requests
+        if self.cache and not force_refresh:
+            cached = await asyncio.gather(*(self.cache.get(self._request_signature(r)) for r in requests))
+            misses = []
+            for req, hit in zip(requests, cached):
+                if hit is None:
+                    misses.append(req)
                 else:
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}"
-                    }
+                    results[str(req["id"])] = {**decode_records(hit, "results", SerpItem), "cached": True}
+
+        chunks = [
+            misses[i:i + self.MAX_TASKS_PER_REQUEST]
+            for i in range(0, len(misses), self.MAX_TASKS_PER_REQUEST)
+        ]
+        semaphore = asyncio.Semaphore(settings.DATAFORSEO_MAX_CONCURRENCY)
+
+        async def fetch_chunk(chunk: List[Dict]) -> Dict[str, Dict]:
+            async with semaphore:
+                return await self._post_serp_chunk(chunk)
+
+        for chunk_results in await asyncio.gather(*(fetch_chunk(c) for c in chunks)):
+            results.update(chunk_results)
+
+        if self.cache:
+            await asyncio.gather(*(
+                self.cache.set(self._request_signature(req), results[str(req["id"])])
+                for req in misses
+            ))
+        return results
+
+    async def _post_serp_chunk(self, chunk: List[Dict]) -> Dict[str, Dict]:
+        """POST one multi-task SERP request and split the response per caller id"""
+        ids = [str(req["id"]) for req in chunk]
+        payload = [
+            self._serp_task_payload(
+                req["keyword"],
+                req.get("location_code", 2840),
+                req.get("language_code", "en"),
+                req.get("depth", 100),
+                tag=request_id
+            )
+            for req, request_id in zip(chunk, ids)
+        ]
+
+        try:
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/serp/google/organic/live/advanced",
+                json=payload,
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code != 200:
+                error = {"success": False, "error": f"API error: {response.status_code}"}
+                return {request_id: error for request_id in ids}
+
+            results = {}
+            # Up to 100 SERPs per response; build and parse one task tree at a time
+            for index, task in enumerate(self._iter_tasks(response.content)):
+                request_id = (task.get("data") or {}).get("tag")
+                if request_id is None and index < len(ids):
+                    request_id = ids[index]
+                results[request_id] = self._parse_serp_task(task)
+        except Exception as e:
+            return {request_id: {"success": False, "error": str(e)} for request_id in ids}
+
+        for request_id in ids:
+            results.setdefault(request_id, {"success": False, "error": "Task missing from response"})
+        return results
+
+    async def post_serp_tasks(self, requests: List[Dict], priority: int = 1) -> Dict[str, Dict]:
+        """
+        Queue SERP tasks on the standard (non-live) queue, up to 100 per POST.
+        Results are collected later via get_ready_serp_tasks / get_serp_task_results.
+
+        Args:
+            requests: Same shape as get_serp_results_batch; "id" is sent as the task tag
+            priority: 1 (normal) or 2 (high, billed at a higher rate)
+
+        Returns:
+            {id: {"success": True, "task_id": ...}} or {id: {"success": False, "error": ...}}
+        """
+        chunks = [
+            requests[i:i + self.MAX_TASKS_PER_REQUEST]
+            for i in range(0, len(requests), self.MAX_TASKS_PER_REQUEST)
+        ]
+        semaphore = asyncio.Semaphore(settings.DATAFORSEO_MAX_CONCURRENCY)
+
+        async def post_chunk(chunk: List[Dict]) -> Dict[str, Dict]:
+            async with semaphore:
+                return await self._post_serp_task_chunk(chunk, priority)
+
+        results: Dict[str, Dict] = {}
+        for chunk_results in await asyncio.gather(*(post_chunk(c) for c in chunks)):
+            results.update(chunk_results)
+        return results
+
+    async def _post_serp_task_chunk(self, chunk: List[Dict], priority: int) -> Dict[str, Dict]:
+        """POST one task_post request and map created task ids back to caller ids"""
+        ids = [str(req["id"]) for req in chunk]
+        payload = []
+        for req, request_id in zip(chunk, ids):
+            task = self._serp_task_payload(
+                req["keyword"],
+                req.get("location_code", 2840),
+                req.get("language_code", "en"),
+                req.get("depth", 100),
+                tag=request_id
+            )
+            task["priority"] = priority
+            payload.append(task)
+
+        try:
+            response = await self._request(
+                "POST",
+                f"{self.BASE_URL}/serp/google/organic/task_post",
+                json=payload,
+                headers={
+                    "Authorization": self.auth,
+                    "Content-Type": "application/json"
+                }
+            )
+
+            if response.status_code != 200:
+                error = {"success": False, "error": f"API error: {response.status_code}"}
+                return {request_id: error for request_id in ids}
+
+            tasks = response.json().get("tasks") or []
+        except Exception as e:
+            return {request_id: {"success": False, "error": str(e)} for request_id in ids}
+
+        results = {}
+        for index, task in enumerate(tasks):
+            request_id = (task.get("data") or {}).get("tag")
+            if request_id is None and index < len(ids):
+                request_id = ids[index]
+            # 20100 = "Task Created"
+            if task.get("status_code") == 20100:
+                results[request_id] = {"success": True, "task_id": task.get("id")}
+            else:
+                results[request_id] = {
+                    "success": False,
+                    "error": f"Task error: {task.get('status_code')} {task.get('status_message', '')}".strip()
+                }
+
+        for request_id in ids:
+            results.setdefault(request_id, {"success": False, "error": "Task missing from response"})
+        return results
+
+    async def get_ready_serp_tasks(self) -> Dict:
+        """
+        List completed standard-queue SERP tasks that have not been collected yet.
+        DataForSEO returns at most 1,000 ready tasks per call.
+        """
+        try:
+            response = await self._request(
+                "GET",
+                f"{self.BASE_URL}/serp/google/organic/tasks_ready",
+                headers={"Authorization": self.auth}
+            )
+
+            if response.status_code != 200:
+                return {"success": False, "error": f"API error: {response.status_code}"}
+
+            ready = []
+            for task in response.json().get("tasks") or []:
+                if task.get("status_code") != 20000:
+                    continue
+                for result in task.get("result") or []:
+                    ready.append({"task_id": result.get("id"), "tag": result.get("tag")})
+
+            return {"success": True, "tasks": ready, "count": len(ready)}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def _parse_serp_response(self, data: Dict) -> Dict:
-        """Parse DataForSEO SERP response"""
+    async def get_serp_task_result(self, task_id: str) -> Dict:
+        """Fetch the advanced result of one completed standard-queue SERP task"""
         try:
-            results = []
-            tasks = data.get("tasks", [])
+            response = await self._request(
+                "GET",
+                f"{self.BASE_URL}/serp/google/organic/task_get/advanced/{task_id}",
+                headers={"Authorization": self.auth}
+            )
 
-            for task in tasks:
-                if task.get("status_code") == 20000:
-                    task_results = task.get("result", [])
-                    for result in task_results:
-                        items = result.get("items", [])
-                        for item in items:
-                            if item.get("type") == "organic":
-                                results.append({
-                                    "position": item.get("rank_absolute"),
-                                    "url": item.get("url"),
-                                    "domain": item.get("domain"),
-                                    "title": item.get("title"),
-                                    "description": item.get("description"),
-                                })
+            if response.status_code != 200:
+                return {"success": False, "error": f"API error: {response.status_code}"}
+
+            result, data = self._parse_serp_task_body(response.content)
+            if data is None:
+                return result
+            if self.cache and data.get("keyword"):
+                await self.cache.set(self._request_signature(data), result)
+            result["tag"] = data.get("tag")
+            return result
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def get_serp_task_results(self, task_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many completed SERP tasks with bounded concurrency, keyed by task id"""
+        semaphore = asyncio.Semaphore(settings.DATAFORSEO_MAX_CONCURRENCY)
 
+        async def fetch(task_id: str) -> Dict:
+            async with semaphore:
+                return await self.get_serp_task_result(task_id)
+
+        results = await asyncio.gather(*(fetch(task_id) for task_id in task_ids))
+        return dict(zip(task_ids, results))
+
+    @staticmethod
+    def _request_signature(request: Dict) -> SerpSignature:
+        """Signature of a batch request or echoed task data"""
+        return serp_signature(
+            request["keyword"],
+            request.get("location_code", 2840),
+            request.get("language_code", "en"),
+            request.get("device", "desktop"),
+            request.get("depth", 100)
+        )
+
+    @staticmethod
+    def _serp_task_payload(
+        keyword: str,
+        location_code: int,
+        language_code: str,
+        depth: int,
+        tag: Optional[str] = None
+    ) -> Dict:
+        """Build a single SERP task"""
+        payload = {
+            "keyword": keyword,
+            "location_code": location_code,
+            "language_code": language_code,
+            "device": "desktop",
+            "depth": depth
+        }
+        if tag is not None:
+            payload["tag"] = tag
+        return payload
+
+    def _parse_serp_body(self, body: bytes) -> Dict:
+        """Parse a single-task SERP response body, streaming item by item when enabled"""
+        result, _ = self._parse_serp_task_body(body)
+        return result
+
+    def _parse_serp_task_body(self, body: bytes) -> Tuple[Dict, Optional[Dict]]:
+        """
+        Parse a single-task (task_get) SERP response body.
+        Returns (result, echoed task data); data is None when the response had no task.
+        """
+        if not streaming_enabled(body):
+            tasks = json.loads(body).get("tasks") or []
+            if not tasks:
+                return {"success": False, "error": "No data returned"}, None
+            return self._parse_serp_task(tasks[0]), tasks[0].get("data") or {}
+
+        status_code = first_item(body, "tasks.item.status_code")
+        if status_code is None:
+            return {"success": False, "error": "No data returned"}, None
+        data = first_item(body, "tasks.item.data") or {}
+        if status_code != 20000:
+            message = first_item(body, "tasks.item.status_message", "")
+            return {"success": False, "error": f"Task error: {status_code} {message}".strip()}, data
+        try:
+            results = self._stream_serp_items(body)
+            return {"success": True, "results": results, "count": len(results)}, data
+        except Exception as e:
+            return {"success": False, "error": f"Parse error: {str(e)}"}, data
+
+    def _iter_tasks(self, body: bytes):
+        """Yield the tasks of a response one at a time"""
+        if streaming_enabled(body):
+            return iter_items(body, "tasks.item")
+        return iter(json.loads(body).get("tasks") or [])
+
+    @classmethod
+    def _stream_serp_items(cls, body: bytes) -> List[Dict]:
+        """Organic results of a single-task SERP body, building one item at a time"""
+        item_types = first_item(body, "tasks.item.result.item.item_types")
+        seen_types = []
+        results = []
+        for item in iter_items(body, cls.ITEMS_PREFIX):
+            seen_types.append(item.get("type"))
+            if item.get("type") == "organic":
+                results.append(cls._organic_result(item, None))
+
+        features = cls._serp_features({"item_types": item_types or seen_types})
+        for result in results:
+            result.serp_features = features
+        return results
+
+    def _parse_serp_task(self, task: Dict) -> Dict:
+        """Parse a single task of a (possibly multi-task) SERP response"""
+        if task.get("status_code") != 20000:
+            return {
+                "success": False,
+                "error": f"Task error: {task.get('status_code')} {task.get('status_message', '')}".strip()
+            }
+        try:
+            results = self._parse_serp_items(task)
             return {
                 "success": True,
                 "results": results,
@@ -185,6 +566,35 @@ class DataForSEOService:
         except Exception as e:
             return {"success": False, "error": f"Parse error: {str(e)}"}
 
+    @staticmethod
+    def _parse_serp_items(task: Dict) -> List[Dict]:
+        """Extract organic results from a successful SERP task"""
+        results = []
+        for result in task.get("result") or []:
+            features = DataForSEOService._serp_features(result)
+            for item in result.get("items") or []:
+                if item.get("type") == "organic":
+                    results.append(DataForSEOService._organic_result(item, features))
+        return results
+
+    @staticmethod
+    def _organic_result(item: Dict, features: Optional[List[str]]) -> SerpItem:
+        """Keep the fields we store from one organic SERP item"""
+        return SerpItem(
+            position=item.get("rank_absolute"),
+            url=item.get("url"),
+            domain=item.get("domain"),
+            title=item.get("title"),
+            description=item.get("description"),
+            serp_features=features,
+        )
+
+    @staticmethod
+    def _serp_features(result: Dict) -> List[str]:
+        """SERP feature types on a results page (featured_snippet, people_also_ask, local_pack, ...)"""
+        types = result.get("item_types") or [item.get("type") for item in result.get("items") or []]
+        return [t for t in dict.fromkeys(types) if t and t != "organic"]
+
     @staticmethod
     def estimate_keyword_research_cost(keyword_count: int) -> Decimal:
         """Estimate cost for keyword research"""
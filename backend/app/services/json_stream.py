@@ -0,0 +1,37 @@
+"""
+Incremental JSON parsing for large provider responses.
+Uses ijson (C backend when available) to build only the sub-objects a
+parser asks for, one at a time, instead of the whole response tree.
+Without ijson, with STREAMING_PARSE_ENABLED off, or for bodies smaller
+than STREAMING_PARSE_MIN_BYTES, callers fall back to json.loads and the
+tree parsers: for a single SERP the tree is small and json.loads is
+faster (see benchmarks/bench_parsers.py).
+"""
+import io
+from typing import Any, Iterator
+
+from app.core.config import settings
+
+try:
+    import ijson
+except ImportError:  # optional; tree parsing is used instead
+    ijson = None
+
+
+def streaming_enabled(body: bytes) -> bool:
+    """Whether a response body should be parsed incrementally"""
+    return (
+        ijson is not None
+        and settings.STREAMING_PARSE_ENABLED
+        and len(body) >= settings.STREAMING_PARSE_MIN_BYTES
+    )
+
+
+def iter_items(body: bytes, prefix: str) -> Iterator[Any]:
+    """Yield each value at an ijson prefix (e.g. "tasks.item.result.item.items.item")"""
+    return ijson.items(io.BytesIO(body), prefix, use_float=True)
+
+
+def first_item(body: bytes, prefix: str, default: Any = None) -> Any:
+    """First value at a prefix; stops reading as soon as it is found"""
+    return next(iter_items(body, prefix), default)
@@ -0,0 +1,298 @@
+"""
+Shared keyword metrics store.
+Search volume, CPC, competition and difficulty depend only on the keyword
+and locale, so they are fetched once and reused by every project.
+"""
+from sqlalchemy import Integer, Numeric, String, column, func, or_, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+import asyncio
+
+from app.core.config import settings
+from app.models.keyword import Keyword
+from app.models.keyword_metrics import KeywordMetrics
+from app.services.dataforseo import DataForSEOService, normalize_keyword
+
+METRIC_FIELDS = ("search_volume", "keyword_difficulty", "cpc", "competition")
+
+# DataForSEO bulk_keyword_difficulty accepts up to 1,000 keywords per task
+KEYWORDS_PER_REQUEST = 1000
+
+
+def get_fresh_metrics(
+    db: Session,
+    keywords: Iterable[str],
+    location_code: int = 2840,
+    language_code: str = "en"
+) -> Dict[str, Dict]:
+    """
+    Stored metrics younger than KEYWORD_METRICS_MAX_AGE_DAYS, keyed by normalized keyword.
+    No-data markers (rows with every metric NULL) count as fresh for
+    KEYWORD_METRICS_NO_DATA_MAX_AGE_DAYS, so those keywords are not paid for again on every run.
+    """
+    normalized = list({normalize_keyword(k) for k in keywords})
+    if not normalized:
+        return {}
+
+    now = datetime.utcnow()
+    fresh_after = now - timedelta(days=settings.KEYWORD_METRICS_MAX_AGE_DAYS)
+    no_data_fresh_after = now - timedelta(days=settings.KEYWORD_METRICS_NO_DATA_MAX_AGE_DAYS)
+    has_data = or_(*(getattr(KeywordMetrics, field).isnot(None) for field in METRIC_FIELDS))
+    rows = db.query(KeywordMetrics).filter(
+        KeywordMetrics.keyword.in_(normalized),
+        KeywordMetrics.location_code == location_code,
+        KeywordMetrics.language_code == language_code,
+        KeywordMetrics.fetched_at >= fresh_after,
+        or_(has_data, KeywordMetrics.fetched_at >= no_data_fresh_after)
+    ).all()
+
+    return {
+        row.keyword: {field: getattr(row, field) for field in METRIC_FIELDS}
+        for row in rows
+    }
+
+
+def store_metrics(
+    db: Session,
+    metrics: Dict[str, Dict],
+    location_code: int = 2840,
+    language_code: str = "en"
+) -> None:
+    """Upsert fetched metrics into the shared store. Does not commit."""
+    if not metrics:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "keyword": keyword,
+            "location_code": location_code,
+            "language_code": language_code,
+            "fetched_at": now,
+            **{field: data.get(field) for field in METRIC_FIELDS},
+        }
+        for keyword, data in metrics.items()
+    ]
+    stmt = insert(KeywordMetrics).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["keyword", "location_code", "language_code"],
+        set_={
+            "fetched_at": stmt.excluded.fetched_at,
+            **{field: stmt.excluded[field] for field in METRIC_FIELDS},
+        }
+    )
+    db.execute(stmt)
+
+
+def fan_out_metrics(db: Session, metrics: Dict[str, Dict]) -> int:
+    """
+    Copy metrics onto every Keyword row (in any project) with matching
+    normalized text, in a single UPDATE ... FROM (VALUES ...).
+    Does not commit. Returns the number of keyword rows updated.
+    """
+    if not metrics:
+        return 0
+
+    metric_values = values(
+        column("keyword", String),
+        column("search_volume", Integer),
+        column("keyword_difficulty", Integer),
+        column("cpc", Numeric(10, 2)),
+        column("competition", Numeric(5, 2)),
+        name="metric_values"
+    ).data([
+        (keyword, *(data.get(field) for field in METRIC_FIELDS))
+        for keyword, data in metrics.items()
+    ])
+
+    stmt = update(Keyword).where(
+        func.lower(func.trim(Keyword.keyword_text)) == metric_values.c.keyword
+    ).values(
+        search_volume=metric_values.c.search_volume,
+        keyword_difficulty=metric_values.c.keyword_difficulty,
+        cpc=metric_values.c.cpc,
+        competition=metric_values.c.competition,
+        last_refreshed_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)
+
+    return db.execute(stmt).rowcount
+
+
+async def _fetch_metrics(
+    dataforseo: DataForSEOService,
+    keywords: List[str],
+    location_code: int,
+    language_code: str
+) -> Dict:
+    """
+    Fetch one request's worth of keywords, keyed by normalized keyword.
+    Keywords the provider returned nothing for map to empty metrics, which
+    are stored as a no-data marker.
+    """
+    result = await dataforseo.get_keyword_data(keywords, location_code, language_code)
+    if not result["success"]:
+        return result
+    metrics = {
+        normalize_keyword(kw_data.keyword): kw_data
+        for kw_data in result["keywords"] if kw_data.keyword
+    }
+    for keyword in keywords:
+        metrics.setdefault(normalize_keyword(keyword), {})
+    return {"success": True, "metrics": metrics}
+
+
+async def refresh_keyword_metrics(
+    db: Session,
+    dataforseo: DataForSEOService,
+    keywords: List[str],
+    location_code: int = 2840,
+    language_code: str = "en"
+) -> Dict:
+    """
+    Refresh metrics for keywords, calling DataForSEO only for keywords that
+    are missing from the shared store or stale, then fan the values out to
+    all matching Keyword rows. Does not commit.
+
+    Returns:
+        {"success", "metrics": {normalized: {...}}, "fetched": int, "cost": Decimal, "updated": int}
+    """
+    metrics = get_fresh_metrics(db, keywords, location_code, language_code)
+    misses = sorted({normalize_keyword(k) for k in keywords} - set(metrics))
+
+    fetched: Dict[str, Dict] = {}
+    for i in range(0, len(misses), KEYWORDS_PER_REQUEST):
+        result = await _fetch_metrics(
+            dataforseo, misses[i:i + KEYWORDS_PER_REQUEST], location_code, language_code
+        )
+        if not result["success"]:
+            return {"success": False, "error": result.get("error")}
+        fetched.update(result["metrics"])
+
+    store_metrics(db, fetched, location_code, language_code)
+    metrics.update({k: {field: v.get(field) for field in METRIC_FIELDS} for k, v in fetched.items()})
+
+    return {
+        "success": True,
+        "metrics": metrics,
+        "fetched": len(misses),
+        "cost": DataForSEOService.estimate_keyword_research_cost(len(misses)) if misses else Decimal("0"),
+        "updated": fan_out_metrics(db, metrics),
+    }
+
+
+def _stale_keywords_query(db: Session, project_id: UUID, stale_after: datetime):
+    """Distinct normalized texts of a project's keywords not refreshed since stale_after"""
+    normalized = func.lower(func.trim(Keyword.keyword_text))
+    return db.query(normalized.label("keyword")).filter(
+        Keyword.project_id == project_id,
+        or_(Keyword.last_refreshed_at.is_(None), Keyword.last_refreshed_at < stale_after)
+    ).distinct()
+
+
+def count_stale_keywords(db: Session, project_id: UUID, stale_after: datetime) -> int:
+    """Number of distinct keywords a project refresh would process"""
+    return _stale_keywords_query(db, project_id, stale_after).count()
+
+
+def iter_stale_keyword_batches(
+    db: Session,
+    project_id: UUID,
+    stale_after: datetime,
+    batch_size: int = KEYWORDS_PER_REQUEST
+) -> Iterator[List[str]]:
+    """
+    Stream a project's stale keywords in batches of normalized text.
+    Pages by keyset rather than holding a cursor open, so callers can
+    commit between batches.
+    """
+    query = _stale_keywords_query(db, project_id, stale_after)
+    keyword = func.lower(func.trim(Keyword.keyword_text))
+    last = None
+    while True:
+        page = query
+        if last is not None:
+            page = page.filter(keyword > last)
+        batch = [row.keyword for row in page.order_by(keyword).limit(batch_size)]
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+async def refresh_stale_project_metrics(
+    db: Session,
+    dataforseo: DataForSEOService,
+    project_id: UUID,
+    location_code: int = 2840,
+    language_code: str = "en",
+    stale_after: Optional[datetime] = None,
+    concurrency: Optional[int] = None
+) -> Dict:
+    """
+    Refresh every stale keyword in a project as a chunked pipeline.
+    Keywords are read in KEYWORDS_PER_REQUEST batches; store hits are fanned
+    out straight away and misses are fetched with up to `concurrency`
+    requests in flight. Each batch is written with one bulk upsert and one
+    UPDATE ... FROM (VALUES ...) and committed as it lands, so a failed
+    request only loses its own batch.
+
+    Returns:
+        {"success", "keywords", "fetched", "failed", "updated", "cost", "errors"}
+    """
+    if stale_after is None:
+        stale_after = datetime.utcnow() - timedelta(days=settings.KEYWORD_REFRESH_STALE_DAYS)
+    concurrency = concurrency or settings.DATAFORSEO_MAX_CONCURRENCY
+
+    totals = {"keywords": 0, "fetched": 0, "failed": 0, "updated": 0, "cost": Decimal("0")}
+    errors: List[str] = []
+    pending = set()
+
+    async def fetch(batch: List[str]):
+        return batch, await _fetch_metrics(dataforseo, batch, location_code, language_code)
+
+    def ingest(done) -> None:
+        for task in done:
+            batch, result = task.result()
+            if not result["success"]:
+                totals["failed"] += len(batch)
+                errors.append(str(result.get("error")))
+                continue
+            store_metrics(db, result["metrics"], location_code, language_code)
+            totals["updated"] += fan_out_metrics(db, {
+                keyword: {field: data.get(field) for field in METRIC_FIELDS}
+                for keyword, data in result["metrics"].items()
+            })
+            totals["fetched"] += len(batch)
+            totals["cost"] += DataForSEOService.estimate_keyword_research_cost(len(batch))
+            db.commit()
+
+    for batch in iter_stale_keyword_batches(db, project_id, stale_after):
+        totals["keywords"] += len(batch)
+
+        hits = get_fresh_metrics(db, batch, location_code, language_code)
+        if hits:
+            totals["updated"] += fan_out_metrics(db, hits)
+            db.commit()
+
+        misses = [keyword for keyword in batch if keyword not in hits]
+        if misses:
+            pending.add(asyncio.create_task(fetch(misses)))
+
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            ingest(done)
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        ingest(done)
+
+    return {
+        # Partial failures are reported in "errors"; only an all-failed run is unsuccessful
+        "success": not errors or totals["fetched"] > 0,
+        **totals,
+        "errors": errors,
+    }
@@ -0,0 +1,267 @@
+"""
+Monthly range partitions for the append-only history tables.
+rank_tracking is partitioned on checked_at and serp_snapshot_frames on
+snapshot_date, one partition per calendar month (named <table>_YYYY_MM),
+plus a DEFAULT partition as a safety net. maintain_partitions keeps
+PARTITION_MONTHS_AHEAD months created ahead of time (moving any rows that
+landed in DEFAULT into the new month) and applies retention:
+months older than RANK_RAW_RETENTION_MONTHS are rolled up into the weekly
+tables (rank_tracking_weekly, serp_snapshot_weekly) and detached. The weekly
+tables are an archive for export and analysis; the API does not read them
+(rank history comes from rank_daily, which is never pruned).
+"""
+import logging
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.serp_delta import apply_delta
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES: Dict[str, str] = {
+    "rank_tracking": "checked_at",
+    "serp_snapshot_frames": "snapshot_date",
+}
+
+# Parent definitions ({name} is the parent table), matching database/schema.sql;
+# used by the migration in app/tasks/partition_migration.py
+PARENT_DDL: Dict[str, List[str]] = {
+    "rank_tracking": [
+        """CREATE TABLE {name} (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+            project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+            tracked_url TEXT NOT NULL,
+            rank_position INTEGER,
+            search_engine search_engine_type DEFAULT 'google',
+            location_code INTEGER NOT NULL,
+            language_code VARCHAR(10) NOT NULL DEFAULT 'en',
+            checked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+            PRIMARY KEY (id, checked_at)
+        ) PARTITION BY RANGE (checked_at)""",
+        "CREATE INDEX ON {name} (project_id, checked_at DESC)",
+        "CREATE INDEX ON {name} (keyword_id, checked_at DESC)",
+        "CREATE TABLE IF NOT EXISTS rank_tracking_default PARTITION OF {name} DEFAULT",
+    ],
+    "serp_snapshot_frames": [
+        """CREATE TABLE {name} (
+            id UUID NOT NULL DEFAULT uuid_generate_v4(),
+            keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+            snapshot_date DATE NOT NULL DEFAULT CURRENT_DATE,
+            is_keyframe BOOLEAN NOT NULL,
+            base_date DATE NOT NULL,
+            serp_features JSONB,
+            data JSONB NOT NULL,
+            PRIMARY KEY (id, snapshot_date)
+        ) PARTITION BY RANGE (snapshot_date)""",
+        "CREATE UNIQUE INDEX ON {name} (keyword_id, snapshot_date)",
+        "CREATE TABLE IF NOT EXISTS serp_snapshot_frames_default PARTITION OF {name} DEFAULT",
+    ],
+}
+
+_PARTITION_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """Month a partition covers, from its name (None for DEFAULT or foreign partitions)"""
+    if not name.startswith(f"{table}_"):
+        return None
+    match = _PARTITION_SUFFIX.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _bound(table: str, month: date) -> str:
+    if PARTITIONED_TABLES[table] == "checked_at":
+        # timestamptz: pin bounds to UTC rather than the session timezone
+        return f"'{month.isoformat()} 00:00:00+00'"
+    return f"'{month.isoformat()}'"
+
+
+def _range(table: str, month: date) -> str:
+    return f"FROM ({_bound(table, month)}) TO ({_bound(table, add_months(month, 1))})"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_ddl(table: str, month: date, parent: Optional[str] = None) -> str:
+    """CREATE statement for one month of `table` (attached to `parent`, default the table itself)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {parent or table} "
+        f"FOR VALUES {_range(table, month)}"
+    )
+
+
+def _month_filter(table: str, month: date) -> str:
+    key = PARTITIONED_TABLES[table]
+    return f"{key} >= {_bound(table, month)} AND {key} < {_bound(table, add_months(month, 1))}"
+
+
+def _move_default_rows(db: Session, table: str, month: date, parent: Optional[str] = None) -> int:
+    """
+    Create one month's partition out of rows already sitting in the DEFAULT
+    partition, which CREATE ... PARTITION OF would reject: build the month
+    as a plain table, move its rows out of DEFAULT, then attach it.
+    Returns the rows moved (0, creating nothing, if DEFAULT holds none). Does not commit.
+    """
+    default = default_partition_name(table)
+    if db.execute(text(f"SELECT 1 FROM {default} WHERE {_month_filter(table, month)} LIMIT 1")).first() is None:
+        return 0
+
+    name = partition_name(table, month)
+    parent = parent or table
+    db.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = db.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {_month_filter(table, month)} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )).rowcount
+    db.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES {_range(table, month)}"))
+    logger.warning(f"Moved {moved} rows from {default} into new partition {name}")
+    return moved
+
+
+def list_partitions(db: Session, table: str) -> List[str]:
+    """Names of the partitions currently attached to a table"""
+    rows = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": table})
+    return [name for (name,) in rows]
+
+
+def create_partitions(
+    db: Session,
+    table: str,
+    first_month: date,
+    last_month: date,
+    parent: Optional[str] = None
+) -> List[str]:
+    """
+    Create any missing monthly partitions from first_month to last_month.
+    Rows for a new month already in the DEFAULT partition are moved into it.
+    Does not commit.
+    """
+    existing = set(list_partitions(db, parent or table))
+    has_default = default_partition_name(table) in existing
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(table, month)
+        if name not in existing:
+            if not (has_default and _move_default_rows(db, table, month, parent)):
+                db.execute(text(partition_ddl(table, month, parent)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def rollup_rank_month(db: Session, month: date) -> int:
+    """
+    Fold one month of rank checks into rank_tracking_weekly. Weeks that
+    straddle months are merged with what the neighbouring month wrote, so
+    run it in the same transaction as the detach.
+    """
+    result = db.execute(text(f"""
+        INSERT INTO rank_tracking_weekly AS w (
+            keyword_id, project_id, tracked_url, week_start,
+            best_position, worst_position, position_sum, ranked_checks, checks
+        )
+        SELECT keyword_id, project_id, tracked_url,
+               date_trunc('week', checked_at AT TIME ZONE 'UTC')::date,
+               min(rank_position), max(rank_position),
+               coalesce(sum(rank_position), 0), count(rank_position), count(*)
+        FROM {partition_name("rank_tracking", month)}
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (keyword_id, project_id, tracked_url, week_start) DO UPDATE SET
+            best_position = least(w.best_position, excluded.best_position),
+            worst_position = greatest(w.worst_position, excluded.worst_position),
+            position_sum = w.position_sum + excluded.position_sum,
+            ranked_checks = w.ranked_checks + excluded.ranked_checks,
+            checks = w.checks + excluded.checks
+    """))
+    return max(result.rowcount, 0)
+
+
+def rollup_snapshot_month(db: Session, month: date) -> int:
+    """Keep the first keyframe of each week of one month in serp_snapshot_weekly"""
+    result = db.execute(text(f"""
+        INSERT INTO serp_snapshot_weekly AS w (keyword_id, week_start, snapshot_date, serp_features, items)
+        SELECT DISTINCT ON (keyword_id, date_trunc('week', snapshot_date))
+               keyword_id, date_trunc('week', snapshot_date)::date, snapshot_date, serp_features, data -> 'items'
+        FROM {partition_name("serp_snapshot_frames", month)}
+        WHERE is_keyframe
+        ORDER BY keyword_id, date_trunc('week', snapshot_date), snapshot_date
+        ON CONFLICT (keyword_id, week_start) DO UPDATE SET
+            snapshot_date = excluded.snapshot_date,
+            serp_features = excluded.serp_features,
+            items = excluded.items
+        WHERE excluded.snapshot_date < w.snapshot_date
+    """))
+    return max(result.rowcount, 0)
+
+
+def promote_orphaned_deltas(db: Session, cutoff: date) -> int:
+    """
+    Rewrite frames dated on or after `cutoff` whose keyframe is older as
+    keyframes, so they still decode once the keyframe's month is detached.
+    """
+    deltas = db.execute(text("""
+        SELECT d.id, d.snapshot_date, d.data, k.data
+        FROM serp_snapshot_frames d
+        JOIN serp_snapshot_frames k
+          ON k.keyword_id = d.keyword_id AND k.snapshot_date = d.base_date AND k.is_keyframe
+        WHERE NOT d.is_keyframe AND d.base_date < :cutoff
+          AND d.snapshot_date >= :cutoff AND d.snapshot_date < :horizon
+    """), {"cutoff": cutoff, "horizon": cutoff + timedelta(days=settings.SERP_KEYFRAME_INTERVAL_DAYS)}).all()
+
+    promote = text("""
+        UPDATE serp_snapshot_frames
+        SET is_keyframe = true, base_date = snapshot_date, data = :data
+        WHERE id = :id AND snapshot_date = :snapshot_date
+    """).bindparams(bindparam("data", type_=JSONB))
+    for frame_id, snapshot_date, delta, keyframe in deltas:
+        db.execute(promote, {
+            "id": frame_id,
+            "snapshot_date": snapshot_date,
+            "data": {"items": apply_delta(keyframe["items"], delta)},
+        })
+    return len(deltas)
+
+
+def detach_partition(db: Session, table: str, month: date, drop: bool = False) -> None:
+    """Detach (and optionally drop) one month's partition. Does not commit."""
+    name = partition_name(table, month)
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if drop:
+        db.execute(text(f"DROP TABLE {name}"))
+
+
+def expired_months(db: Session, table: str, today: date) -> List[date]:
+    """Attached months that fall entirely before the retention cutoff"""
+    cutoff = add_months(month_start(today), -settings.RANK_RAW_RETENTION_MONTHS)
+    months = (partition_month(table, name) for name in list_partitions(db, table))
+    return sorted(month for month in months if month is not None and month < cutoff)
@@ -0,0 +1,97 @@
+"""
+Compact typed records for parsed provider results.
+Parsers build slotted dataclasses instead of per-item dicts: about a third
+of the memory, and attribute access for the ingest path. Records also
+answer the read-only mapping calls the old dict results supported
+(record["url"], record.get("title"), dict(record)), so existing callers
+keep working; as_dict() / to_jsonable convert them at JSON boundaries.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+R = TypeVar("R", bound="Record")
+
+
+class Record:
+    """Mapping-style compatibility shim shared by the result records"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def keys(self) -> List[str]:
+        return list(self.__slots__)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Dict[str, Any]) -> R:
+        return cls(**{key: data.get(key) for key in cls.__slots__})
+
+
+@dataclass(slots=True)
+class SerpItem(Record):
+    """One organic SERP result"""
+    position: Optional[int]
+    url: Optional[str]
+    domain: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+    serp_features: Optional[List[str]] = None
+
+
+@dataclass(slots=True)
+class KeywordData(Record):
+    """Search metrics for one keyword"""
+    keyword: Optional[str]
+    search_volume: Optional[int]
+    cpc: Optional[float]
+    competition: Optional[float]
+    keyword_difficulty: Optional[int]
+
+
+@dataclass(slots=True)
+class Backlink(Record):
+    """One backlink pointing at a target domain"""
+    url_from: Optional[str]
+    url_to: Optional[str]
+    domain_from: Optional[str]
+    page_from_rank: Optional[int]
+    domain_from_rank: Optional[int]
+    anchor: Optional[str]
+    link_attribute: Optional[Any]
+    first_seen: Optional[str]
+    last_seen: Optional[str]
+
+
+@dataclass(slots=True)
+class ReferringDomain(Record):
+    """One domain linking to a target domain"""
+    domain: Optional[str]
+    backlinks: Optional[int]
+    rank: Optional[int]
+    first_seen: Optional[str]
+    last_seen: Optional[str]
+
+
+def to_jsonable(value: Any) -> Any:
+    """json.dumps default= hook: records become dicts, anything else a string"""
+    if isinstance(value, Record):
+        return value.as_dict()
+    return str(value)
+
+
+def decode_records(result: Dict, key: str, record: Type[Record]) -> Dict:
+    """Turn the item dicts of a result that went through JSON back into records"""
+    items = result.get(key)
+    if not items or isinstance(items[0], Record):
+        return result
+    return {**result, key: [record.from_dict(item) for item in items]}
@@ -0,0 +1,358 @@
+"""
+Bulk writes for rank checks and SERP snapshots.
+Callers collect a batch of checks in a RankIngest and flush it once:
+rank rows go in as one multi-row INSERT, and each keyword's SERP becomes a
+single snapshot frame (a keyframe, or a delta against its latest keyframe;
+see app/services/serp_delta.py) written with multi-row
+INSERT ... ON CONFLICT (keyword_id, snapshot_date) DO UPDATE, through a
+COPY-loaded staging table for large batches on psycopg2. Used by the
+rank-check tasks and the rank tracking router. Every flush also folds its
+rank checks into the rank_daily rollup that history charts read and the
+current_rank table behind the tracked-keyword listing, in the same
+transaction as the raw rows.
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, case, delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.rank_tracking import CurrentRank, RankDaily, RankTracking
+from app.models.serp_snapshot import SerpSnapshotFrame, SerpSnapshotRef
+from app.services.serp_delta import Row, encode_frame, pack_results
+from app.services.serp_snapshots import latest_keyframes
+
+FRAME_COLUMNS = ("keyword_id", "snapshot_date", "is_keyframe", "base_date", "serp_features", "data")
+FRAME_CONFLICT = ("keyword_id", "snapshot_date")
+REF_COLUMNS = ("keyword_id", "source_keyword_id", "snapshot_date")
+REF_CONFLICT = ("keyword_id", "snapshot_date")
+DAILY_CONFLICT = ("keyword_id", "day", "tracked_url")
+CURRENT_CONFLICT = ("project_id", "keyword_id", "tracked_url")
+
+
+def find_rank_position(tracked_url: str, serp_results: Iterable) -> Optional[int]:
+    """Position of the tracked URL in a SERP (None if not ranking)"""
+    for result in serp_results:
+        if result.url and tracked_url in result.url:
+            return result.position
+    return None
+
+
+def _check_day(checked_at: datetime) -> date:
+    """UTC day of a check (naive datetimes are already UTC)"""
+    if checked_at.tzinfo is not None:
+        checked_at = checked_at.astimezone(timezone.utc)
+    return checked_at.date()
+
+
+def _least(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _greatest(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+class RankIngest:
+    """
+    One batch of rank checks and SERP snapshots, written by flush().
+    Each keyword ends up with either its own snapshot frame or a reference
+    to another keyword's frame for the day; the last call for a keyword wins.
+    """
+
+    def __init__(self, snapshot_date: Optional[date] = None):
+        self.snapshot_date = snapshot_date or date.today()
+        self.ranks: List[Dict[str, Any]] = []
+        self.snapshots: Dict[Any, Tuple[Optional[List[str]], List[Row]]] = {}
+        self.refs: Dict[Any, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.ranks) + len(self.snapshots) + len(self.refs)
+
+    def add_rank(
+        self,
+        tracking,
+        rank_position: Optional[int],
+        checked_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a rank record for a tracking configuration (a RankTracking or
+        anything with the same attributes). Returns the row, id included.
+        """
+        row = {
+            "id": uuid.uuid4(),
+            "keyword_id": tracking.keyword_id,
+            "project_id": tracking.project_id,
+            "tracked_url": tracking.tracked_url,
+            "rank_position": rank_position,
+            "search_engine": tracking.search_engine,
+            "location_code": tracking.location_code,
+            "language_code": tracking.language_code,
+            "checked_at": checked_at or datetime.utcnow(),
+        }
+        self.ranks.append(row)
+        return row
+
+    def add_snapshot(self, keyword_id, serp_results: Sequence) -> None:
+        """Queue today's SERP for a keyword, replacing an earlier snapshot or reference"""
+        self.refs.pop(keyword_id, None)
+        features = serp_results[0].serp_features if serp_results else None
+        self.snapshots[keyword_id] = (features, pack_results(serp_results))
+
+    def add_reference(self, keyword_id, source_keyword_id) -> None:
+        """Point a keyword's snapshot for today at another keyword's frame"""
+        self.snapshots.pop(keyword_id, None)
+        self.refs[keyword_id] = source_keyword_id
+
+    def clear(self) -> None:
+        self.ranks, self.snapshots, self.refs = [], {}, {}
+
+    def frame_rows(self, keyframes: Dict[Any, Tuple[date, List[Row]]]) -> List[Dict[str, Any]]:
+        """
+        Snapshot frames for the batch, given each keyword's latest keyframe
+        before the snapshot date ({keyword_id: (date, rows)}).
+        """
+        frames = []
+        for keyword_id, (features, rows) in self.snapshots.items():
+            is_keyframe, base_date, data = encode_frame(rows, self.snapshot_date, keyframes.get(keyword_id))
+            frames.append({
+                "keyword_id": keyword_id,
+                "snapshot_date": self.snapshot_date,
+                "is_keyframe": is_keyframe,
+                "base_date": base_date,
+                "serp_features": features,
+                "data": data,
+            })
+        return frames
+
+    @staticmethod
+    def merge_daily(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine two rank_daily rows for the same key, the way the SQL upsert in
+        flush does (NULL positions are ignored by best and worst).
+        """
+        latest = new if new["last_checked_at"] >= old["last_checked_at"] else old
+        return {
+            **old,
+            "best_position": _least(old["best_position"], new["best_position"]),
+            "worst_position": _greatest(old["worst_position"], new["worst_position"]),
+            "last_position": latest["last_position"],
+            "last_checked_at": latest["last_checked_at"],
+            "position_sum": old["position_sum"] + new["position_sum"],
+            "ranked_checks": old["ranked_checks"] + new["ranked_checks"],
+            "checks": old["checks"] + new["checks"],
+        }
+
+    def daily_rows(self) -> List[Dict[str, Any]]:
+        """The batch's rank checks rolled up per keyword, day and tracked URL"""
+        days: Dict[Tuple, Dict[str, Any]] = {}
+        for rank in self.ranks:
+            row = {
+                "keyword_id": rank["keyword_id"],
+                "day": _check_day(rank["checked_at"]),
+                "tracked_url": rank["tracked_url"],
+                "project_id": rank["project_id"],
+                "best_position": rank["rank_position"],
+                "worst_position": rank["rank_position"],
+                "last_position": rank["rank_position"],
+                "last_checked_at": rank["checked_at"],
+                "position_sum": rank["rank_position"] or 0,
+                "ranked_checks": int(rank["rank_position"] is not None),
+                "checks": 1,
+            }
+            key = tuple(row[column] for column in DAILY_CONFLICT)
+            days[key] = self.merge_daily(days[key], row) if key in days else row
+        return list(days.values())
+
+    @staticmethod
+    def merge_current(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a check to a current_rank row; an older check leaves it unchanged"""
+        if old is None:
+            return new
+        if new["checked_at"] < old["checked_at"]:
+            return old
+        return {**new, "previous_position": old["rank_position"]}
+
+    def current_rows(self) -> List[List[Dict[str, Any]]]:
+        """
+        current_rank rows for the batch's checks, oldest first, split into
+        rounds with at most one row per key so each round can be upserted
+        on top of the last.
+        """
+        rounds: List[List[Dict[str, Any]]] = []
+        seen: Dict[Tuple, int] = {}
+        for rank in sorted(self.ranks, key=lambda rank: rank["checked_at"]):
+            row = {
+                "project_id": rank["project_id"],
+                "keyword_id": rank["keyword_id"],
+                "tracked_url": rank["tracked_url"],
+                "rank_id": rank["id"],
+                "rank_position": rank["rank_position"],
+                "previous_position": None,
+                "search_engine": rank["search_engine"],
+                "location_code": rank["location_code"],
+                "language_code": rank["language_code"],
+                "checked_at": rank["checked_at"],
+            }
+            key = tuple(row[column] for column in CURRENT_CONFLICT)
+            seen[key] = seen.get(key, -1) + 1
+            if seen[key] == len(rounds):
+                rounds.append([])
+            rounds[seen[key]].append(row)
+        return rounds
+
+    def ref_rows(self) -> List[Dict[str, Any]]:
+        return [
+            {"keyword_id": keyword_id, "source_keyword_id": source, "snapshot_date": self.snapshot_date}
+            for keyword_id, source in self.refs.items()
+        ]
+
+    def flush(self, db: Session) -> Dict[str, int]:
+        """Write the batch in the session's transaction (does not commit) and reset it"""
+        counts = {"ranks": len(self.ranks), "frames": len(self.snapshots), "refs": len(self.refs)}
+        if self.ranks:
+            db.execute(insert(RankTracking.__table__), self.ranks)
+            _upsert_daily(db, self.daily_rows())
+            for rows in self.current_rows():
+                _upsert_current(db, rows)
+
+        # A keyword re-checked today may switch between its own frame and a reference
+        for model, keyword_ids in ((SerpSnapshotRef, list(self.snapshots)), (SerpSnapshotFrame, list(self.refs))):
+            if keyword_ids:
+                db.execute(
+                    delete(model.__table__).where(
+                        model.snapshot_date == self.snapshot_date,
+                        model.keyword_id.in_(keyword_ids)
+                    )
+                )
+
+        if self.snapshots:
+            keyframes = latest_keyframes(db, list(self.snapshots), self.snapshot_date)
+            frames = self.frame_rows(keyframes)
+            if len(frames) >= settings.RANK_INGEST_COPY_MIN_ROWS and _copy_supported(db):
+                _copy_upsert(db, SerpSnapshotFrame.__table__, FRAME_COLUMNS, FRAME_CONFLICT, frames)
+            else:
+                _upsert(db, SerpSnapshotFrame.__table__, FRAME_COLUMNS, FRAME_CONFLICT, frames)
+
+        _upsert(db, SerpSnapshotRef.__table__, REF_COLUMNS, REF_CONFLICT, self.ref_rows())
+
+        self.clear()
+        return counts
+
+
+def _chunks(rows: List, size: int) -> Iterable[List]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _upsert(
+    db: Session,
+    table: Table,
+    columns: Sequence[str],
+    conflict: Sequence[str],
+    rows: List[Dict[str, Any]]
+) -> None:
+    """Multi-row INSERT ... ON CONFLICT DO UPDATE, RANK_INGEST_INSERT_CHUNK rows per statement"""
+    for chunk in _chunks(rows, settings.RANK_INGEST_INSERT_CHUNK):
+        stmt = pg_insert(table).values(chunk)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(conflict),
+            set_={column: stmt.excluded[column] for column in columns if column not in conflict}
+        ))
+
+
+def _upsert_daily(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Merge day rollups into rank_daily (see merge_daily)"""
+    table = RankDaily.__table__
+    for chunk in _chunks(rows, settings.RANK_INGEST_INSERT_CHUNK):
+        stmt = pg_insert(table).values(chunk)
+        new = stmt.excluded
+        is_latest = new.last_checked_at >= table.c.last_checked_at
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(DAILY_CONFLICT),
+            set_={
+                "best_position": func.least(table.c.best_position, new.best_position),
+                "worst_position": func.greatest(table.c.worst_position, new.worst_position),
+                "last_position": case((is_latest, new.last_position), else_=table.c.last_position),
+                "last_checked_at": func.greatest(table.c.last_checked_at, new.last_checked_at),
+                "position_sum": table.c.position_sum + new.position_sum,
+                "ranked_checks": table.c.ranked_checks + new.ranked_checks,
+                "checks": table.c.checks + new.checks,
+            }
+        ))
+
+
+def _upsert_current(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Move current_rank rows forward to newer checks (see merge_current)"""
+    table = CurrentRank.__table__
+    for chunk in _chunks(rows, settings.RANK_INGEST_INSERT_CHUNK):
+        stmt = pg_insert(table).values(chunk)
+        new = stmt.excluded
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=list(CURRENT_CONFLICT),
+            set_={
+                "rank_id": new.rank_id,
+                "rank_position": new.rank_position,
+                "previous_position": table.c.rank_position,
+                "search_engine": new.search_engine,
+                "location_code": new.location_code,
+                "language_code": new.language_code,
+                "checked_at": new.checked_at,
+            },
+            where=new.checked_at >= table.c.checked_at
+        ))
+
+
+def _copy_supported(db: Session) -> bool:
+    return db.get_bind().dialect.driver == "psycopg2"
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return r"\N"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _copy_upsert(
+    db: Session,
+    table: Table,
+    columns: Sequence[str],
+    conflict: Sequence[str],
+    rows: List[Dict[str, Any]]
+) -> None:
+    """
+    COPY rows into a session-local staging table, then merge them with one
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE. COPY itself cannot upsert.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(row[column]) for column in columns])
+    buffer.seek(0)
+
+    stage = f"{table.name}_stage"
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in conflict)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+            f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        cursor.execute(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {stage} "
+            f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {updates}"
+        )
+        # Several flushes can share a transaction
+        cursor.execute(f"DELETE FROM {stage}")
+    finally:
+        cursor.close()
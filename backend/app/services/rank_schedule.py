@@ -0,0 +1,132 @@
+"""
+When each tracked SERP is checked during the nightly window.
+Every SERP signature gets a deterministic offset inside a window of
+RANK_CHECK_WINDOW_HOURS, so checks are spread evenly and a keyword is
+checked at the same time every night. The window opens at
+RANK_CHECK_WINDOW_START_HOUR UTC, or at that hour in the owner's timezone
+when RANK_CHECK_LOCAL_TIME is set. The scheduler tick enqueues only the
+checks that fall inside the current tick, and stores each keyword's next
+slot (keywords.next_rank_check_at) so later ticks only read keywords whose
+slot has come round.
+
+How often a SERP is checked adapts to its rank history: keywords whose
+position moved recently are checked nightly, stable ones (including those
+outside the top 100) back off to every RANK_CHECK_MAX_INTERVAL_DAYS days.
+Projects can lower that cap (rank_check_max_interval_days; 1 = nightly).
+"""
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.core.config import settings
+from app.services.dataforseo import SerpSignature
+
+
+def check_offset(signature: SerpSignature, window_seconds: Optional[int] = None) -> int:
+    """Seconds after the window opens at which a SERP is checked (stable across runs)"""
+    window_seconds = window_seconds or int(settings.RANK_CHECK_WINDOW_HOURS * 3600)
+    digest = hashlib.sha1(repr(signature).encode()).digest()
+    return int.from_bytes(digest[:8], "big") % window_seconds
+
+
+def _user_zone(tz_name: Optional[str]) -> timezone:
+    if settings.RANK_CHECK_LOCAL_TIME and tz_name:
+        try:
+            return ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.utc
+
+
+def window_start(day: date, tz_name: Optional[str] = None) -> datetime:
+    """UTC time the window for `day` opens (in the user's timezone when local time is enabled)"""
+    local = datetime(day.year, day.month, day.day, settings.RANK_CHECK_WINDOW_START_HOUR,
+                     tzinfo=_user_zone(tz_name))
+    return local.astimezone(timezone.utc)
+
+
+def next_check_at(
+    signature: SerpSignature,
+    start: datetime,
+    end: datetime,
+    tz_name: Optional[str] = None
+) -> Optional[datetime]:
+    """The SERP's scheduled check time if it falls in [start, end), else None"""
+    offset = timedelta(seconds=check_offset(signature))
+    # A user's window for a UTC day can open the day before or after it
+    for day in (start.date() - timedelta(days=1), start.date(), start.date() + timedelta(days=1)):
+        at = window_start(day, tz_name) + offset
+        if start <= at < end:
+            return at
+    return None
+
+
+def next_check_after(signature: SerpSignature, after: datetime, tz_name: Optional[str] = None) -> datetime:
+    """The SERP's first scheduled check time at or after `after`"""
+    offset = timedelta(seconds=check_offset(signature))
+    day = after.date() - timedelta(days=1)
+    while True:
+        at = window_start(day, tz_name) + offset
+        if at >= after:
+            return at
+        day += timedelta(days=1)
+
+
+def tick_in_window(start: datetime, end: datetime) -> bool:
+    """
+    Whether any check can fall in [start, end). Always True with
+    RANK_CHECK_LOCAL_TIME, since some owner's window may be open.
+    """
+    if settings.RANK_CHECK_LOCAL_TIME:
+        return True
+    window = timedelta(hours=settings.RANK_CHECK_WINDOW_HOURS)
+    for day in (start.date() - timedelta(days=1), start.date()):
+        opens = window_start(day)
+        if opens < end and start < opens + window:
+            return True
+    return False
+
+
+def current_tick(now: Optional[datetime] = None) -> datetime:
+    """Start of the scheduler tick containing `now` (UTC, aligned to RANK_CHECK_TICK_MINUTES)"""
+    now = now or datetime.now(timezone.utc)
+    tick = settings.RANK_CHECK_TICK_MINUTES * 60
+    epoch = int(now.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % tick, timezone.utc)
+
+
+def check_interval_days(
+    samples: int,
+    best_position: Optional[int],
+    worst_position: Optional[int],
+    max_interval_days: Optional[int] = None
+) -> int:
+    """
+    Days between checks for a keyword, from the best and worst position of
+    its last RANK_HISTORY_CHECKS days checked (from rank_daily). Positions
+    outside the top 100 (or not ranking) count as 101, so entering or leaving
+    the SERP is a big move.
+    """
+    cap = settings.RANK_CHECK_MAX_INTERVAL_DAYS
+    if max_interval_days is not None:
+        cap = min(cap, max_interval_days)
+    cap = max(1, cap)
+    if samples < settings.RANK_HISTORY_CHECKS or best_position is None or worst_position is None:
+        return 1
+    spread = worst_position - best_position
+    if spread >= settings.RANK_VOLATILE_SPREAD:
+        return 1
+    if spread > 0:
+        return min(2, cap)
+    return cap
+
+
+def is_check_due(last_checked_at: Optional[datetime], interval_days: int, at: datetime) -> bool:
+    """Whether a check scheduled for `at` is due, given the last check time"""
+    if last_checked_at is None or interval_days <= 1:
+        return True
+    if last_checked_at.tzinfo is None:
+        last_checked_at = last_checked_at.replace(tzinfo=timezone.utc)
+    # Nightly slots drift by up to a window; half a day of slack keeps the cadence
+    return at - last_checked_at >= timedelta(days=interval_days) - timedelta(hours=12)
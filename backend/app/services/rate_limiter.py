@@ -0,0 +1,203 @@
+"""
+Redis-coordinated rate limiting for provider credentials.
+Each DataForSEO login gets a token bucket (requests per second) and an
+AIMD concurrency window (requests in flight) shared by every API instance
+and Celery worker. Throttled responses halve the window and pause the
+bucket briefly; successful responses grow the window back by roughly one
+slot per window's worth of requests.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# DataForSEO top-level status codes for rate-limit and simultaneous-request limits
+THROTTLE_STATUS_CODES = {40202, 40209}
+
+# The top-level status_code precedes "tasks" in every DataForSEO response,
+# so it can be read without parsing the whole (possibly large) body
+_STATUS_CODE_RE = re.compile(rb'"status_code"\s*:\s*(\d+)')
+
+# KEYS: state hash, lease zset
+# ARGV: rate (tokens/s), burst, initial window, lease id, lease ttl (ms), full-window retry (ms)
+# Returns 0 when a slot was granted, otherwise milliseconds to wait before retrying
+_ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'window', 'paused_until')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local window = tonumber(state[3]) or tonumber(ARGV[3])
+local paused_until = tonumber(state[4]) or 0
+
+if paused_until > now then
+    return paused_until - now
+end
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+
+local wait = 0
+if redis.call('ZCARD', KEYS[2]) >= math.max(1, math.floor(window)) then
+    wait = tonumber(ARGV[6])
+elseif tokens < 1 then
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+else
+    tokens = tokens - 1
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[5]), ARGV[4])
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'window', window)
+redis.call('PEXPIRE', KEYS[1], 3600000)
+redis.call('PEXPIRE', KEYS[2], 3600000)
+return wait
+"""
+
+# KEYS: state hash, lease zset
+# ARGV: lease id, outcome ("ok" | "throttled" | "error"), min window, max window,
+#       initial window, backoff (ms)
+# Returns the new window
+_RELEASE = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(redis.call('HGET', KEYS[1], 'window')) or tonumber(ARGV[5])
+
+if ARGV[2] == 'throttled' then
+    -- Decrease at most once per backoff period, however many requests were rejected
+    local paused_until = tonumber(redis.call('HGET', KEYS[1], 'paused_until')) or 0
+    if paused_until <= now then
+        window = math.max(tonumber(ARGV[3]), window / 2)
+        redis.call('HSET', KEYS[1], 'paused_until', now + tonumber(ARGV[6]))
+    end
+elseif ARGV[2] == 'ok' then
+    window = math.min(tonumber(ARGV[4]), window + 1 / window)
+end
+
+redis.call('HSET', KEYS[1], 'window', window)
+return tostring(window)
+"""
+
+
+def is_dataforseo_throttled(response: httpx.Response) -> bool:
+    """Whether DataForSEO rejected a request for exceeding rate or concurrency limits"""
+    if response.status_code == 429:
+        return True
+    match = _STATUS_CODE_RE.search(response.content[:512])
+    return bool(match) and int(match.group(1)) in THROTTLE_STATUS_CODES
+
+
+class RateLimiter:
+    """
+    Token bucket plus AIMD concurrency window stored in Redis.
+    Redis errors are logged and the request proceeds unthrottled, so an
+    outage degrades to the pre-limiter behaviour rather than blocking calls.
+    """
+
+    PREFIX = "ratelimit"
+    FULL_WINDOW_RETRY_MS = 50
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        initial_window: Optional[int] = None,
+        min_window: Optional[int] = None,
+        max_window: Optional[int] = None,
+        backoff: Optional[float] = None,
+        retries: Optional[int] = None,
+        redis_client=None
+    ):
+        self.rate = rate or settings.DATAFORSEO_REQUESTS_PER_SECOND
+        self.burst = burst or settings.DATAFORSEO_BURST
+        self.initial_window = initial_window or settings.DATAFORSEO_CONCURRENCY_INITIAL
+        self.min_window = min_window or settings.DATAFORSEO_CONCURRENCY_MIN
+        self.max_window = max_window or settings.DATAFORSEO_CONCURRENCY_MAX
+        self.backoff = settings.DATAFORSEO_THROTTLE_BACKOFF if backoff is None else backoff
+        self.retries = settings.DATAFORSEO_THROTTLE_RETRIES if retries is None else retries
+        # Requests outlive their lease only if they outlive the HTTP timeout
+        self.lease_ttl_ms = int((settings.DATAFORSEO_TIMEOUT + 10) * 1000)
+        self.keys = [f"{self.PREFIX}:{name}", f"{self.PREFIX}:{name}:inflight"]
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        return self._redis or get_async_redis()
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a token and a concurrency slot. Returns a lease id (None if Redis is unavailable)."""
+        lease = uuid.uuid4().hex
+        acquire = self.redis.register_script(_ACQUIRE)
+        while True:
+            try:
+                wait = await acquire(keys=self.keys, args=[
+                    self.rate, self.burst, self.initial_window, lease,
+                    self.lease_ttl_ms, self.FULL_WINDOW_RETRY_MS
+                ])
+            except Exception as e:
+                logger.warning(f"Rate limiter unavailable, proceeding unthrottled: {e}")
+                return None
+            if not wait:
+                return lease
+            await asyncio.sleep(int(wait) / 1000)
+
+    async def release(self, lease: Optional[str], outcome: str = "ok") -> None:
+        """Free a lease and feed the outcome ("ok", "throttled" or "error") back into the window"""
+        if lease is None:
+            return
+        release = self.redis.register_script(_RELEASE)
+        try:
+            await release(keys=self.keys, args=[
+                lease, outcome, self.min_window, self.max_window,
+                self.initial_window, int(self.backoff * 1000)
+            ])
+        except Exception as e:
+            logger.warning(f"Rate limiter release failed: {e}")
+
+    async def call(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        is_throttled: Callable[[httpx.Response], bool] = is_dataforseo_throttled
+    ) -> httpx.Response:
+        """
+        Send a request under the limiter, retrying throttled responses.
+        The last throttled response is returned once retries run out.
+        """
+        for attempt in range(self.retries + 1):
+            lease = await self.acquire()
+            outcome = "error"
+            try:
+                response = await send()
+                outcome = "throttled" if is_throttled(response) else "ok"
+            finally:
+                await self.release(lease, outcome)
+
+            if outcome == "ok":
+                return response
+
+            logger.info(f"Throttled by provider ({self.keys[0]}), attempt {attempt + 1}")
+            if lease is None:
+                # No shared pause to wait on; back off locally
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        return response
+
+
+def get_dataforseo_limiter(login: str) -> Optional[RateLimiter]:
+    """Limiter shared by every client of one DataForSEO login (None when disabled)"""
+    if not settings.DATAFORSEO_RATE_LIMIT_ENABLED:
+        return None
+    login_hash = hashlib.sha256(login.encode()).hexdigest()[:16]
+    return RateLimiter(f"dataforseo:{login_hash}")
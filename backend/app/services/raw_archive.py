@@ -0,0 +1,168 @@
+"""
+Content-addressed archive of raw DataForSEO responses.
+Bodies are stored once per SHA-256 under RAW_ARCHIVE_DIR, compressed with
+zstd when the zstandard package is installed (zlib otherwise), and every
+fetch is recorded in a per-day JSONL index. Parsers can be re-run over the
+archive later (see app/tasks/reparse_archive.py) without paying for the
+data again. The archive is opt-in (RAW_ARCHIVE_ENABLED) and pruned to
+RAW_ARCHIVE_RETENTION_DAYS by the prune_raw_archive maintenance task.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import zlib
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional; fall back to zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ZSTD_LEVEL = 10
+CODEC_EXTENSIONS = {"zstd": ".zst", "zlib": ".zz"}
+
+
+def _compress(body: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return zlib.compress(body, 9)
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst archive objects")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class RawArchive:
+    """Filesystem archive of raw response bodies plus an append-only fetch index"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.RAW_ARCHIVE_DIR)
+        self.codec = "zstd" if zstandard is not None else "zlib"
+
+    def object_path(self, digest: str, codec: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}{CODEC_EXTENSIONS[codec]}"
+
+    def put(self, endpoint: str, body: bytes) -> str:
+        """Store a response body (once per content hash) and index the fetch. Returns the digest."""
+        digest = hashlib.sha256(body).hexdigest()
+
+        existing = next(
+            (codec for codec in CODEC_EXTENSIONS if self.object_path(digest, codec).exists()),
+            None
+        )
+        codec = existing or self.codec
+        path = self.object_path(digest, codec)
+        if existing is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+            tmp.write_bytes(_compress(body, codec))
+            os.replace(tmp, path)
+        else:
+            # Mark the object as recently fetched so a concurrent prune keeps it
+            os.utime(path)
+
+        entry = {
+            "digest": digest,
+            "codec": codec,
+            "endpoint": endpoint,
+            "fetched_at": datetime.utcnow().isoformat(),
+            "snapshot_date": date.today().isoformat(),
+            "size": len(body),
+        }
+        index_path = self.root / "index" / f"{entry['snapshot_date']}.jsonl"
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        # One write per line so concurrent appenders do not interleave
+        with open(index_path, "a") as index:
+            index.write(json.dumps(entry) + "\n")
+        return digest
+
+    async def aput(self, endpoint: str, body: bytes) -> Optional[str]:
+        """Archive off the event loop. Failures are logged, never raised."""
+        try:
+            return await asyncio.to_thread(self.put, endpoint, body)
+        except Exception as e:
+            logger.warning(f"Raw archive write failed for {endpoint}: {e}")
+            return None
+
+    def get(self, digest: str, codec: str) -> bytes:
+        """Read back a raw response body"""
+        return _decompress(self.object_path(digest, codec).read_bytes(), codec)
+
+    def iter_index(
+        self,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        endpoint_prefix: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """Yield index entries in date order, optionally filtered"""
+        index_dir = self.root / "index"
+        if not index_dir.exists():
+            return
+        for index_path in sorted(index_dir.glob("*.jsonl")):
+            day = date.fromisoformat(index_path.stem)
+            if (since and day < since) or (until and day > until):
+                continue
+            with open(index_path) as index:
+                for line in index:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if endpoint_prefix and not entry["endpoint"].startswith(endpoint_prefix):
+                        continue
+                    yield entry
+
+    def prune(self, before: date) -> Dict[str, int]:
+        """
+        Drop index files for days before `before`, then every object no
+        remaining index entry references. Objects fetched on or after
+        `before` (by mtime) are kept even if unindexed, so a put() racing
+        the prune never loses its body.
+        """
+        removed = {"index_files": 0, "objects": 0}
+        index_dir = self.root / "index"
+        if index_dir.exists():
+            for index_path in index_dir.glob("*.jsonl"):
+                if date.fromisoformat(index_path.stem) < before:
+                    index_path.unlink()
+                    removed["index_files"] += 1
+
+        referenced: Set[str] = {entry["digest"] for entry in self.iter_index()}
+        cutoff = datetime.combine(before, time.min).timestamp()
+        objects_dir = self.root / "objects"
+        if objects_dir.exists():
+            for path in objects_dir.glob("*/*"):
+                digest = path.name.split(".", 1)[0]
+                if digest in referenced or path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink()
+                removed["objects"] += 1
+        return removed
+
+
+_archive: Optional[RawArchive] = None
+
+
+def get_raw_archive() -> Optional[RawArchive]:
+    """Process-wide archive (None when disabled)"""
+    global _archive
+    if not settings.RAW_ARCHIVE_ENABLED:
+        return None
+    if not os.path.isabs(settings.RAW_ARCHIVE_DIR):
+        # A relative path would land wherever each worker happens to start
+        logger.warning(f"RAW_ARCHIVE_DIR must be an absolute path; archive disabled ({settings.RAW_ARCHIVE_DIR!r})")
+        return None
+    if _archive is None:
+        _archive = RawArchive()
+    return _archive
@@ -0,0 +1,63 @@
+"""Redis-backed cache of parsed SERP responses"""
+import hashlib
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.services.provider_types import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+class SerpCache:
+    """
+    Caches successful SERP results by request signature for same-day reuse.
+    Entries are zlib-compressed JSON and never outlive the UTC day they were
+    fetched on. Redis errors and unreadable entries are logged and treated as
+    cache misses.
+    """
+
+    PREFIX = "serp"
+
+    def __init__(self, ttl: Optional[int] = None, redis_client=None):
+        self.ttl = settings.SERP_CACHE_TTL if ttl is None else ttl
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        return self._redis or get_async_redis()
+
+    @classmethod
+    def key(cls, signature: Tuple, day: Optional[date] = None) -> str:
+        """Cache key for a request signature on a given (default: current) day"""
+        digest = hashlib.sha256(json.dumps(list(signature)).encode()).hexdigest()
+        return f"{cls.PREFIX}:{(day or datetime.utcnow().date()).isoformat()}:{digest}"
+
+    async def get(self, signature: Tuple) -> Optional[Dict]:
+        """Return the cached result for a signature, or None"""
+        try:
+            blob = await self.redis.get(self.key(signature))
+        except Exception as e:
+            logger.warning(f"SERP cache read failed: {e}")
+            return None
+        if blob is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError) as e:
+            logger.warning(f"SERP cache entry unreadable, refetching: {e}")
+            return None
+
+    async def set(self, signature: Tuple, result: Dict) -> None:
+        """Store a successful result for a signature"""
+        if not result.get("success"):
+            return
+        blob = zlib.compress(json.dumps(result, default=to_jsonable).encode())
+        try:
+            await self.redis.set(self.key(signature), blob, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"SERP cache write failed: {e}")
@@ -0,0 +1,88 @@
+"""
+Keyframe + delta encoding for stored SERPs.
+A keyframe holds every organic result as a compact row
+[position, url, domain, title, description]. A delta is taken against
+the latest keyframe rather than the previous day, so any day decodes from
+two frames:
+    moved:   [[keyframe_position, new_position], ...]
+    entered: [row, ...]           new results, and results whose text changed
+    left:    [keyframe_position, ...]
+Most positions hold steady from day to day, so a delta is a small fraction
+of a keyframe.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+Row = List[Any]
+
+
+def pack_results(results: Iterable) -> List[Row]:
+    """
+    Compact rows for a parsed SERP, ordered by position. Results without a
+    position are skipped and a repeated position keeps its first result.
+    """
+    rows = {}
+    for result in results:
+        if result.position is None or result.position in rows:
+            continue
+        rows[result.position] = [
+            result.position, result.url or "", result.domain or "", result.title, result.description
+        ]
+    return [rows[position] for position in sorted(rows)]
+
+
+def encode_delta(keyframe: List[Row], rows: List[Row]) -> Optional[Dict[str, List]]:
+    """
+    Delta from a keyframe to a SERP's rows, or None when a new keyframe is
+    cheaper: more than SERP_DELTA_MAX_RATIO of the keyframe entered, or a
+    URL appears twice (results are matched by URL).
+    """
+    base = {row[1]: row for row in keyframe}
+    if len(base) != len(keyframe) or len({row[1] for row in rows}) != len(rows):
+        return None
+
+    moved, entered, left = [], [], []
+    for row in rows:
+        old = base.get(row[1])
+        if old is None:
+            entered.append(row)
+        elif old[2:] != row[2:]:
+            left.append(old[0])
+            entered.append(row)
+        elif old[0] != row[0]:
+            moved.append([old[0], row[0]])
+    urls = {row[1] for row in rows}
+    left.extend(row[0] for row in keyframe if row[1] not in urls)
+
+    if len(entered) > settings.SERP_DELTA_MAX_RATIO * max(len(keyframe), 1):
+        return None
+    return {"moved": moved, "entered": entered, "left": left}
+
+
+def apply_delta(keyframe: List[Row], delta: Dict[str, List]) -> List[Row]:
+    """Rows of the SERP a delta was encoded from, ordered by position"""
+    by_position = {row[0]: row for row in keyframe}
+    gone = set(delta["left"]) | {source for source, _ in delta["moved"]}
+    rows = [row for position, row in by_position.items() if position not in gone]
+    rows.extend([target, *by_position[source][1:]] for source, target in delta["moved"])
+    rows.extend(delta["entered"])
+    return sorted(rows, key=lambda row: row[0])
+
+
+def encode_frame(
+    rows: List[Row],
+    snapshot_date: date,
+    keyframe: Optional[Tuple[date, List[Row]]] = None
+) -> Tuple[bool, date, Dict[str, List]]:
+    """
+    Frame for a day's SERP as (is_keyframe, base_date, data). A delta is
+    used while the latest keyframe (date, rows) is younger than
+    SERP_KEYFRAME_INTERVAL_DAYS and the change is small enough.
+    """
+    if keyframe and (snapshot_date - keyframe[0]).days < settings.SERP_KEYFRAME_INTERVAL_DAYS:
+        delta = encode_delta(keyframe[1], rows)
+        if delta is not None:
+            return False, keyframe[0], delta
+    return True, snapshot_date, {"items": rows}
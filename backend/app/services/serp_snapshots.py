@@ -0,0 +1,331 @@
+"""
+Read path for stored SERP snapshots.
+Snapshots are stored as daily frames, a keyframe or a delta against one
+(see app/services/serp_delta.py); days written before frames existed are
+read from the row-per-result serp_snapshots table. Follows SerpSnapshotRef
+rows so keywords that share a SERP with another keyword see the shared
+SERP as their own; hand_over_snapshots keeps those references valid when
+the keyword holding the SERP stops being tracked.
+"""
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.models.serp_snapshot import SerpSnapshot, SerpSnapshotFrame, SerpSnapshotRef, SerpSnapshotWeekly
+from app.services.serp_delta import Row, apply_delta, encode_frame
+
+Source = Tuple[UUID, date]  # (keyword whose snapshot holds the SERP, snapshot_date)
+
+
+def _snapshot_dict(snapshot: SerpSnapshot) -> Dict:
+    """Convert a snapshot row to the parsed-result shape used by the API"""
+    return {
+        "position": snapshot.rank_position,
+        "url": snapshot.url,
+        "domain": snapshot.domain,
+        "title": snapshot.title,
+        "description": snapshot.description,
+        "serp_features": snapshot.serp_features,
+    }
+
+
+def _row_dict(row: Row, serp_features: Optional[List[str]]) -> Dict:
+    """Convert a decoded frame row to the same shape"""
+    position, url, domain, title, description = row
+    return {
+        "position": position,
+        "url": url,
+        "domain": domain,
+        "title": title,
+        "description": description,
+        "serp_features": serp_features,
+    }
+
+
+def latest_keyframes(db: Session, keyword_ids: List[UUID], before: date) -> Dict[UUID, Tuple[date, List[Row]]]:
+    """
+    Each keyword's latest keyframe dated before `before` and within
+    SERP_KEYFRAME_INTERVAL_DAYS of it, as {keyword_id: (date, rows)}.
+    """
+    if not keyword_ids:
+        return {}
+
+    rows = db.query(
+        SerpSnapshotFrame.keyword_id,
+        SerpSnapshotFrame.snapshot_date,
+        SerpSnapshotFrame.data
+    ).filter(
+        SerpSnapshotFrame.keyword_id.in_(keyword_ids),
+        SerpSnapshotFrame.is_keyframe == True,
+        SerpSnapshotFrame.snapshot_date < before,
+        SerpSnapshotFrame.snapshot_date > before - timedelta(days=settings.SERP_KEYFRAME_INTERVAL_DAYS)
+    ).order_by(
+        SerpSnapshotFrame.keyword_id,
+        SerpSnapshotFrame.snapshot_date.desc()
+    ).distinct(SerpSnapshotFrame.keyword_id).all()
+
+    return {keyword_id: (snapshot_date, data["items"]) for keyword_id, snapshot_date, data in rows}
+
+
+def latest_snapshot_sources(db: Session, keyword_ids: List[UUID]) -> Dict[UUID, Source]:
+    """
+    Find where each keyword's latest SERP snapshot is stored.
+    Returns {keyword_id: (source_keyword_id, snapshot_date)}; keywords without
+    any snapshot are omitted.
+    """
+    if not keyword_ids:
+        return {}
+
+    sources: Dict[UUID, Source] = {}
+    for model in (SerpSnapshotFrame, SerpSnapshot):
+        own = db.query(
+            model.keyword_id,
+            func.max(model.snapshot_date)
+        ).filter(
+            model.keyword_id.in_(keyword_ids)
+        ).group_by(model.keyword_id).all()
+
+        for keyword_id, snapshot_date in own:
+            if keyword_id not in sources or snapshot_date > sources[keyword_id][1]:
+                sources[keyword_id] = (keyword_id, snapshot_date)
+
+    latest_ref = db.query(
+        SerpSnapshotRef.keyword_id,
+        func.max(SerpSnapshotRef.snapshot_date).label("max_date")
+    ).filter(
+        SerpSnapshotRef.keyword_id.in_(keyword_ids)
+    ).group_by(SerpSnapshotRef.keyword_id).subquery()
+
+    refs = db.query(SerpSnapshotRef).join(
+        latest_ref,
+        (SerpSnapshotRef.keyword_id == latest_ref.c.keyword_id) &
+        (SerpSnapshotRef.snapshot_date == latest_ref.c.max_date)
+    ).all()
+
+    for ref in refs:
+        current = sources.get(ref.keyword_id)
+        if current is None or ref.snapshot_date > current[1]:
+            sources[ref.keyword_id] = (ref.source_keyword_id, ref.snapshot_date)
+
+    return sources
+
+
+def snapshot_sources_on(db: Session, keyword_ids: List[UUID], snapshot_date: date) -> Dict[UUID, Source]:
+    """Where each keyword's SERP for one day is stored (keywords without one are omitted)"""
+    if not keyword_ids:
+        return {}
+
+    sources: Dict[UUID, Source] = {}
+    refs = db.query(SerpSnapshotRef.keyword_id, SerpSnapshotRef.source_keyword_id).filter(
+        SerpSnapshotRef.keyword_id.in_(keyword_ids),
+        SerpSnapshotRef.snapshot_date == snapshot_date
+    ).all()
+    for keyword_id, source_keyword_id in refs:
+        sources[keyword_id] = (source_keyword_id, snapshot_date)
+
+    for model in (SerpSnapshot, SerpSnapshotFrame):
+        own = db.query(model.keyword_id).filter(
+            model.keyword_id.in_(keyword_ids),
+            model.snapshot_date == snapshot_date
+        ).distinct().all()
+        for (keyword_id,) in own:
+            sources[keyword_id] = (keyword_id, snapshot_date)
+
+    return sources
+
+
+def load_serps(db: Session, sources: Iterable[Source]) -> Dict[Source, List[Dict]]:
+    """
+    Reconstruct the SERPs stored at each source, ordered by position.
+    Delta frames are applied to their keyframes; sources without a frame
+    are read from the legacy row-per-result table.
+    """
+    sources = set(sources)
+    if not sources:
+        return {}
+
+    frames = db.query(SerpSnapshotFrame).filter(
+        tuple_(SerpSnapshotFrame.keyword_id, SerpSnapshotFrame.snapshot_date).in_(sources)
+    ).all()
+
+    bases = {(frame.keyword_id, frame.base_date) for frame in frames if not frame.is_keyframe}
+    keyframes = {}
+    if bases:
+        keyframes = {
+            (keyword_id, snapshot_date): data["items"]
+            for keyword_id, snapshot_date, data in db.query(
+                SerpSnapshotFrame.keyword_id,
+                SerpSnapshotFrame.snapshot_date,
+                SerpSnapshotFrame.data
+            ).filter(
+                tuple_(SerpSnapshotFrame.keyword_id, SerpSnapshotFrame.snapshot_date).in_(bases),
+                SerpSnapshotFrame.is_keyframe == True
+            )
+        }
+
+    serps: Dict[Source, List[Dict]] = {}
+    for frame in frames:
+        if frame.is_keyframe:
+            rows = frame.data["items"]
+        else:
+            keyframe = keyframes.get((frame.keyword_id, frame.base_date))
+            if keyframe is None:
+                continue
+            rows = apply_delta(keyframe, frame.data)
+        serps[(frame.keyword_id, frame.snapshot_date)] = [_row_dict(row, frame.serp_features) for row in rows]
+
+    legacy: Set[Source] = sources - serps.keys()
+    if legacy:
+        rows = db.query(SerpSnapshot).filter(
+            tuple_(SerpSnapshot.keyword_id, SerpSnapshot.snapshot_date).in_(legacy)
+        ).order_by(SerpSnapshot.rank_position).all()
+        for row in rows:
+            serps.setdefault((row.keyword_id, row.snapshot_date), []).append(_snapshot_dict(row))
+
+    return serps
+
+
+def _resolve(
+    sources: Dict[UUID, Source],
+    serps: Dict[Source, List[Dict]],
+    limit: Optional[int]
+) -> Dict[UUID, Tuple[date, List[Dict]]]:
+    resolved = {}
+    for keyword_id, source in sources.items():
+        results = serps.get(source, [])
+        resolved[keyword_id] = (source[1], results[:limit] if limit else results)
+    return resolved
+
+
+def get_latest_serps(
+    db: Session,
+    keyword_ids: List[UUID],
+    limit: Optional[int] = None
+) -> Dict[UUID, Tuple[date, List[Dict]]]:
+    """
+    Get the latest SERP for each keyword, ordered by position.
+    Returns {keyword_id: (snapshot_date, results)}.
+    """
+    sources = latest_snapshot_sources(db, keyword_ids)
+    return _resolve(sources, load_serps(db, sources.values()), limit)
+
+
+def get_latest_serp(
+    db: Session,
+    keyword_id: UUID,
+    limit: Optional[int] = None
+) -> Tuple[Optional[date], List[Dict]]:
+    """Get the latest SERP for one keyword as (snapshot_date, results)"""
+    return get_latest_serps(db, [keyword_id], limit=limit).get(keyword_id, (None, []))
+
+
+def get_serps_on(
+    db: Session,
+    keyword_ids: List[UUID],
+    snapshot_date: date,
+    limit: Optional[int] = None
+) -> Dict[UUID, List[Dict]]:
+    """Reconstruct each keyword's SERP as stored for one day"""
+    sources = snapshot_sources_on(db, keyword_ids, snapshot_date)
+    resolved = _resolve(sources, load_serps(db, sources.values()), limit)
+    return {keyword_id: results for keyword_id, (_, results) in resolved.items()}
+
+
+def get_serp_on(db: Session, keyword_id: UUID, snapshot_date: date, limit: Optional[int] = None) -> List[Dict]:
+    """Reconstruct one keyword's SERP for one day ([] if none was stored)"""
+    return get_serps_on(db, [keyword_id], snapshot_date, limit=limit).get(keyword_id, [])
+
+
+def hand_over_snapshots(db: Session, keyword_id: UUID) -> Optional[UUID]:
+    """
+    Before a keyword's snapshots are deleted, give the days other keywords
+    still reference to one of those keywords (the heir): the SERPs are
+    decoded and re-encoded as the heir's frames, and the remaining
+    references are pointed at the heir. Weekly keyframes archived for the
+    weeks of those days move to the heir too, unless it has its own.
+    Returns the heir, or None when nothing references the keyword.
+    Does not commit.
+    """
+    refs = db.query(SerpSnapshotRef).filter(
+        SerpSnapshotRef.source_keyword_id == keyword_id,
+        SerpSnapshotRef.keyword_id != keyword_id
+    ).order_by(SerpSnapshotRef.snapshot_date.desc(), SerpSnapshotRef.keyword_id).all()
+    if not refs:
+        return None
+
+    heir = refs[0].keyword_id
+    days = sorted({ref.snapshot_date for ref in refs})
+
+    weeks = {day - timedelta(days=day.weekday()) for day in days}
+    weeks -= {
+        week_start for (week_start,) in db.query(SerpSnapshotWeekly.week_start).filter(
+            SerpSnapshotWeekly.keyword_id == heir,
+            SerpSnapshotWeekly.week_start.in_(weeks)
+        )
+    }
+    if weeks:
+        db.query(SerpSnapshotWeekly).filter(
+            SerpSnapshotWeekly.keyword_id == keyword_id,
+            SerpSnapshotWeekly.week_start.in_(weeks)
+        ).update({SerpSnapshotWeekly.keyword_id: heir}, synchronize_session=False)
+    heir_days = set()
+    for model in (SerpSnapshotFrame, SerpSnapshot):
+        heir_days.update(
+            snapshot_date for (snapshot_date,) in db.query(model.snapshot_date).filter(
+                model.keyword_id == heir,
+                model.snapshot_date.between(days[0], days[-1])
+            ).distinct()
+        )
+
+    serps = load_serps(db, [(keyword_id, day) for day in days if day not in heir_days])
+    keyframes = {
+        snapshot_date: data["items"]
+        for snapshot_date, data in db.query(SerpSnapshotFrame.snapshot_date, SerpSnapshotFrame.data).filter(
+            SerpSnapshotFrame.keyword_id == heir,
+            SerpSnapshotFrame.is_keyframe == True,
+            SerpSnapshotFrame.snapshot_date.between(
+                days[0] - timedelta(days=settings.SERP_KEYFRAME_INTERVAL_DAYS), days[-1]
+            )
+        )
+    }
+
+    frames = []
+    for (_, day), results in sorted(serps.items(), key=lambda item: item[0][1]):
+        rows = [[r["position"], r["url"], r["domain"], r["title"], r["description"]] for r in results]
+        earlier = [kf_day for kf_day in keyframes if kf_day < day]
+        keyframe = (max(earlier), keyframes[max(earlier)]) if earlier else None
+        is_keyframe, base_date, data = encode_frame(rows, day, keyframe)
+        if is_keyframe:
+            keyframes[day] = rows
+        frames.append({
+            "keyword_id": heir,
+            "snapshot_date": day,
+            "is_keyframe": is_keyframe,
+            "base_date": base_date,
+            "serp_features": results[0]["serp_features"] if results else None,
+            "data": data,
+        })
+        heir_days.add(day)
+
+    # The heir now holds its own SERP on every day it had a reference for
+    db.query(SerpSnapshotRef).filter(
+        SerpSnapshotRef.keyword_id == heir,
+        SerpSnapshotRef.source_keyword_id == keyword_id
+    ).delete(synchronize_session=False)
+    if frames:
+        db.execute(insert(SerpSnapshotFrame.__table__), frames)
+
+    # Point other references at the heir where it has that day, drop the rest
+    handed = list(heir_days)
+    db.query(SerpSnapshotRef).filter(
+        SerpSnapshotRef.source_keyword_id == keyword_id,
+        SerpSnapshotRef.snapshot_date.in_(handed)
+    ).update({SerpSnapshotRef.source_keyword_id: heir}, synchronize_session=False)
+    db.query(SerpSnapshotRef).filter(
+        SerpSnapshotRef.source_keyword_id == keyword_id,
+        SerpSnapshotRef.keyword_id != keyword_id
+    ).delete(synchronize_session=False)
+    return heir
@@ -0,0 +1,226 @@
+"""
+Request coalescing for paid provider calls.
+Identical calls that overlap in time share one upstream request: callers in
+the same process await the same future, and callers in other processes
+(API instances, Celery workers) wait on a Redis lock and pick up the
+leader's result.
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.services.provider_types import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if this leader still holds it
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Share one result between identical concurrent calls.
+    Results are shared, not copied, so callers must treat them as read-only.
+    Only successful results are published across processes; a follower whose
+    leader failed runs the call itself. Redis errors fall back to
+    in-process coalescing only.
+    """
+
+    PREFIX = "singleflight"
+    POLL_INTERVAL = 0.1  # seconds between follower checks
+
+    def __init__(
+        self,
+        distributed: Optional[bool] = None,
+        lock_ttl: Optional[float] = None,
+        result_ttl: Optional[float] = None,
+        redis_client=None
+    ):
+        self.distributed = settings.SINGLEFLIGHT_DISTRIBUTED if distributed is None else distributed
+        self.lock_ttl = lock_ttl or settings.SINGLEFLIGHT_LOCK_TTL
+        self.result_ttl = result_ttl or settings.SINGLEFLIGHT_RESULT_TTL
+        self._redis = redis_client
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+    @property
+    def redis(self):
+        return self._redis or get_async_redis()
+
+    @staticmethod
+    def digest(key: Any) -> str:
+        """Stable hash of a JSON-serializable call key"""
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def do(
+        self,
+        key: Any,
+        fn: Callable[[], Awaitable[Dict]],
+        decode: Optional[Callable[[Dict], Dict]] = None
+    ) -> Dict:
+        """
+        Run fn, or wait for an identical in-flight call and return its result.
+        decode is applied to results received from another process (plain JSON).
+        """
+        digest = self.digest(key)
+        local_key = (asyncio.get_running_loop(), digest)
+
+        while True:
+            inflight = self._inflight.get(local_key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only give up if we were cancelled, not the caller we were waiting on
+                if not inflight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[local_key] = future
+        try:
+            if self.distributed:
+                result = await self._do_distributed(digest, fn, decode)
+            else:
+                result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so an unawaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(local_key, None)
+
+    async def _do_distributed(
+        self,
+        digest: str,
+        fn: Callable[[], Awaitable[Dict]],
+        decode: Optional[Callable[[Dict], Dict]] = None
+    ) -> Dict:
+        """Coalesce across processes with a Redis lock naming the leader"""
+        lock_key = f"{self.PREFIX}:lock:{digest}"
+        token = uuid.uuid4().hex
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ttl
+
+        while True:
+            try:
+                acquired = await self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+                leader = None if acquired else await self.redis.get(lock_key)
+            except Exception as e:
+                logger.warning(f"Singleflight lock unavailable, calling directly: {e}")
+                return await fn()
+
+            if acquired:
+                return await self._lead(lock_key, token, digest, fn)
+
+            if leader is not None:
+                result = await self._follow(lock_key, leader, digest, deadline)
+                if result is not None:
+                    return decode(result) if decode else result
+
+            # The leader finished without publishing (or timed out); run it ourselves
+            if loop.time() >= deadline:
+                return await fn()
+
+    async def _lead(self, lock_key: str, token: str, digest: str, fn: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Make the call and publish a successful result for followers"""
+        try:
+            result = await fn()
+            if isinstance(result, dict) and result.get("success"):
+                blob = zlib.compress(json.dumps(result, default=to_jsonable).encode())
+                try:
+                    await self.redis.set(
+                        f"{self.PREFIX}:result:{digest}:{token}", blob,
+                        px=int(self.result_ttl * 1000)
+                    )
+                except Exception as e:
+                    logger.warning(f"Singleflight result publish failed: {e}")
+            return result
+        finally:
+            try:
+                await self.redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+            except Exception as e:
+                logger.warning(f"Singleflight lock release failed: {e}")
+
+    async def _follow(self, lock_key: str, leader: bytes, digest: str, deadline: float) -> Optional[Dict]:
+        """Wait for a leader's result. Returns None if the leader went away without one."""
+        if isinstance(leader, bytes):
+            leader = leader.decode()
+        result_key = f"{self.PREFIX}:result:{digest}:{leader}"
+        loop = asyncio.get_running_loop()
+
+        while loop.time() < deadline:
+            try:
+                blob = await self.redis.get(result_key)
+                if blob is not None:
+                    return json.loads(zlib.decompress(blob))
+                current = await self.redis.get(lock_key)
+            except Exception as e:
+                logger.warning(f"Singleflight wait failed: {e}")
+                return None
+            if current is None or (current.decode() if isinstance(current, bytes) else current) != leader:
+                # Lock released; the result may have landed just before
+                try:
+                    blob = await self.redis.get(result_key)
+                except Exception:
+                    blob = None
+                return json.loads(zlib.decompress(blob)) if blob is not None else None
+            await asyncio.sleep(self.POLL_INTERVAL)
+        return None
+
+
+_singleflight: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> Optional[SingleFlight]:
+    """Process-wide coalescer (None when disabled)"""
+    global _singleflight
+    if not settings.SINGLEFLIGHT_ENABLED:
+        return None
+    if _singleflight is None:
+        _singleflight = SingleFlight()
+    return _singleflight
+
+
+def coalesced(name: str, decode: Optional[Callable[[Dict], Dict]] = None):
+    """
+    Decorate an async service method so identical concurrent calls share
+    one upstream request. The key is the name plus the bound arguments
+    (defaults applied), so positional and keyword calls coalesce together.
+    The instance's `singleflight` attribute is used; None disables it.
+    decode rebuilds typed results received from another process.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            flight = getattr(self, "singleflight", None)
+            if flight is None:
+                return await method(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = [name, list(bound.arguments.items())[1:]]
+            return await flight.do(key, lambda: method(self, *args, **kwargs), decode)
+
+        return wrapper
+    return decorator
@@ -164,27 +164,16 @@ class RankTrackingService:
 
     @staticmethod
     def get_latest_ranks(db: Client, project_id: str) -> List[Dict]:
-        """Get latest rank for each keyword in a project"""
-        # This would use a materialized view or custom query
-        # For now, get all keywords and their latest rank
-        keywords = db.table('keywords').select('*').eq('project_id', project_id).execute()
-
-        result = []
-        for kw in keywords.data:
-            ranks = db.table('rank_tracking')\
-                .select('*')\
-                .eq('keyword_id', kw['id'])\
-                .order('checked_at', desc=True)\
-                .limit(1)\
-                .execute()
-
-            if ranks.data:
-                result.append({
-                    'keyword': kw,
-                    'latest_rank': ranks.data[0]
-                })
+        """Get latest rank for each tracked keyword URL in a project"""
+        ranks = db.table('current_rank')\
+            .select('*, keywords(*)')\
+            .eq('project_id', project_id)\
+            .execute()
 
-        return result
+        return [
+            {'keyword': rank.pop('keywords'), 'latest_rank': rank}
+            for rank in ranks.data
+        ]
 
 
 class ApiUsageService:
@@ -0,0 +1,127 @@
+"""
+Build the rank_daily and current_rank tables from the raw rank checks in
+rank_tracking. New checks update both at ingest; this fills in checks
+recorded before the tables existed (until it has run, the rank-check tasks
+read keywords missing from current_rank from rank_tracking). Keywords are processed in batches, one
+transaction each, and their rows are recomputed from scratch (current_rank
+rows already moved past by a newer check are kept), so the job can be
+stopped and re-run.
+
+Usage:
+    python -m app.tasks.backfill_rank_rollups --batch-size 200
+"""
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import argparse
+
+from app.core.database import SessionLocal
+from app.models.keyword import Keyword
+
+KEYWORD_IDS = bindparam("keyword_ids", type_=UUID(as_uuid=True), expanding=True)
+
+DAILY_SQL = text("""
+    INSERT INTO rank_daily (
+        keyword_id, day, tracked_url, project_id,
+        best_position, worst_position, last_position, last_checked_at,
+        position_sum, ranked_checks, checks
+    )
+    SELECT keyword_id, (checked_at AT TIME ZONE 'UTC')::date, tracked_url,
+           (array_agg(project_id ORDER BY checked_at DESC))[1],
+           min(rank_position), max(rank_position),
+           (array_agg(rank_position ORDER BY checked_at DESC))[1],
+           max(checked_at), coalesce(sum(rank_position), 0), count(rank_position), count(*)
+    FROM rank_tracking
+    WHERE keyword_id IN :keyword_ids
+    GROUP BY 1, 2, 3
+    ON CONFLICT (keyword_id, day, tracked_url) DO UPDATE SET
+        project_id = excluded.project_id,
+        best_position = excluded.best_position,
+        worst_position = excluded.worst_position,
+        last_position = excluded.last_position,
+        last_checked_at = excluded.last_checked_at,
+        position_sum = excluded.position_sum,
+        ranked_checks = excluded.ranked_checks,
+        checks = excluded.checks
+""").bindparams(KEYWORD_IDS)
+
+CURRENT_SQL = text("""
+    INSERT INTO current_rank (
+        project_id, keyword_id, tracked_url, rank_id, rank_position, previous_position,
+        search_engine, location_code, language_code, checked_at
+    )
+    SELECT project_id, keyword_id, tracked_url, id, rank_position, previous_position,
+           search_engine, location_code, language_code, checked_at
+    FROM (
+        SELECT rank_tracking.*,
+               lead(rank_position) OVER latest AS previous_position,
+               row_number() OVER latest AS n
+        FROM rank_tracking
+        WHERE keyword_id IN :keyword_ids
+        WINDOW latest AS (PARTITION BY project_id, keyword_id, tracked_url ORDER BY checked_at DESC)
+    ) ranked
+    WHERE n = 1
+    ON CONFLICT (project_id, keyword_id, tracked_url) DO UPDATE SET
+        rank_id = excluded.rank_id,
+        rank_position = excluded.rank_position,
+        previous_position = excluded.previous_position,
+        search_engine = excluded.search_engine,
+        location_code = excluded.location_code,
+        language_code = excluded.language_code,
+        checked_at = excluded.checked_at
+    WHERE excluded.checked_at >= current_rank.checked_at
+""").bindparams(KEYWORD_IDS)
+
+
+def backfill_keywords(db: Session, keyword_ids: List) -> Dict[str, int]:
+    """Recompute the daily rollup and current ranks of some keywords. Does not commit."""
+    params = {"keyword_ids": keyword_ids}
+    return {
+        "days": max(db.execute(DAILY_SQL, params).rowcount, 0),
+        "current": max(db.execute(CURRENT_SQL, params).rowcount, 0),
+    }
+
+
+def backfill_rank_rollups(batch_size: int = 200, limit: Optional[int] = None) -> Dict[str, int]:
+    """Walk all keywords in id order and roll up their rank checks"""
+    totals = {"keywords": 0, "days": 0, "current": 0}
+    last_id = None
+
+    db = SessionLocal()
+    try:
+        while limit is None or totals["keywords"] < limit:
+            query = db.query(Keyword.id).order_by(Keyword.id)
+            if last_id is not None:
+                query = query.filter(Keyword.id > last_id)
+            keyword_ids = [keyword_id for (keyword_id,) in query.limit(batch_size).all()]
+            if not keyword_ids:
+                break
+            last_id = keyword_ids[-1]
+
+            counts = backfill_keywords(db, keyword_ids)
+            db.commit()
+            totals["keywords"] += len(keyword_ids)
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        db.close()
+
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build rank_daily and current_rank from raw rank checks")
+    parser.add_argument("--batch-size", type=int, default=200, help="keywords per transaction")
+    parser.add_argument("--limit", type=int, help="stop after this many keywords")
+    args = parser.parse_args(argv)
+
+    totals = backfill_rank_rollups(args.batch_size, args.limit)
+    print(
+        f"Rolled up {totals['days']} keyword days and {totals['current']} current ranks "
+        f"for {totals['keywords']} keywords"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Helpers shared by Celery tasks"""
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.async_runtime import run_sync
+from app.services.credential_cache import get_cached_service
+from app.services.dataforseo import DataForSEOService
+
+
+def run_async(coro):
+    """
+    Run a provider coroutine from a task.
+    In worker processes this uses the persistent worker loop (see
+    app/core/async_runtime.py), so pooled HTTP and Redis clients are reused
+    across tasks. Elsewhere (eager tasks, scripts) it falls back to a fresh
+    loop per call.
+    """
+    return run_sync(coro)
+
+
+def get_dataforseo_service(db: Session, user_id: str) -> Optional[DataForSEOService]:
+    """Build (or reuse) a DataForSEO service from the user's stored credentials"""
+    return get_cached_service(db, user_id, DataForSEOService)
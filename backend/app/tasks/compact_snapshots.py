@@ -0,0 +1,128 @@
+"""
+Convert legacy row-per-result SERP snapshots into snapshot frames.
+Keywords are processed in batches: each keyword's days are encoded in date
+order (keyframes and deltas, as the live ingest writes them), then the
+frames are inserted and the legacy rows deleted in one transaction per
+batch. Days that already have a frame keep it, so the job can be stopped
+and re-run.
+
+Usage:
+    python -m app.tasks.compact_snapshots --batch-size 50
+"""
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from itertools import groupby
+from typing import Dict, List, Optional
+import argparse
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.keyword import Keyword
+from app.models.serp_snapshot import SerpSnapshot, SerpSnapshotFrame
+from app.services.serp_delta import encode_frame
+
+
+def compact_keywords(db: Session, keyword_ids: List) -> Dict[str, int]:
+    """Encode and replace the legacy snapshot rows of some keywords. Does not commit."""
+    rows = db.query(
+        SerpSnapshot.keyword_id,
+        SerpSnapshot.snapshot_date,
+        SerpSnapshot.rank_position,
+        SerpSnapshot.url,
+        SerpSnapshot.domain,
+        SerpSnapshot.title,
+        SerpSnapshot.description,
+        SerpSnapshot.serp_features
+    ).filter(
+        SerpSnapshot.keyword_id.in_(keyword_ids)
+    ).order_by(
+        SerpSnapshot.keyword_id, SerpSnapshot.snapshot_date, SerpSnapshot.rank_position
+    ).yield_per(10000)
+
+    existing = set(
+        db.query(SerpSnapshotFrame.keyword_id, SerpSnapshotFrame.snapshot_date).filter(
+            SerpSnapshotFrame.keyword_id.in_(keyword_ids)
+        ).all()
+    )
+
+    frames = []
+    legacy_rows = 0
+    for keyword_id, keyword_rows in groupby(rows, key=lambda row: row.keyword_id):
+        keyframe = None
+        for snapshot_date, day_rows in groupby(keyword_rows, key=lambda row: row.snapshot_date):
+            day_rows = list(day_rows)
+            legacy_rows += len(day_rows)
+            if (keyword_id, snapshot_date) in existing:
+                continue
+            packed, seen = [], set()
+            for row in day_rows:
+                if row.rank_position not in seen:
+                    seen.add(row.rank_position)
+                    packed.append([row.rank_position, row.url, row.domain, row.title, row.description])
+            is_keyframe, base_date, data = encode_frame(packed, snapshot_date, keyframe)
+            if is_keyframe:
+                keyframe = (snapshot_date, packed)
+            frames.append({
+                "keyword_id": keyword_id,
+                "snapshot_date": snapshot_date,
+                "is_keyframe": is_keyframe,
+                "base_date": base_date,
+                "serp_features": day_rows[0].serp_features,
+                "data": data,
+            })
+
+    for i in range(0, len(frames), settings.RANK_INGEST_INSERT_CHUNK):
+        stmt = pg_insert(SerpSnapshotFrame.__table__).values(frames[i:i + settings.RANK_INGEST_INSERT_CHUNK])
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["keyword_id", "snapshot_date"]))
+
+    db.execute(delete(SerpSnapshot.__table__).where(SerpSnapshot.keyword_id.in_(keyword_ids)))
+    return {
+        "frames": len(frames),
+        "keyframes": sum(1 for frame in frames if frame["is_keyframe"]),
+        "legacy_rows": legacy_rows
+    }
+
+
+def compact_snapshots(batch_size: int = 50, limit: Optional[int] = None) -> Dict[str, int]:
+    """Walk all keywords in id order and compact their legacy snapshots"""
+    totals = {"keywords": 0, "frames": 0, "keyframes": 0, "legacy_rows": 0}
+    last_id = None
+
+    db = SessionLocal()
+    try:
+        while limit is None or totals["keywords"] < limit:
+            query = db.query(Keyword.id).order_by(Keyword.id)
+            if last_id is not None:
+                query = query.filter(Keyword.id > last_id)
+            keyword_ids = [keyword_id for (keyword_id,) in query.limit(batch_size).all()]
+            if not keyword_ids:
+                break
+            last_id = keyword_ids[-1]
+
+            counts = compact_keywords(db, keyword_ids)
+            db.commit()
+            totals["keywords"] += len(keyword_ids)
+            for key, value in counts.items():
+                totals[key] += value
+    finally:
+        db.close()
+
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert legacy SERP snapshot rows into frames")
+    parser.add_argument("--batch-size", type=int, default=50, help="keywords per transaction")
+    parser.add_argument("--limit", type=int, help="stop after this many keywords")
+    args = parser.parse_args(argv)
+
+    totals = compact_snapshots(args.batch_size, args.limit)
+    print(
+        f"Compacted {totals['legacy_rows']} snapshot rows for {totals['keywords']} keywords "
+        f"into {totals['frames']} frames ({totals['keyframes']} keyframes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Celery tasks for keyword research"""
+from celery import shared_task
+
+from app.core.database import SessionLocal
+from app.models.api_usage_log import ApiUsageLog
+from app.services.keyword_metrics import refresh_stale_project_metrics
+from app.tasks.common import get_dataforseo_service, run_async
+
+
+@shared_task(name="app.tasks.keyword_research.refresh_project_keywords")
+def refresh_project_keywords(project_id: str, user_id: str):
+    """
+    Refresh metrics for every stale keyword in a project.
+    Triggered by the refresh-all endpoint; batches are committed as they
+    complete, so progress survives a failure part-way through.
+    """
+    db = SessionLocal()
+    try:
+        dataforseo = get_dataforseo_service(db, user_id)
+        if not dataforseo:
+            return {"success": False, "error": "DataForSEO credentials not configured"}
+
+        result = run_async(refresh_stale_project_metrics(db, dataforseo, project_id))
+
+        # Log API usage
+        if result["fetched"]:
+            api_log = ApiUsageLog(
+                user_id=user_id,
+                api_provider="dataforseo",
+                endpoint="bulk_keyword_difficulty",
+                cost=result["cost"],
+                response_status=200
+            )
+            db.add(api_log)
+            db.commit()
+
+        return {
+            "success": result["success"],
+            "project_id": project_id,
+            "keywords": result["keywords"],
+            "fetched": result["fetched"],
+            "failed": result["failed"],
+            "updated": result["updated"],
+            "cost": float(result["cost"]),
+            "errors": result["errors"],
+        }
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
@@ -0,0 +1,85 @@
+"""Celery tasks for database maintenance"""
+from celery import shared_task
+from datetime import date, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.partitions import (
+    PARTITIONED_TABLES,
+    add_months,
+    create_partitions,
+    detach_partition,
+    expired_months,
+    month_start,
+    partition_name,
+    promote_orphaned_deltas,
+    rollup_rank_month,
+    rollup_snapshot_month,
+)
+from app.services.raw_archive import get_raw_archive
+
+
+@shared_task(name="app.tasks.maintenance.maintain_partitions")
+def maintain_partitions(today: Optional[str] = None):
+    """
+    Create the monthly history partitions for the next PARTITION_MONTHS_AHEAD
+    months, then roll every month older than RANK_RAW_RETENTION_MONTHS up
+    into the weekly tables and detach it (one transaction per month).
+    Runs daily (configured in celery_app.py); safe to run by hand.
+    """
+    today = date.fromisoformat(today) if today else date.today()
+    current = month_start(today)
+    db = SessionLocal()
+    try:
+        created = []
+        for table in PARTITIONED_TABLES:
+            created += create_partitions(db, table, current, add_months(current, settings.PARTITION_MONTHS_AHEAD))
+        db.commit()
+
+        detached = []
+        for month in expired_months(db, "serp_snapshot_frames", today):
+            # Deltas early next month may point at a keyframe in this one
+            promote_orphaned_deltas(db, add_months(month, 1))
+            rollup_snapshot_month(db, month)
+            detach_partition(db, "serp_snapshot_frames", month, settings.PARTITION_DROP_DETACHED)
+            db.commit()
+            detached.append(partition_name("serp_snapshot_frames", month))
+
+        for month in expired_months(db, "rank_tracking", today):
+            rollup_rank_month(db, month)
+            detach_partition(db, "rank_tracking", month, settings.PARTITION_DROP_DETACHED)
+            db.commit()
+            detached.append(partition_name("rank_tracking", month))
+
+        return {"success": True, "created": created, "detached": detached}
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="app.tasks.maintenance.prune_raw_archive")
+def prune_raw_archive(today: Optional[str] = None):
+    """
+    Drop raw archive fetches older than RAW_ARCHIVE_RETENTION_DAYS, and the
+    response bodies only they referenced. No-op when the archive is disabled.
+    Runs daily (configured in celery_app.py).
+    """
+    archive = get_raw_archive()
+    if archive is None:
+        return {"success": True, "skipped": "raw archive disabled"}
+
+    today = date.fromisoformat(today) if today else date.today()
+    try:
+        removed = archive.prune(today - timedelta(days=settings.RAW_ARCHIVE_RETENTION_DAYS))
+        return {"success": True, **removed}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+if __name__ == "__main__":
+    # Create the initial partitions after loading database/schema.sql
+    print(maintain_partitions())
@@ -0,0 +1,150 @@
+"""
+Move an existing unpartitioned history table into the monthly layout.
+Runs in three steps so the copy happens while the app keeps writing:
+
+    prepare  create <table>_partitioned with its monthly partitions
+    copy     copy rows across in time-window batches (resumable with --since)
+    swap     lock the old table, re-copy the recent tail (rows written or
+             updated during the copy), and rename the new table into place;
+             the old one is kept as <table>_unpartitioned
+
+Usage:
+    python -m app.tasks.partition_migration prepare rank_tracking
+    python -m app.tasks.partition_migration copy rank_tracking --batch-days 1
+    python -m app.tasks.partition_migration swap rank_tracking
+
+Views defined on the old table (mv_project_stats) keep pointing at it after
+the swap and must be recreated from database/schema.sql.
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+import argparse
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.partitions import PARENT_DDL, PARTITIONED_TABLES, add_months, create_partitions, month_start
+
+
+def staging_table(table: str) -> str:
+    return f"{table}_partitioned"
+
+
+def _columns(db: Session, table: str) -> str:
+    rows = db.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = :table ORDER BY ordinal_position"
+    ), {"table": table})
+    return ", ".join(name for (name,) in rows)
+
+
+def _key_range(db: Session, table: str):
+    key = PARTITIONED_TABLES[table]
+    return db.execute(text(f"SELECT min({key}), max({key}) FROM {table}")).one()
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def prepare(db: Session, table: str) -> List[str]:
+    """Create the partitioned copy of a table and partitions covering its data"""
+    target = staging_table(table)
+    for statement in PARENT_DDL[table]:
+        db.execute(text(statement.format(name=target)))
+    if table == "rank_tracking":
+        # The partition key is NOT NULL in the new layout
+        db.execute(text(
+            "UPDATE rank_tracking SET checked_at = coalesce(created_at, NOW()) WHERE checked_at IS NULL"
+        ))
+
+    first, _ = _key_range(db, table)
+    current = month_start(date.today())
+    first_month = month_start(_as_date(first)) if first else current
+    created = create_partitions(
+        db, table, first_month, add_months(current, settings.PARTITION_MONTHS_AHEAD), parent=target
+    )
+    db.commit()
+    return created
+
+
+def _window(table: str, start: date, end: date):
+    """Bind values for [start, end) on the table's partition key"""
+    if PARTITIONED_TABLES[table] == "checked_at":
+        return (datetime.combine(start, time(), timezone.utc), datetime.combine(end, time(), timezone.utc))
+    return start, end
+
+
+def copy_rows(db: Session, table: str, since: Optional[date] = None, batch_days: int = 1) -> int:
+    """Copy rows up to today into the partitioned table, one committed window at a time"""
+    key = PARTITIONED_TABLES[table]
+    columns = _columns(db, staging_table(table))
+    first, _ = _key_range(db, table)
+    if first is None:
+        return 0
+
+    copied = 0
+    start = since or _as_date(first)
+    stop = date.today() + timedelta(days=1)
+    while start < stop:
+        end = min(start + timedelta(days=batch_days), stop)
+        low, high = _window(table, start, end)
+        result = db.execute(text(
+            f"INSERT INTO {staging_table(table)} ({columns}) SELECT {columns} FROM {table} "
+            f"WHERE {key} >= :low AND {key} < :high ON CONFLICT DO NOTHING"
+        ), {"low": low, "high": high})
+        db.commit()
+        copied += max(result.rowcount, 0)
+        print(f"{table}: copied through {end - timedelta(days=1)} ({copied} rows)")
+        start = end
+    return copied
+
+
+def swap(db: Session, table: str, resync_days: int = 2) -> int:
+    """
+    Re-copy the last `resync_days` days under an exclusive lock (rows that
+    changed after the copy ran), then rename the partitioned table into place.
+    """
+    key = PARTITIONED_TABLES[table]
+    target = staging_table(table)
+    columns = _columns(db, target)
+    low, _ = _window(table, date.today() - timedelta(days=resync_days), date.today())
+
+    db.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+    db.execute(text(f"DELETE FROM {target} WHERE {key} >= :low"), {"low": low})
+    result = db.execute(text(
+        f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {table} WHERE {key} >= :low"
+    ), {"low": low})
+    db.execute(text(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned"))
+    db.execute(text(f"ALTER TABLE {target} RENAME TO {table}"))
+    db.commit()
+    return max(result.rowcount, 0)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Migrate a history table to monthly partitions")
+    parser.add_argument("step", choices=["prepare", "copy", "swap"])
+    parser.add_argument("table", choices=sorted(PARTITIONED_TABLES))
+    parser.add_argument("--since", type=date.fromisoformat, help="resume the copy from this date (YYYY-MM-DD)")
+    parser.add_argument("--batch-days", type=int, default=1, help="days of rows per copy transaction")
+    parser.add_argument("--resync-days", type=int, default=2, help="recent days re-copied during the swap")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.step == "prepare":
+            created = prepare(db, args.table)
+            print(f"Created {staging_table(args.table)} with {len(created)} monthly partitions")
+        elif args.step == "copy":
+            copied = copy_rows(db, args.table, args.since, args.batch_days)
+            print(f"Copied {copied} rows into {staging_table(args.table)}")
+        else:
+            resynced = swap(db, args.table, args.resync_days)
+            print(f"Swapped {args.table} into place ({resynced} recent rows re-copied)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,261 @@
 """Celery tasks for rank tracking"""
-from celery import shared_task
+from celery import group, shared_task
+from sqlalchemy import exists, func, or_, select, union_all, update
 from sqlalchemy.orm import Session
-from datetime import datetime, date
-import asyncio
-import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Union
+from uuid import UUID
 
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.core.security import decrypt_data
 from app.models.keyword import Keyword
-from app.models.rank_tracking import RankTracking
-from app.models.serp_snapshot import SerpSnapshot
+from app.models.rank_tracking import CurrentRank, RankDaily, RankTracking
 from app.models.api_credential import ApiCredential
 from app.models.api_usage_log import ApiUsageLog
-from app.services.dataforseo import DataForSEOService
+from app.services.dataforseo import DataForSEOService, SerpSignature, serp_signature
+from app.services.rank_ingest import RankIngest, find_rank_position
+from app.services.rank_schedule import (
+    check_interval_days,
+    current_tick,
+    is_check_due,
+    next_check_after,
+    next_check_at,
+    tick_in_window,
+)
+from app.tasks.common import get_dataforseo_service, run_async
+
+# Prefix for standard-queue task tags so the poller only collects our rank checks
+RANK_TASK_TAG_PREFIX = "rank:"
+
+
+def _latest_tracking_by_keyword(
+    db: Session,
+    keyword_ids: List[str]
+) -> Dict[str, Union[CurrentRank, RankTracking]]:
+    """
+    Get the most recently checked tracking configuration for each keyword.
+    Keywords with no current_rank row yet (checked before it existed and not
+    backfilled) fall back to their latest rank_tracking row.
+    """
+    rows = db.query(CurrentRank).filter(
+        CurrentRank.keyword_id.in_(keyword_ids)
+    ).order_by(
+        CurrentRank.keyword_id, CurrentRank.checked_at.desc()
+    ).distinct(CurrentRank.keyword_id).all()
+    latest = {str(row.keyword_id): row for row in rows}
+
+    missing = [keyword_id for keyword_id in keyword_ids if str(keyword_id) not in latest]
+    if missing:
+        rows = db.query(RankTracking).filter(
+            RankTracking.keyword_id.in_(missing)
+        ).order_by(
+            RankTracking.keyword_id, RankTracking.checked_at.desc()
+        ).distinct(RankTracking.keyword_id).all()
+        latest.update((str(row.keyword_id), row) for row in rows)
+
+    return latest
+
+
+def _find_rank_position(tracking: RankTracking, serp_results: List[Dict]) -> Optional[int]:
+    """Position of the tracked URL in a SERP (None if not ranking)"""
+    return find_rank_position(tracking.tracked_url, serp_results)
+
+
+def _store_rank_result(
+    ingest: RankIngest,
+    latest_tracking: RankTracking,
+    serp_results: List[Dict]
+) -> Optional[int]:
+    """
+    Queue a rank check and today's SERP snapshot for a tracked keyword.
+    Written by ingest.flush(). Returns the tracked URL's position (None if not ranking).
+    """
+    rank_position = _find_rank_position(latest_tracking, serp_results)
+    ingest.add_rank(latest_tracking, rank_position)
+    ingest.add_snapshot(latest_tracking.keyword_id, serp_results)
+    return rank_position
+
+
+def _tracking_signature(tracking: RankTracking, keyword_text: str) -> SerpSignature:
+    return serp_signature(keyword_text, tracking.location_code, tracking.language_code)
+
+
+def _targets_by_signature(
+    db: Session,
+    signatures: Set[SerpSignature]
+) -> Dict[SerpSignature, List[RankTracking]]:
+    """Latest tracking row of every keyword, across all projects, whose SERP matches a signature"""
+    normalized = {signature[0] for signature in signatures}
+    keyword_texts = dict(
+        db.query(Keyword.id, Keyword.keyword_text).filter(
+            func.lower(func.trim(Keyword.keyword_text)).in_(normalized)
+        ).all()
+    )
+    latest_tracking = _latest_tracking_by_keyword(db, list(keyword_texts))
+
+    targets = defaultdict(list)
+    for tracking in latest_tracking.values():
+        signature = _tracking_signature(tracking, keyword_texts[tracking.keyword_id])
+        if signature in signatures:
+            targets[signature].append(tracking)
+    return targets
+
+
+def _store_shared_rank_results(
+    ingest: RankIngest,
+    source_tracking: RankTracking,
+    targets: List[RankTracking],
+    serp_results: List[Dict]
+) -> int:
+    """
+    Fan one fetched SERP out to every tracked keyword that shares it.
+    Snapshot rows are stored once, under the source keyword; the other
+    keywords get a SerpSnapshotRef. Written by ingest.flush(). Returns keywords updated.
+    """
+    _store_rank_result(ingest, source_tracking, serp_results)
+    updated = 1
+    for tracking in targets:
+        if tracking.keyword_id == source_tracking.keyword_id:
+            continue
+        ingest.add_rank(tracking, _find_rank_position(tracking, serp_results))
+        ingest.add_reference(tracking.keyword_id, source_tracking.keyword_id)
+        updated += 1
+    return updated
+
+
+def _rank_history(db: Session, keyword_ids=None):
+    """
+    Per-keyword summary of the latest RANK_HISTORY_CHECKS days checked, read
+    from the rank_daily rollup: samples, best_position and worst_position
+    (not ranking counts as 101). keyword_ids (a list or subquery) limits it
+    to the keywords being scheduled.
+    """
+    best = func.least(func.coalesce(RankDaily.best_position, 101), 101)
+    worst = func.least(func.coalesce(RankDaily.worst_position, 101), 101)
+    days = db.query(
+        RankDaily.keyword_id.label("keyword_id"),
+        best.label("best_position"),
+        worst.label("worst_position"),
+        func.row_number().over(
+            partition_by=RankDaily.keyword_id,
+            order_by=RankDaily.day.desc()
+        ).label("n")
+    )
+    if keyword_ids is not None:
+        days = days.filter(RankDaily.keyword_id.in_(keyword_ids))
+    ranked = days.subquery()
+
+    return db.query(
+        ranked.c.keyword_id,
+        func.count().label("samples"),
+        func.min(ranked.c.best_position).label("best_position"),
+        func.max(ranked.c.worst_position).label("worst_position")
+    ).filter(
+        ranked.c.n <= settings.RANK_HISTORY_CHECKS
+    ).group_by(ranked.c.keyword_id).subquery()
+
+
+def _latest_checks(db: Session, model, keyword_ids=None):
+    """Subquery of the latest check per keyword in `model` (CurrentRank or RankTracking)"""
+    query = db.query(
+        model.keyword_id,
+        model.project_id,
+        model.location_code,
+        model.language_code,
+        model.checked_at
+    )
+    if keyword_ids is not None:
+        query = query.filter(model.keyword_id.in_(keyword_ids))
+    return query.order_by(
+        model.keyword_id, model.checked_at.desc()
+    ).distinct(model.keyword_id).subquery()
+
+
+def _iter_tracked_keywords(
+    db: Session,
+    with_history: bool = False,
+    due_before: Optional[datetime] = None
+) -> Iterator:
+    """
+    Stream every tracked keyword whose owner has active DataForSEO credentials,
+    with its latest tracking locale, ordered by owner.
+    Rows have keyword_id, keyword_text, location_code, language_code, user_id
+    and timezone; with_history adds last_checked_at, samples, best_position,
+    worst_position and the project's rank_check_max_interval_days.
+    With due_before, only keywords never scheduled or whose next_rank_check_at
+    is before it are read, and rows add next_rank_check_at.
+    Rows come from a server-side cursor, so the sweep never holds the full set.
+    """
+    from app.models.project import Project
+    from app.models.user import User
+
+    due_keywords = None
+    not_in_current = db.query(Keyword.id).filter(
+        ~exists().where(CurrentRank.keyword_id == Keyword.id)
+    )
+    if due_before is not None:
+        due_keywords = db.query(Keyword.id).filter(or_(
+            Keyword.next_rank_check_at.is_(None),
+            Keyword.next_rank_check_at < due_before.replace(tzinfo=None)
+        ))
+        not_in_current = not_in_current.filter(Keyword.id.in_(due_keywords))
+
+    # current_rank, plus rank_tracking for keywords not backfilled into it yet
+    current = _latest_checks(db, CurrentRank, due_keywords)
+    backlog = _latest_checks(db, RankTracking, not_in_current)
+    latest = union_all(select(current), select(backlog)).subquery()
+
+    has_credentials = exists().where(
+        ApiCredential.user_id == Project.user_id,
+        ApiCredential.provider == "dataforseo",
+        ApiCredential.is_active == True
+    )
+
+    query = db.query(
+        latest.c.keyword_id,
+        Keyword.keyword_text,
+        latest.c.location_code,
+        latest.c.language_code,
+        Project.user_id,
+        User.timezone
+    ).select_from(latest).join(
+        Keyword, Keyword.id == latest.c.keyword_id
+    ).join(
+        Project, Project.id == latest.c.project_id
+    ).join(
+        User, User.id == Project.user_id
+    ).filter(
+        has_credentials
+    )
+
+    if with_history:
+        history = _rank_history(db, due_keywords)
+        query = query.outerjoin(
+            history, history.c.keyword_id == latest.c.keyword_id
+        ).add_columns(
+            latest.c.checked_at.label("last_checked_at"),
+            func.coalesce(history.c.samples, 0).label("samples"),
+            history.c.best_position,
+            history.c.worst_position,
+            Project.rank_check_max_interval_days
+        )
+
+    if due_before is not None:
+        query = query.add_columns(Keyword.next_rank_check_at)
+
+    query = query.order_by(Project.user_id)
+    return iter(query.yield_per(settings.RANK_ENQUEUE_FETCH_SIZE))
 
 
 @shared_task(name="app.tasks.rank_tracking.check_keyword_rank")
-def check_keyword_rank(keyword_id: str, user_id: str):
+def check_keyword_rank(keyword_id: str, user_id: str, fan_out: bool = False):
     """
-    Check rank for a single keyword.
-    Called by daily_rank_check_job for each tracked keyword.
+    Check rank for a single keyword via the live SERP endpoint.
+    Used when RANK_CHECK_MODE is "live"; the nightly sweep otherwise goes
+    through the standard queue (post_rank_check_tasks / poll_serp_tasks_ready).
+    With fan_out, the SERP is also applied to every other tracked keyword
+    (in any project) with the same normalized text and locale.
     """
     db = SessionLocal()
     try:
@@ -36,24 +272,12 @@ def check_keyword_rank(keyword_id: str, user_id: str):
             return {"success": False, "error": "No tracking configuration found"}
 
         # Get user's DataForSEO credentials
-        cred = db.query(ApiCredential).filter(
-            ApiCredential.user_id == user_id,
-            ApiCredential.provider == "dataforseo",
-            ApiCredential.is_active == True
-        ).first()
-
-        if not cred:
+        dataforseo = get_dataforseo_service(db, user_id)
+        if not dataforseo:
             return {"success": False, "error": "DataForSEO credentials not configured"}
 
-        # Decrypt credentials
-        credentials = json.loads(decrypt_data(cred.credentials_encrypted))
-        dataforseo = DataForSEOService(
-            login=credentials["login"],
-            password=credentials["password"]
-        )
-
         # Fetch SERP data
-        serp_result = asyncio.run(dataforseo.get_serp_results(
+        serp_result = run_async(dataforseo.get_serp_results(
             keyword=keyword.keyword_text,
             location_code=latest_tracking.location_code,
             language_code=latest_tracking.language_code
@@ -62,56 +286,27 @@ def check_keyword_rank(keyword_id: str, user_id: str):
         if not serp_result["success"]:
             return {"success": False, "error": serp_result.get("error")}
 
-        # Find rank position
-        rank_position = None
-        for result in serp_result["results"]:
-            if latest_tracking.tracked_url in result["url"]:
-                rank_position = result["position"]
-                break
-
-        # Store new rank record
-        rank_record = RankTracking(
-            keyword_id=keyword_id,
-            project_id=latest_tracking.project_id,
-            tracked_url=latest_tracking.tracked_url,
-            rank_position=rank_position,
-            search_engine=latest_tracking.search_engine,
-            location_code=latest_tracking.location_code,
-            language_code=latest_tracking.language_code,
-            checked_at=datetime.utcnow()
-        )
-        db.add(rank_record)
-
-        # Store SERP snapshot
-        snapshot_date = date.today()
-        # Delete old snapshots from today
-        db.query(SerpSnapshot).filter(
-            SerpSnapshot.keyword_id == keyword_id,
-            SerpSnapshot.snapshot_date == snapshot_date
-        ).delete()
-
-        for result in serp_result["results"]:
-            serp_snapshot = SerpSnapshot(
-                keyword_id=keyword_id,
-                rank_position=result["position"],
-                url=result["url"],
-                domain=result["domain"],
-                title=result.get("title"),
-                description=result.get("description"),
-                snapshot_date=snapshot_date
+        ingest = RankIngest()
+        if fan_out:
+            signature = _tracking_signature(latest_tracking, keyword.keyword_text)
+            targets = _targets_by_signature(db, {signature}).get(signature, [])
+            _store_shared_rank_results(ingest, latest_tracking, targets, serp_result["results"])
+            rank_position = _find_rank_position(latest_tracking, serp_result["results"])
+        else:
+            rank_position = _store_rank_result(ingest, latest_tracking, serp_result["results"])
+        ingest.flush(db)
+
+        # Log API usage (cached SERPs cost nothing)
+        if not serp_result.get("cached"):
+            cost = DataForSEOService.estimate_rank_check_cost(1, live=True)
+            api_log = ApiUsageLog(
+                user_id=user_id,
+                api_provider="dataforseo",
+                endpoint="serp/organic/live",
+                cost=cost,
+                response_status=200
             )
-            db.add(serp_snapshot)
-
-        # Log API usage
-        cost = DataForSEOService.estimate_rank_check_cost(1, live=False)
-        api_log = ApiUsageLog(
-            user_id=user_id,
-            api_provider="dataforseo",
-            endpoint="serp/organic/live",
-            cost=cost,
-            response_status=200
-        )
-        db.add(api_log)
+            db.add(api_log)
 
         db.commit()
 
@@ -129,41 +324,441 @@ def check_keyword_rank(keyword_id: str, user_id: str):
         db.close()
 
 
-@shared_task(name="app.tasks.rank_tracking.daily_rank_check_job")
-def daily_rank_check_job():
+@shared_task(name="app.tasks.rank_tracking.check_keyword_ranks_batch")
+def check_keyword_ranks_batch(keyword_ids: List[str], user_id: str, fan_out: bool = False):
     """
-    Daily job that checks ranks for all tracked keywords.
-    Runs at 2 AM daily (configured in celery_app.py).
+    Live rank checks for many keywords of one user in a single task.
+    Keywords, tracking rows and credentials are loaded once, unique SERPs are
+    fetched concurrently on one event loop (get_serp_results_batch), and all
+    rows are committed in one transaction. Keywords in the batch that share a
+    SERP signature are fetched once; with fan_out, every other tracked keyword
+    with that signature (in any project) is updated too.
     """
     db = SessionLocal()
     try:
-        # Get all unique keyword_id and user_id combinations being tracked
-        tracked = db.query(
-            RankTracking.keyword_id,
-            Keyword.project_id,
-            RankTracking.project_id
-        ).join(Keyword).distinct().all()
+        dataforseo = get_dataforseo_service(db, user_id)
+        if not dataforseo:
+            return {"success": False, "error": "DataForSEO credentials not configured"}
+
+        keyword_texts = dict(
+            db.query(Keyword.id, Keyword.keyword_text).filter(Keyword.id.in_(keyword_ids)).all()
+        )
+        latest_tracking = _latest_tracking_by_keyword(db, keyword_ids)
 
-        # Get user_id for each project
-        from app.models.project import Project
+        # Group the batch by SERP signature; the first keyword of each group is fetched
+        groups: Dict[SerpSignature, List[RankTracking]] = defaultdict(list)
+        for tracking in latest_tracking.values():
+            if tracking.keyword_id in keyword_texts:
+                signature = _tracking_signature(tracking, keyword_texts[tracking.keyword_id])
+                groups[signature].append(tracking)
 
-        results = []
-        for keyword_id, _, project_id in tracked:
-            project = db.query(Project).filter(Project.id == project_id).first()
-            if project:
-                # Queue individual rank check task
-                result = check_keyword_rank.delay(str(keyword_id), str(project.user_id))
-                results.append({
-                    "keyword_id": str(keyword_id),
-                    "task_id": result.id
-                })
+        if not groups:
+            return {"success": True, "checked": 0, "keywords_updated": 0, "failed": len(keyword_ids)}
+
+        requests = [
+            {
+                "id": str(trackings[0].keyword_id),
+                "keyword": keyword_texts[trackings[0].keyword_id],
+                "location_code": trackings[0].location_code,
+                "language_code": trackings[0].language_code,
+            }
+            for trackings in groups.values()
+        ]
+        results = run_async(dataforseo.get_serp_results_batch(requests))
+
+        targets = _targets_by_signature(db, set(groups)) if fan_out else groups
+        ingest = RankIngest()
+        ranks: Dict[str, Optional[int]] = {}
+        fetched = 0
+        updated = 0
+        errors = []
+        for signature, trackings in groups.items():
+            source = trackings[0]
+            result = results.get(str(source.keyword_id)) or {"success": False, "error": "No result"}
+            if not result["success"]:
+                errors.append({"keyword_id": str(source.keyword_id), "error": result.get("error")})
+                continue
+            if not result.get("cached"):
+                fetched += 1
+            updated += _store_shared_rank_results(
+                ingest, source, targets.get(signature, []), result["results"]
+            )
+            for tracking in trackings:
+                ranks[str(tracking.keyword_id)] = _find_rank_position(tracking, result["results"])
+        ingest.flush(db)
+
+        # Log API usage (cached SERPs cost nothing)
+        if fetched:
+            cost = DataForSEOService.estimate_rank_check_cost(fetched, live=True)
+            api_log = ApiUsageLog(
+                user_id=user_id,
+                api_provider="dataforseo",
+                endpoint="serp/organic/live",
+                cost=cost,
+                response_status=200
+            )
+            db.add(api_log)
+
+        db.commit()
 
         return {
             "success": True,
-            "total_keywords": len(results),
-            "tasks_queued": results
+            "checked": len(ranks),
+            "keywords_updated": updated,
+            "failed": len(keyword_ids) - len(ranks),
+            "rank_positions": ranks,
+            "errors": errors
+        }
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="app.tasks.rank_tracking.post_rank_check_tasks")
+def post_rank_check_tasks(keyword_ids: List[str], user_id: str):
+    """
+    Queue rank checks for a user's keywords on DataForSEO's standard queue.
+    Results are ingested by poll_serp_tasks_ready once DataForSEO completes them.
+    """
+    db = SessionLocal()
+    try:
+        dataforseo = get_dataforseo_service(db, user_id)
+        if not dataforseo:
+            return {"success": False, "error": "DataForSEO credentials not configured"}
+
+        keywords = dict(
+            db.query(Keyword.id, Keyword.keyword_text).filter(Keyword.id.in_(keyword_ids)).all()
+        )
+        latest_tracking = _latest_tracking_by_keyword(db, keyword_ids)
+
+        requests = [
+            {
+                "id": f"{RANK_TASK_TAG_PREFIX}{keyword_id}",
+                "keyword": keywords[tracking.keyword_id],
+                "location_code": tracking.location_code,
+                "language_code": tracking.language_code,
+            }
+            for keyword_id, tracking in latest_tracking.items()
+            if tracking.keyword_id in keywords
+        ]
+
+        if not requests:
+            return {"success": True, "posted": 0, "failed": 0}
+
+        results = run_async(dataforseo.post_serp_tasks(requests))
+        posted = sum(1 for r in results.values() if r["success"])
+
+        # Standard-queue tasks are billed when posted
+        if posted:
+            cost = DataForSEOService.estimate_rank_check_cost(posted, live=False)
+            api_log = ApiUsageLog(
+                user_id=user_id,
+                api_provider="dataforseo",
+                endpoint="serp/organic/task_post",
+                cost=cost,
+                response_status=200
+            )
+            db.add(api_log)
+            db.commit()
+
+        return {"success": True, "posted": posted, "failed": len(results) - posted}
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+def _tag_keyword_id(tag: str) -> Optional[UUID]:
+    """Keyword id from a rank-check task tag (None if the tag is malformed)"""
+    try:
+        return UUID(tag[len(RANK_TASK_TAG_PREFIX):])
+    except ValueError:
+        return None
+
+
+def _ingest_ready_tasks(db: Session, dataforseo: DataForSEOService, ready: List[Dict]) -> Dict:
+    """
+    Fetch completed rank-check tasks in batches and store their results.
+    Each task was posted for one representative keyword; its SERP is fanned
+    out to every tracked keyword sharing the same signature.
+    """
+    ingested = 0
+    updated = 0
+    failed = 0
+    batch_size = settings.RANK_INGEST_BATCH_SIZE
+
+    for i in range(0, len(ready), batch_size):
+        batch = ready[i:i + batch_size]
+        results = run_async(
+            dataforseo.get_serp_task_results([task["task_id"] for task in batch])
+        )
+
+        keyword_ids = [_tag_keyword_id(task["tag"]) for task in batch]
+        tagged = [keyword_id for keyword_id in keyword_ids if keyword_id is not None]
+        keyword_texts = dict(
+            db.query(Keyword.id, Keyword.keyword_text).filter(Keyword.id.in_(tagged)).all()
+        )
+        latest_tracking = _latest_tracking_by_keyword(db, tagged)
+
+        sources = {}
+        for keyword_id, tracking in latest_tracking.items():
+            if tracking.keyword_id in keyword_texts:
+                sources[keyword_id] = (
+                    tracking,
+                    _tracking_signature(tracking, keyword_texts[tracking.keyword_id])
+                )
+        targets = _targets_by_signature(db, {signature for _, signature in sources.values()})
+
+        ingest = RankIngest()
+        for task, keyword_id in zip(batch, keyword_ids):
+            result = results[task["task_id"]]
+            if not result["success"] or str(keyword_id) not in sources:
+                failed += 1
+                continue
+            tracking, signature = sources[str(keyword_id)]
+            updated += _store_shared_rank_results(
+                ingest, tracking, targets.get(signature, []), result["results"]
+            )
+            ingested += 1
+
+        ingest.flush(db)
+        db.commit()
+
+    return {"ingested": ingested, "keywords_updated": updated, "failed": failed}
+
+
+@shared_task(name="app.tasks.rank_tracking.poll_serp_tasks_ready")
+def poll_serp_tasks_ready():
+    """
+    Drain completed standard-queue rank checks for every DataForSEO account.
+    Runs every SERP_TASKS_POLL_INTERVAL seconds (configured in celery_app.py).
+    """
+    db = SessionLocal()
+    try:
+        creds = db.query(ApiCredential).filter(
+            ApiCredential.provider == "dataforseo",
+            ApiCredential.is_active == True
+        ).all()
+
+        seen_logins = set()
+        totals = {"ingested": 0, "keywords_updated": 0, "failed": 0}
+
+        for cred in creds:
+            dataforseo = get_dataforseo_service(db, cred.user_id)
+            if not dataforseo or dataforseo.login in seen_logins:
+                continue
+            seen_logins.add(dataforseo.login)
+
+            # tasks_ready returns at most 1,000 tasks per call; keep going until drained,
+            # up to SERP_TASKS_POLL_MAX_PAGES calls (the next poll picks up the rest)
+            for _ in range(settings.SERP_TASKS_POLL_MAX_PAGES):
+                ready = run_async(dataforseo.get_ready_serp_tasks())
+                if not ready["success"]:
+                    break
+
+                rank_tasks = [
+                    task for task in ready["tasks"]
+                    if (task.get("tag") or "").startswith(RANK_TASK_TAG_PREFIX)
+                ]
+                counts = _ingest_ready_tasks(db, dataforseo, rank_tasks)
+                for key in totals:
+                    totals[key] += counts[key]
+
+                # A full page that collected nothing (foreign tags or failed task_get
+                # calls) would come back unchanged on the next call
+                if ready["count"] < 1000 or counts["ingested"] == 0:
+                    break
+
+        return {"success": True, "accounts": len(seen_logins), **totals}
+
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+def _store_next_checks(db: Session, rows: List[Dict]) -> None:
+    """Write keywords' next_rank_check_at ({"id", "next_rank_check_at"} rows) and clear the list"""
+    if rows:
+        db.execute(update(Keyword), rows)
+        rows.clear()
+
+
+def _enqueue_rank_checks(
+    db: Session,
+    due: Callable[[SerpSignature, Any], Optional[float]],
+    with_history: bool = False,
+    due_before: Optional[datetime] = None
+) -> Dict:
+    """
+    Stream tracked keywords and enqueue a check for each unique SERP that is due.
+    `due(signature, row)` returns the delay in seconds before the check
+    should run, or None to skip it (row as from _iter_tracked_keywords). Keywords are deduplicated by SERP
+    signature: the first keyword seen for a SERP represents it and the result
+    is fanned out on ingest. Checks are batched per user and delay slot
+    (RANK_CHECK_SLOT_SECONDS) and published in Celery groups. Returns counters.
+    With due_before, only keywords whose slot has come round are read, and
+    each is moved on to its next slot after due_before (the caller commits).
+    """
+    live = settings.RANK_CHECK_MODE == "live"
+    batch_size = settings.RANK_CHECK_BATCH_SIZE if live else settings.RANK_POST_BATCH_SIZE
+    slot_seconds = settings.RANK_CHECK_SLOT_SECONDS
+    counters = {"total_keywords": 0, "unique_serps": 0, "tasks_queued": 0}
+    pending = []
+
+    def enqueue(keyword_ids: List[str], user_id: str, slot: int) -> None:
+        if live:
+            task = check_keyword_ranks_batch.si(keyword_ids, user_id, fan_out=True)
+        else:
+            task = post_rank_check_tasks.si(keyword_ids, user_id)
+        pending.append(task.set(countdown=slot * slot_seconds) if slot else task)
+        if len(pending) >= settings.RANK_ENQUEUE_GROUP_SIZE:
+            flush()
+
+    def flush() -> None:
+        # One group per round trip to the broker instead of one publish per task
+        if pending:
+            group(pending).apply_async()
+            counters["tasks_queued"] += len(pending)
+            pending.clear()
+
+    # Rows arrive grouped by owner; buffer the current owner's keywords per delay slot
+    seen: Set[SerpSignature] = set()
+    slots: Dict[int, List[str]] = defaultdict(list)
+    slots_user = None
+    next_checks: List[Dict] = []
+    for row in _iter_tracked_keywords(db, with_history, due_before):
+        counters["total_keywords"] += 1
+        signature = serp_signature(row.keyword_text, row.location_code, row.language_code)
+        if due_before is not None:
+            # Stored as naive UTC, like the other timestamps
+            next_checks.append({
+                "id": row.keyword_id,
+                "next_rank_check_at": next_check_after(signature, due_before, row.timezone).replace(tzinfo=None),
+            })
+            if len(next_checks) >= settings.RANK_ENQUEUE_FETCH_SIZE:
+                _store_next_checks(db, next_checks)
+        if signature in seen:
+            continue
+        delay = due(signature, row)
+        if delay is None:
+            continue
+        seen.add(signature)
+
+        user_id = str(row.user_id)
+        if user_id != slots_user:
+            for slot, keyword_ids in slots.items():
+                enqueue(keyword_ids, slots_user, slot)
+            slots.clear()
+            slots_user = user_id
+
+        slot = int(max(delay, 0) // slot_seconds)
+        slots[slot].append(str(row.keyword_id))
+        if len(slots[slot]) >= batch_size:
+            enqueue(slots.pop(slot), user_id, slot)
+
+    for slot, keyword_ids in slots.items():
+        enqueue(keyword_ids, slots_user, slot)
+    flush()
+    _store_next_checks(db, next_checks)
+    counters["unique_serps"] = len(seen)
+    return counters
+
+
+@shared_task(name="app.tasks.rank_tracking.schedule_rank_checks")
+def schedule_rank_checks(tick_start: Optional[str] = None):
+    """
+    Scheduler tick for the nightly rank checks.
+    Runs every RANK_CHECK_TICK_MINUTES (configured in celery_app.py) and
+    enqueues the SERPs whose check time (see app/services/rank_schedule.py)
+    falls inside this tick, each delayed to its slot, so the night's checks
+    reach the queue and the API at a flat rate across the window.
+    Only keywords whose stored slot falls before the end of the tick are
+    read, and ticks outside the window return without touching the database.
+    A stored slot before the tick (missed by a late or skipped tick) is
+    checked right away rather than moved on to the next night.
+    With RANK_CHECK_ADAPTIVE, keywords whose recent ranks are stable are
+    skipped until their check interval has passed; checks_avoided counts them.
+    """
+    start = datetime.fromisoformat(tick_start) if tick_start else current_tick()
+    end = start + timedelta(minutes=settings.RANK_CHECK_TICK_MINUTES)
+    if not tick_in_window(start, end):
+        return {
+            "success": True,
+            "mode": settings.RANK_CHECK_MODE,
+            "tick_start": start.isoformat(),
+            "checks_avoided": 0,
+            "total_keywords": 0,
+            "unique_serps": 0,
+            "tasks_queued": 0
+        }
+
+    now = datetime.now(timezone.utc)
+    missed_before = start.replace(tzinfo=None)  # next_rank_check_at is naive UTC
+    adaptive = settings.RANK_CHECK_ADAPTIVE
+    avoided = 0
+
+    def due(signature: SerpSignature, row) -> Optional[float]:
+        nonlocal avoided
+        at = next_check_at(signature, start, end, row.timezone)
+        if at is None:
+            if row.next_rank_check_at is None or row.next_rank_check_at >= missed_before:
+                return None
+            at = now
+        if adaptive:
+            interval = check_interval_days(
+                row.samples, row.best_position, row.worst_position, row.rank_check_max_interval_days
+            )
+            if not is_check_due(row.last_checked_at, interval, at):
+                avoided += 1
+                return None
+        return (at - now).total_seconds()
+
+    db = SessionLocal()
+    try:
+        counters = _enqueue_rank_checks(db, due, with_history=adaptive, due_before=end)
+        db.commit()
+        return {
+            "success": True,
+            "mode": settings.RANK_CHECK_MODE,
+            "tick_start": start.isoformat(),
+            "checks_avoided": avoided,
+            **counters
         }
 
+    except Exception as e:
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@shared_task(name="app.tasks.rank_tracking.daily_rank_check_job")
+def daily_rank_check_job():
+    """
+    Check ranks for all tracked keywords right away.
+    The nightly sweep is spread across a window by schedule_rank_checks;
+    this enqueues everything at once (manual runs, backfills).
+    Keywords are deduplicated by SERP signature (normalized text, location,
+    language, device, depth) across all projects and users: each unique SERP
+    is fetched once, for one representative keyword, and fanned out on ingest.
+    In "standard" mode checks are posted per user in batches of
+    RANK_POST_BATCH_SIZE and collected by poll_serp_tasks_ready; in "live"
+    mode they are queued per user in batches of RANK_CHECK_BATCH_SIZE
+    (check_keyword_ranks_batch). Tracked keywords are streamed and tasks are
+    published in groups as they fill; only summary counters are returned.
+    """
+    db = SessionLocal()
+    try:
+        counters = _enqueue_rank_checks(db, lambda signature, row: 0)
+        return {"success": True, "mode": settings.RANK_CHECK_MODE, **counters}
+
     except Exception as e:
         return {"success": False, "error": str(e)}
     finally:
@@ -183,18 +778,23 @@ def check_project_ranks(project_id: str, user_id: str):
             RankTracking.project_id == project_id
         ).distinct().all()
 
+        keyword_ids = [str(keyword_id) for (keyword_id,) in tracked_keywords]
+        batch_size = settings.RANK_CHECK_BATCH_SIZE
+
         results = []
-        for (keyword_id,) in tracked_keywords:
-            result = check_keyword_rank.delay(str(keyword_id), user_id)
+        for i in range(0, len(keyword_ids), batch_size):
+            batch = keyword_ids[i:i + batch_size]
+            # User-triggered, so keep it ahead of the nightly batch queue
+            result = check_keyword_ranks_batch.apply_async((batch, user_id), queue="interactive")
             results.append({
-                "keyword_id": str(keyword_id),
+                "keywords": len(batch),
                 "task_id": result.id
             })
 
         return {
             "success": True,
             "project_id": project_id,
-            "total_keywords": len(results),
+            "total_keywords": len(keyword_ids),
             "tasks_queued": results
         }
 
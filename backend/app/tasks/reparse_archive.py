@@ -0,0 +1,159 @@
+"""
+Re-run SERP parsers over the raw response archive.
+Backfills columns derived from archived DataForSEO responses (currently
+serp_features on snapshot frames and legacy snapshot rows) without any
+API spend. Decompression and parsing run in worker processes; the parent
+applies updates in batches.
+
+Usage:
+    python -m app.tasks.reparse_archive --since 2026-01-01 --workers 8
+"""
+from sqlalchemy import bindparam, exists, func, update
+from sqlalchemy.orm import Session
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+import argparse
+import json
+import os
+
+from app.core.database import SessionLocal
+from app.models.keyword import Keyword
+from app.models.rank_tracking import RankTracking
+from app.models.serp_snapshot import SerpSnapshot, SerpSnapshotFrame
+from app.services.dataforseo import DataForSEOService, normalize_keyword
+from app.services.raw_archive import RawArchive
+
+SERP_ENDPOINTS = (
+    "serp/google/organic/live/advanced",
+    "serp/google/organic/task_get/advanced",
+)
+
+# Index entries handed to the pool at a time, so huge archives are not queued up front
+ENTRIES_PER_ROUND = 1024
+
+
+def extract_serp_features(root: str, entry: Dict) -> List[Dict]:
+    """
+    Parse one archived SERP response into serp_features updates.
+    Runs in a worker process, so it only touches the filesystem.
+    """
+    data = json.loads(RawArchive(root).get(entry["digest"], entry["codec"]))
+    rows = []
+    for task in data.get("tasks") or []:
+        params = task.get("data") or {}
+        if task.get("status_code") != 20000 or not params.get("keyword"):
+            continue
+        for result in task.get("result") or []:
+            rows.append({
+                "b_keyword": normalize_keyword(params["keyword"]),
+                "b_location_code": params.get("location_code", 2840),
+                "b_language_code": params.get("language_code", "en"),
+                "b_snapshot_date": date.fromisoformat(entry["snapshot_date"]),
+                "b_serp_features": DataForSEOService._serp_features(result),
+            })
+    return rows
+
+
+def backfill_serp_features(db: Session, rows: List[Dict]) -> int:
+    """
+    Set serp_features on the snapshot frames and rows each archived SERP produced,
+    matched by normalized keyword text, tracked locale and snapshot date.
+    Does not commit. Returns the number of rows updated (when reported).
+    """
+    if not rows:
+        return 0
+
+    updated = 0
+    # Frames carry the page-level features once; legacy rows repeat them per result
+    for snapshots in (SerpSnapshotFrame.__table__, SerpSnapshot.__table__):
+        stmt = update(snapshots).where(
+            snapshots.c.keyword_id == Keyword.id,
+            snapshots.c.snapshot_date == bindparam("b_snapshot_date"),
+            func.lower(func.trim(Keyword.keyword_text)) == bindparam("b_keyword"),
+            exists().where(
+                RankTracking.keyword_id == Keyword.id,
+                RankTracking.location_code == bindparam("b_location_code"),
+                RankTracking.language_code == bindparam("b_language_code")
+            )
+        ).values(serp_features=bindparam("b_serp_features"))
+        updated += max(db.execute(stmt, rows).rowcount, 0)
+    return updated
+
+
+def _serp_entries(archive: RawArchive, since: Optional[date], until: Optional[date]) -> Iterable[Dict]:
+    """Archived SERP fetches, once per (response, day), in fetch order"""
+    seen = set()
+    for entry in archive.iter_index(since, until):
+        if not entry["endpoint"].startswith(SERP_ENDPOINTS):
+            continue
+        key = (entry["digest"], entry["snapshot_date"])
+        if key in seen:
+            continue
+        seen.add(key)
+        yield entry
+
+
+def reparse_archive(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    workers: Optional[int] = None,
+    batch_size: int = 500,
+    root: Optional[str] = None
+) -> Dict:
+    """
+    Re-parse archived SERP responses and backfill snapshot columns.
+    Entries are processed in fetch order, so the last fetch of a day wins,
+    matching what the live path stored.
+    """
+    archive = RawArchive(root)
+    extract = partial(extract_serp_features, str(archive.root))
+    entries = iter(_serp_entries(archive, since, until))
+    totals = {"responses": 0, "serps": 0, "updated": 0}
+
+    db = SessionLocal()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            pending: List[Dict] = []
+            while True:
+                round_entries = list(islice(entries, ENTRIES_PER_ROUND))
+                if not round_entries:
+                    break
+                totals["responses"] += len(round_entries)
+                for rows in pool.map(extract, round_entries, chunksize=16):
+                    pending.extend(rows)
+                    if len(pending) >= batch_size:
+                        totals["serps"] += len(pending)
+                        totals["updated"] += backfill_serp_features(db, pending)
+                        db.commit()
+                        pending = []
+
+            totals["serps"] += len(pending)
+            totals["updated"] += backfill_serp_features(db, pending)
+            db.commit()
+    finally:
+        db.close()
+
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Re-parse archived DataForSEO SERP responses")
+    parser.add_argument("--since", type=date.fromisoformat, help="first snapshot date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last snapshot date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=500, help="updates per commit")
+    parser.add_argument("--root", help="archive directory (default: RAW_ARCHIVE_DIR)")
+    args = parser.parse_args(argv)
+
+    totals = reparse_archive(args.since, args.until, args.workers, args.batch_size, args.root)
+    print(
+        f"Re-parsed {totals['responses']} responses, {totals['serps']} SERPs; "
+        f"updated {totals['updated']} snapshot rows"
+    )
+
+
+if __name__ == "__main__":
+    main()
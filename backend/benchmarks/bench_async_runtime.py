@@ -0,0 +1,103 @@
+"""
+Tasks per second for provider calls made from Celery-style sync tasks,
+with a fresh event loop per task (asyncio.run) versus the persistent
+worker loop (app/core/async_runtime.py).
+
+Each "task" runs one DataForSEOService.get_serp_results call through
+async_runtime.run_sync (what app.tasks.common.run_async uses) against
+the local stand-in served over TCP, so connection setup is paid the way
+it is in production.
+
+Run from backend/:
+    python -m benchmarks.bench_async_runtime [--tasks 300] [--latency 0.02]
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+from typing import Dict
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ENCRYPTION_KEY", "bench")
+os.environ["SERP_CACHE_TTL"] = "0"
+os.environ["DATAFORSEO_RATE_LIMIT_ENABLED"] = "false"
+os.environ["SINGLEFLIGHT_ENABLED"] = "false"
+os.environ["RAW_ARCHIVE_ENABLED"] = "false"
+
+import uvicorn  # noqa: E402
+
+from app.core import async_runtime  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.services.dataforseo import DataForSEOService  # noqa: E402
+from benchmarks.dataforseo_standin import create_app  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_standin(latency: float) -> uvicorn.Server:
+    """Run the stand-in on a background thread and wait until it accepts connections"""
+    port = _free_port()
+    config = uvicorn.Config(create_app(latency=latency), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    server.port = port
+    return server
+
+
+def task(i: int) -> Dict:
+    """One rank-check-shaped task body"""
+    service = DataForSEOService("bench", "bench")
+    return async_runtime.run_sync(service.get_serp_results(f"keyword {i % 50}", depth=10))
+
+
+def measure(tasks: int) -> float:
+    start = time.perf_counter()
+    for i in range(tasks):
+        result = task(i)
+        if not result["success"]:
+            raise SystemExit(f"Task failed: {result.get('error')}")
+    return tasks / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency in seconds")
+    args = parser.parse_args()
+
+    server = serve_standin(args.latency)
+    settings.DATAFORSEO_BASE_URL = f"http://127.0.0.1:{server.port}/v3"
+    DataForSEOService.BASE_URL = settings.DATAFORSEO_BASE_URL
+    # HTTP/2 needs TLS; the plain-HTTP stand-in speaks HTTP/1.1 either way
+    settings.HTTP2_ENABLED = False
+
+    try:
+        task(0)  # warm imports and the stand-in
+        per_task = measure(args.tasks)
+
+        async_runtime.start_async_runtime()
+        try:
+            task(0)
+            persistent = measure(args.tasks)
+        finally:
+            async_runtime.stop_async_runtime()
+    finally:
+        server.should_exit = True
+
+    print(f"{'mode':<28}{'tasks/s':>10}")
+    print(f"{'asyncio.run per task':<28}{per_task:>10.1f}")
+    print(f"{'persistent worker loop':<28}{persistent:>10.1f}")
+    print(f"speedup: {persistent / per_task:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare tree parsing (json.loads + _parse_*) with incremental parsing
+(ijson, one item at a time) on realistic DataForSEO payloads.
+
+Run from backend/:
+    python -m benchmarks.bench_parsers [--repeat 30]
+
+Reports the best wall time per parse and the peak Python allocation
+(tracemalloc) while parsing, excluding the raw body itself.
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ENCRYPTION_KEY", "bench")
+
+from app.core.config import settings  # noqa: E402
+from app.services import json_stream  # noqa: E402
+from app.services.backlinks import BacklinkService  # noqa: E402
+from app.services.dataforseo import DataForSEOService  # noqa: E402
+from benchmarks.dataforseo_standin import _envelope, _task, serp_result  # noqa: E402
+
+
+def _advanced_item(item: Dict, index: int) -> Dict:
+    """Add the nested fields a real advanced SERP item carries"""
+    return {
+        **item,
+        "highlighted": ["seo", "tools"],
+        "links": [
+            {"type": "link_element", "title": f"Sitelink {i}", "description": None,
+             "url": f"{item.get('url', 'https://example.com')}/s{i}"}
+            for i in range(4)
+        ],
+        "about_this_result": {"type": "about_this_result_element", "source_info": "Source " * 30,
+                              "search_terms": ["seo", "tools"], "related_terms": ["rank", "audit"]},
+        "extended_snippet": None, "pre_snippet": None, "amp_version": False, "rating": None,
+        "price": None, "faq": None, "main_domain": item.get("domain"),
+        "cache_url": f"https://webcache.googleusercontent.com/search?q=cache:{index}",
+        "xpath": "/html[1]/body[1]/div[6]/div[1]/div[10]/div[1]/div[2]/div[2]/div[1]/div[%d]" % index,
+        "timestamp": "2026-10-01 12:00:00 +00:00",
+    }
+
+
+def serp_body(tasks: int = 1, depth: int = 100) -> bytes:
+    envelope_tasks = []
+    for t in range(tasks):
+        result = serp_result(f"keyword {t}", depth=depth)
+        result["items"] = [_advanced_item(item, i) for i, item in enumerate(result["items"])]
+        envelope_tasks.append(_task(20000, {"keyword": f"keyword {t}", "tag": str(t)}, [result]))
+    return json.dumps(_envelope(envelope_tasks)).encode()
+
+
+def backlinks_body(count: int = 1000) -> bytes:
+    items = [
+        {
+            "type": "backlink", "domain_from": f"site{i}.com", "url_from": f"https://site{i}.com/post/{i}",
+            "url_to": "https://example.com/", "tld_from": "com", "is_new": False, "is_lost": False,
+            "backlink_spam_score": 3, "rank": 120, "page_from_rank": 80, "domain_from_rank": 300,
+            "domain_from_platform_type": ["blogs"], "domain_from_is_ip": False, "domain_from_ip": "10.0.0.1",
+            "domain_from_country": "US", "page_from_external_links": 40, "page_from_internal_links": 120,
+            "page_from_size": 51234, "page_from_encoding": "utf-8", "page_from_language": "en",
+            "page_from_title": "A post title " * 4, "page_from_status_code": 200,
+            "first_seen": "2023-01-01 00:00:00 +00:00", "prev_seen": None, "last_seen": "2026-10-01 00:00:00 +00:00",
+            "item_type": "anchor", "attributes": None, "dofollow": True, "original": True, "alt": None,
+            "image_url": None, "anchor": "seo tools", "text_pre": "Context before " * 5,
+            "text_post": "Context after " * 5, "semantic_location": "article", "links_count": 1,
+            "group_count": 1, "is_broken": False, "url_to_status_code": 200, "url_to_spam_score": 0,
+            "url_to_redirect_target": None, "ranked_keywords_info": {"page_from_keywords_count_top_3": 0,
+                                                                     "page_from_keywords_count_top_10": 2,
+                                                                     "page_from_keywords_count_top_100": 9},
+            "is_indirect_link": False, "indirect_link_path": None, "link_attribute": None,
+        }
+        for i in range(count)
+    ]
+    return json.dumps(_envelope([_task(20000, {"target": "example.com"}, [{"items": items}])])).encode()
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": best * 1000, "peak_kib": peak / 1024}
+
+
+def run(repeat: int) -> List[Dict]:
+    dataforseo = DataForSEOService("bench", "bench")
+    backlinks = BacklinkService("bench", "bench")
+    cases = [
+        ("SERP live, depth 100", serp_body(), lambda b: dataforseo._parse_serp_body(b)),
+        ("SERP task_get, depth 100", serp_body(), lambda b: dataforseo._parse_serp_task_body(b)),
+        ("SERP batch, 100 tasks", serp_body(tasks=100),
+         lambda b: [dataforseo._parse_serp_task(t) for t in dataforseo._iter_tasks(b)]),
+        ("Backlinks, 1,000 items", backlinks_body(), lambda b: backlinks._parse_backlinks_body(b)),
+    ]
+
+    rows = []
+    for name, body, parse in cases:
+        row = {"case": name, "body_kib": len(body) / 1024}
+        for mode, enabled in (("tree", False), ("stream", True)):
+            settings.STREAMING_PARSE_ENABLED = enabled
+            settings.STREAMING_PARSE_MIN_BYTES = 0
+            row[mode] = measure(lambda: parse(body), repeat)
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    if json_stream.ijson is None:
+        raise SystemExit("ijson is not installed; nothing to compare")
+    print(f"ijson backend: {json_stream.ijson.backend}")
+    print(f"{'case':<26}{'body KiB':>10}{'tree ms':>10}{'stream ms':>11}{'tree peak KiB':>15}{'stream peak KiB':>17}")
+    for row in run(args.repeat):
+        print(
+            f"{row['case']:<26}{row['body_kib']:>10.0f}"
+            f"{row['tree']['ms']:>10.2f}{row['stream']['ms']:>11.2f}"
+            f"{row['tree']['peak_kib']:>15.0f}{row['stream']['peak_kib']:>17.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
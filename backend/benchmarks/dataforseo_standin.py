@@ -0,0 +1,283 @@
+"""
+Local stand-in for the DataForSEO endpoints the dashboard uses.
+Serves realistic, deterministic payloads (the same keyword always returns
+the same 100-result SERP) with configurable latency, error and throttle
+rates, so the rank pipeline can be load tested without API spend.
+
+Run as a server and point the app at it:
+    uvicorn benchmarks.dataforseo_standin:app --port 8099
+    DATAFORSEO_BASE_URL=http://localhost:8099/v3
+
+Or use it in-process:
+    httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(latency=0.2)))
+
+Server settings are read from STANDIN_LATENCY (seconds), STANDIN_JITTER
+(seconds), STANDIN_ERROR_RATE, STANDIN_THROTTLE_RATE and STANDIN_SEED.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SERP_FEATURES = [
+    "featured_snippet", "people_also_ask", "local_pack", "images",
+    "video", "top_stories", "knowledge_graph", "related_searches",
+]
+WORDS = [
+    "seo", "guide", "tools", "best", "review", "pricing", "tips", "blog",
+    "agency", "software", "local", "audit", "marketing", "content", "rank",
+]
+
+
+def _rng(*parts) -> random.Random:
+    """Deterministic generator for a request's parameters"""
+    seed = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _domain(rng: random.Random) -> str:
+    return f"{rng.choice(WORDS)}{rng.choice(WORDS)}{rng.randint(1, 999)}.{rng.choice(['com', 'net', 'io', 'org'])}"
+
+
+def serp_result(keyword: str, location_code: int = 2840, language_code: str = "en", depth: int = 100) -> Dict:
+    """One advanced SERP result block: `depth` organic items plus a few features"""
+    rng = _rng("serp", keyword.strip().lower(), location_code, language_code)
+    features = rng.sample(SERP_FEATURES, rng.randint(0, 4))
+    items: List[Dict] = []
+    for position in range(1, depth + 1):
+        # Sprinkle feature blocks among the first page of results
+        if features and position in (1, 4, 7, 10) and position // 3 < len(features):
+            items.append({"type": features[position // 3], "rank_group": 1, "rank_absolute": len(items) + 1})
+        domain = _domain(rng)
+        items.append({
+            "type": "organic",
+            "rank_group": position,
+            "rank_absolute": len(items) + 1,
+            "domain": domain,
+            "url": f"https://{domain}/{keyword.strip().lower().replace(' ', '-')}-{rng.randint(1, 99)}",
+            "title": f"{keyword.title()} - {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(24)),
+            "breadcrumb": f"https://{domain}",
+            "is_featured_snippet": False,
+        })
+    return {
+        "keyword": keyword,
+        "type": "organic",
+        "se_domain": "google.com",
+        "location_code": location_code,
+        "language_code": language_code,
+        "datetime": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S +00:00"),
+        "item_types": ["organic", *features],
+        "se_results_count": rng.randint(10_000, 50_000_000),
+        "items_count": len(items),
+        "items": items,
+    }
+
+
+def _task(status_code: int, data: Dict, result: Optional[List[Dict]], task_id: Optional[str] = None) -> Dict:
+    return {
+        "id": task_id or str(uuid.uuid4()),
+        "status_code": status_code,
+        "status_message": "Ok." if status_code == 20000 else ("Task Created." if status_code == 20100 else "Error."),
+        "time": "0.1 sec.",
+        "cost": 0.002 if status_code == 20000 else 0,
+        "result_count": len(result or []),
+        "path": [],
+        "data": data,
+        "result": result,
+    }
+
+
+def _envelope(tasks: List[Dict]) -> Dict:
+    return {
+        "version": "0.1.standin",
+        "status_code": 20000,
+        "status_message": "Ok.",
+        "time": "0.1 sec.",
+        "cost": sum(task["cost"] for task in tasks),
+        "tasks_count": len(tasks),
+        "tasks_error": sum(1 for task in tasks if task["status_code"] >= 40000),
+        "tasks": tasks,
+    }
+
+
+def create_app(
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    seed: Optional[int] = None
+) -> FastAPI:
+    """
+    Build a stand-in app.
+    latency/jitter: seconds added to every response (uniform jitter)
+    error_rate: share of requests answered with HTTP 500
+    throttle_rate: share answered with a throttle (HTTP 429 or status_code 40202)
+    """
+    app = FastAPI(title="DataForSEO stand-in")
+    chaos = random.Random(seed)
+    queued: Dict[str, Dict] = {}  # task_post tasks waiting for tasks_ready / task_get
+    app.state.stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    @app.middleware("http")
+    async def simulate_network(request: Request, call_next):
+        app.state.stats["requests"] += 1
+        if latency or jitter:
+            await asyncio.sleep(max(0.0, latency + chaos.uniform(-jitter, jitter)))
+        roll = chaos.random()
+        if roll < error_rate:
+            app.state.stats["errors"] += 1
+            return JSONResponse({"status_code": 50000, "status_message": "Internal Error."}, status_code=500)
+        if roll < error_rate + throttle_rate:
+            app.state.stats["throttled"] += 1
+            if chaos.random() < 0.5:
+                return JSONResponse({"status_code": 40202, "status_message": "Rate limit exceeded."}, status_code=429)
+            return JSONResponse({
+                "version": "0.1.standin",
+                "status_code": 40202,
+                "status_message": "Rate-limit per minute is exceeded.",
+                "tasks": [],
+            })
+        return await call_next(request)
+
+    @app.get("/v3/dataforseo_labs/google/available_filters")
+    async def available_filters():
+        return _envelope([_task(20000, {}, [{}])])
+
+    @app.post("/v3/dataforseo_labs/google/bulk_keyword_difficulty/live")
+    async def bulk_keyword_difficulty(request: Request):
+        tasks = []
+        for data in await request.json():
+            items = []
+            for keyword in data.get("keywords") or []:
+                rng = _rng("kw", keyword.strip().lower(), data.get("location_code"), data.get("language_code"))
+                items.append({
+                    "keyword": keyword,
+                    "keyword_info": {
+                        "search_volume": rng.choice([0, 10, 30, 90, 260, 880, 2400, 12100, 74000]),
+                        "cpc": round(rng.uniform(0.1, 25.0), 2),
+                        "competition": round(rng.random(), 2),
+                    },
+                    "keyword_properties": {"keyword_difficulty": rng.randint(0, 100)},
+                })
+            tasks.append(_task(20000, data, [{"items_count": len(items), "items": items}]))
+        return _envelope(tasks)
+
+    @app.post("/v3/serp/google/organic/live/advanced")
+    async def serp_live(request: Request):
+        return _envelope([
+            _task(20000, data, [serp_result(
+                data["keyword"],
+                data.get("location_code", 2840),
+                data.get("language_code", "en"),
+                data.get("depth", 100)
+            )])
+            for data in await request.json()
+        ])
+
+    @app.post("/v3/serp/google/organic/task_post")
+    async def serp_task_post(request: Request):
+        tasks = []
+        for data in await request.json():
+            task = _task(20100, data, None)
+            queued[task["id"]] = data
+            tasks.append(task)
+        return _envelope(tasks)
+
+    @app.get("/v3/serp/google/organic/tasks_ready")
+    async def serp_tasks_ready():
+        # Everything posted is ready; DataForSEO returns at most 1,000 per call
+        ready = [
+            {"id": task_id, "se": "google", "se_type": "organic", "tag": data.get("tag"),
+             "endpoint_advanced": f"/v3/serp/google/organic/task_get/advanced/{task_id}"}
+            for task_id, data in list(queued.items())[:1000]
+        ]
+        return _envelope([_task(20000, {}, ready)])
+
+    @app.get("/v3/serp/google/organic/task_get/advanced/{task_id}")
+    async def serp_task_get(task_id: str):
+        data = queued.pop(task_id, None)
+        if data is None:
+            return _envelope([_task(40400, {}, None, task_id)])
+        result = serp_result(
+            data["keyword"], data.get("location_code", 2840),
+            data.get("language_code", "en"), data.get("depth", 100)
+        )
+        return _envelope([_task(20000, data, [result], task_id)])
+
+    @app.post("/v3/backlinks/summary/live")
+    async def backlinks_summary(request: Request):
+        tasks = []
+        for data in await request.json():
+            rng = _rng("summary", data.get("target"))
+            tasks.append(_task(20000, data, [{
+                "target": data.get("target"),
+                "rank": rng.randint(0, 1000),
+                "backlinks": rng.randint(0, 2_000_000),
+                "referring_domains": rng.randint(0, 50_000),
+                "referring_ips": rng.randint(0, 40_000),
+                "referring_subnets": rng.randint(0, 30_000),
+                "first_seen": "2019-03-01 00:00:00 +00:00",
+                "last_seen": datetime.utcnow().strftime("%Y-%m-%d 00:00:00 +00:00"),
+            }]))
+        return _envelope(tasks)
+
+    @app.post("/v3/backlinks/backlinks/live")
+    async def backlinks_list(request: Request):
+        tasks = []
+        for data in await request.json():
+            rng = _rng("backlinks", data.get("target"), data.get("offset", 0))
+            target = data.get("target")
+            items = []
+            for _ in range(data.get("limit", 100)):
+                domain = _domain(rng)
+                items.append({
+                    "type": "backlink",
+                    "domain_from": domain,
+                    "url_from": f"https://{domain}/{rng.choice(WORDS)}",
+                    "url_to": f"https://{target}/{rng.choice(WORDS)}",
+                    "page_from_rank": rng.randint(0, 1000),
+                    "domain_from_rank": rng.randint(0, 1000),
+                    "anchor": " ".join(rng.choice(WORDS) for _ in range(3)),
+                    "link_attribute": rng.choice([None, ["nofollow"]]),
+                    "first_seen": "2023-01-01 00:00:00 +00:00",
+                    "last_seen": datetime.utcnow().strftime("%Y-%m-%d 00:00:00 +00:00"),
+                })
+            tasks.append(_task(20000, data, [{"target": target, "items_count": len(items), "items": items}]))
+        return _envelope(tasks)
+
+    @app.post("/v3/backlinks/referring_domains/live")
+    async def referring_domains(request: Request):
+        tasks = []
+        for data in await request.json():
+            rng = _rng("referring", data.get("target"))
+            items = [
+                {
+                    "type": "backlinks_referring_domain",
+                    "domain": _domain(rng),
+                    "rank": rng.randint(0, 1000),
+                    "backlinks": rng.randint(1, 5000),
+                    "first_seen": "2022-06-01 00:00:00 +00:00",
+                    "last_seen": datetime.utcnow().strftime("%Y-%m-%d 00:00:00 +00:00"),
+                }
+                for _ in range(data.get("limit", 100))
+            ]
+            tasks.append(_task(20000, data, [{"target": data.get("target"), "items_count": len(items), "items": items}]))
+        return _envelope(tasks)
+
+    return app
+
+
+app = create_app(
+    latency=float(os.getenv("STANDIN_LATENCY", "0.3")),
+    jitter=float(os.getenv("STANDIN_JITTER", "0.1")),
+    error_rate=float(os.getenv("STANDIN_ERROR_RATE", "0")),
+    throttle_rate=float(os.getenv("STANDIN_THROTTLE_RATE", "0")),
+    seed=int(os.environ["STANDIN_SEED"]) if os.getenv("STANDIN_SEED") else None,
+)
@@ -13,7 +13,8 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    api_credits_remaining DECIMAL(10, 2) DEFAULT 0.00
+    api_credits_remaining DECIMAL(10, 2) DEFAULT 0.00,
+    timezone VARCHAR(64)  -- IANA name; places nightly rank checks in local time
 );
 
 CREATE INDEX idx_users_email ON users(email);
@@ -29,6 +30,7 @@ CREATE TABLE projects (
     domain VARCHAR(255) NOT NULL,
     gsc_connected BOOLEAN DEFAULT FALSE,
     gsc_refresh_token TEXT,
+    rank_check_max_interval_days INTEGER,  -- caps adaptive rank-check backoff; 1 = check nightly
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -49,22 +51,49 @@ CREATE TABLE keywords (
     cpc DECIMAL(10, 2),
     competition DECIMAL(5, 4),
     last_refreshed_at TIMESTAMP WITH TIME ZONE,
+    next_rank_check_at TIMESTAMP WITH TIME ZONE,  -- nightly rank-check slot (app/services/rank_schedule.py)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 CREATE INDEX idx_keywords_project_id ON keywords(project_id);
+CREATE INDEX idx_keywords_next_rank_check ON keywords(next_rank_check_at);
 CREATE INDEX idx_keywords_keyword_text ON keywords(keyword_text);
 CREATE INDEX idx_keywords_project_keyword ON keywords(project_id, keyword_text);
 CREATE INDEX idx_keywords_search_volume ON keywords(search_volume DESC NULLS LAST);
 
+-- ============================================================================
+-- KEYWORD METRICS TABLE
+-- ============================================================================
+-- Volume/CPC/competition/difficulty are project-independent: one row per
+-- normalized keyword and locale, fanned out to matching keywords rows
+CREATE TABLE keyword_metrics (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    keyword VARCHAR(500) NOT NULL,
+    location_code INTEGER NOT NULL,
+    language_code VARCHAR(10) NOT NULL,
+    search_volume INTEGER,
+    keyword_difficulty INTEGER,
+    cpc DECIMAL(10, 2),
+    competition DECIMAL(5, 4),
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX idx_keyword_metrics_lookup ON keyword_metrics(keyword, location_code, language_code);
+
+-- Normalized-text lookups used when fanning metrics out to keywords rows
+CREATE INDEX idx_keywords_normalized_text ON keywords(lower(trim(keyword_text)));
+
 -- ============================================================================
 -- RANK TRACKING TABLE
 -- ============================================================================
 CREATE TYPE search_engine_type AS ENUM ('google', 'bing', 'yahoo');
 
+-- Partitioned by month on checked_at (app/services/partitions.py creates
+-- rank_tracking_YYYY_MM partitions ahead of time and rolls expired months
+-- up into rank_tracking_weekly before detaching them)
 CREATE TABLE rank_tracking (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
     project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
     tracked_url TEXT NOT NULL,
@@ -72,15 +101,66 @@ CREATE TABLE rank_tracking (
     search_engine search_engine_type DEFAULT 'google',
     location_code INTEGER NOT NULL,
     language_code VARCHAR(10) NOT NULL DEFAULT 'en',
-    checked_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-);
+    checked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, checked_at)
+) PARTITION BY RANGE (checked_at);
+
+CREATE TABLE rank_tracking_default PARTITION OF rank_tracking DEFAULT;
 
-CREATE INDEX idx_rank_tracking_keyword_id ON rank_tracking(keyword_id);
-CREATE INDEX idx_rank_tracking_project_id ON rank_tracking(project_id);
-CREATE INDEX idx_rank_tracking_checked_at ON rank_tracking(checked_at DESC);
+CREATE INDEX idx_rank_tracking_project_checked ON rank_tracking(project_id, checked_at DESC);
 CREATE INDEX idx_rank_tracking_keyword_checked ON rank_tracking(keyword_id, checked_at DESC);
 
+-- Weekly aggregates of rank checks whose monthly partition has expired
+CREATE TABLE rank_tracking_weekly (
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    tracked_url TEXT NOT NULL,
+    week_start DATE NOT NULL,
+    best_position INTEGER,
+    worst_position INTEGER,
+    position_sum BIGINT NOT NULL DEFAULT 0,
+    ranked_checks INTEGER NOT NULL DEFAULT 0,
+    checks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (keyword_id, project_id, tracked_url, week_start)
+);
+
+-- Daily rank rollup maintained at ingest (app/services/rank_ingest.py);
+-- history charts read this instead of grouping raw checks. The key leads
+-- with (keyword_id, day) so a date range is one index range scan.
+CREATE TABLE rank_daily (
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    tracked_url TEXT NOT NULL,
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    best_position INTEGER,
+    worst_position INTEGER,
+    last_position INTEGER,
+    last_checked_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    position_sum BIGINT NOT NULL DEFAULT 0,
+    ranked_checks INTEGER NOT NULL DEFAULT 0,
+    checks INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (keyword_id, day, tracked_url)
+);
+
+-- Latest check per tracked URL, upserted at ingest (app/services/rank_ingest.py);
+-- the tracked-keyword listing reads one project's rows off the primary key
+CREATE TABLE current_rank (
+    project_id UUID NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    tracked_url TEXT NOT NULL,
+    rank_id UUID NOT NULL,
+    rank_position INTEGER,
+    previous_position INTEGER,
+    search_engine search_engine_type DEFAULT 'google',
+    location_code INTEGER NOT NULL,
+    language_code VARCHAR(10) NOT NULL DEFAULT 'en',
+    checked_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (project_id, keyword_id, tracked_url)
+);
+
+CREATE INDEX idx_current_rank_keyword ON current_rank(keyword_id, checked_at DESC);
+
 -- ============================================================================
 -- COMPETITOR DOMAINS TABLE
 -- ============================================================================
@@ -120,6 +200,47 @@ CREATE INDEX idx_serp_snapshots_domain ON serp_snapshots(domain);
 -- GIN index for JSONB serp_features
 CREATE INDEX idx_serp_snapshots_features ON serp_snapshots USING GIN (serp_features);
 
+-- One row per keyword per day: a keyframe with every result, or a delta
+-- (moved / entered / left) against the keyframe on base_date. New snapshots
+-- are stored here; serp_snapshots keeps rows written before the switch.
+-- Partitioned by month on snapshot_date, like rank_tracking.
+CREATE TABLE serp_snapshot_frames (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    snapshot_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    is_keyframe BOOLEAN NOT NULL,
+    base_date DATE NOT NULL,
+    serp_features JSONB,
+    data JSONB NOT NULL,
+    PRIMARY KEY (id, snapshot_date)
+) PARTITION BY RANGE (snapshot_date);
+
+CREATE TABLE serp_snapshot_frames_default PARTITION OF serp_snapshot_frames DEFAULT;
+
+CREATE UNIQUE INDEX idx_serp_snapshot_frames_keyword_date ON serp_snapshot_frames(keyword_id, snapshot_date);
+
+-- First keyframe of each week, kept after the frames' month has expired
+CREATE TABLE serp_snapshot_weekly (
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    week_start DATE NOT NULL,
+    snapshot_date DATE NOT NULL,
+    serp_features JSONB,
+    items JSONB NOT NULL,
+    PRIMARY KEY (keyword_id, week_start)
+);
+
+-- Keywords that share a SERP (same normalized text and locale) reference the
+-- snapshot rows stored under one source keyword instead of duplicating them
+CREATE TABLE serp_snapshot_refs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    source_keyword_id UUID NOT NULL REFERENCES keywords(id) ON DELETE CASCADE,
+    snapshot_date DATE NOT NULL DEFAULT CURRENT_DATE
+);
+
+CREATE UNIQUE INDEX idx_serp_snapshot_refs_keyword_date ON serp_snapshot_refs(keyword_id, snapshot_date);
+CREATE INDEX idx_serp_snapshot_refs_source ON serp_snapshot_refs(source_keyword_id, snapshot_date);
+
 -- ============================================================================
 -- BACKLINKS TABLE (Phase 2)
 -- ============================================================================
@@ -349,8 +470,15 @@ CREATE UNIQUE INDEX idx_mv_project_stats_project ON mv_project_stats(project_id)
 COMMENT ON TABLE users IS 'User accounts with authentication and API credits';
 COMMENT ON TABLE projects IS 'Website projects tracked by users';
 COMMENT ON TABLE keywords IS 'Keywords tracked within each project';
+COMMENT ON TABLE keyword_metrics IS 'Shared keyword metrics cache keyed by normalized keyword and locale';
 COMMENT ON TABLE rank_tracking IS 'Historical rank position data for keywords';
-COMMENT ON TABLE serp_snapshots IS 'Full SERP result snapshots for keywords';
+COMMENT ON TABLE rank_tracking_weekly IS 'Weekly rank aggregates for months past raw retention';
+COMMENT ON TABLE rank_daily IS 'Best, worst and last rank position per keyword, URL and day';
+COMMENT ON TABLE current_rank IS 'Latest and previous rank position per tracked keyword URL';
+COMMENT ON TABLE serp_snapshots IS 'Full SERP result snapshots for keywords (written before serp_snapshot_frames)';
+COMMENT ON TABLE serp_snapshot_frames IS 'Daily SERP snapshots as keyframes and deltas';
+COMMENT ON TABLE serp_snapshot_weekly IS 'Weekly SERP keyframes for months past raw retention';
+COMMENT ON TABLE serp_snapshot_refs IS 'Per-day references to SERP snapshots shared between keywords';
 COMMENT ON TABLE backlinks IS 'Backlink profile data for projects';
 COMMENT ON TABLE outreach_prospects IS 'Link building outreach prospects';
 COMMENT ON TABLE api_usage_logs IS 'API call tracking for cost management';
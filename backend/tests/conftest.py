@@ -0,0 +1,20 @@
+"""Shared test configuration"""
+import os
+
+# Required settings so app.core.config can be imported without a .env file
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-anon-key")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ENCRYPTION_KEY", "test-encryption-key")
+
+# Provider tests use mock transports; keep the Redis SERP cache off by default
+os.environ.setdefault("SERP_CACHE_TTL", "0")
+
+# The Redis-backed rate limiter is exercised with an explicit limiter in tests
+os.environ.setdefault("DATAFORSEO_RATE_LIMIT_ENABLED", "false")
+
+# Identical concurrent provider calls are coalesced in-process only in tests
+os.environ.setdefault("SINGLEFLIGHT_DISTRIBUTED", "false")
+
+# Provider tests must not write raw responses to disk
+os.environ.setdefault("RAW_ARCHIVE_ENABLED", "false")
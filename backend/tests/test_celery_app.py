@@ -0,0 +1,81 @@
+"""
+Tests for Celery queue routing.
+Run with: pytest backend/tests/test_celery_app.py
+"""
+import pytest
+from kombu import Connection
+
+from app.celery_app import (
+    BATCH_QUEUE,
+    INTERACTIVE_QUEUE,
+    MAINTENANCE_QUEUE,
+    QUEUE_CONCURRENCY,
+    celery_app,
+    worker_argv,
+)
+
+EXPECTED_ROUTES = {
+    "app.tasks.rank_tracking.check_keyword_rank": INTERACTIVE_QUEUE,
+    "app.tasks.rank_tracking.check_project_ranks": INTERACTIVE_QUEUE,
+    "app.tasks.keyword_research.refresh_project_keywords": INTERACTIVE_QUEUE,
+    "app.tasks.rank_tracking.check_keyword_ranks_batch": BATCH_QUEUE,
+    "app.tasks.rank_tracking.post_rank_check_tasks": BATCH_QUEUE,
+    "app.tasks.rank_tracking.daily_rank_check_job": BATCH_QUEUE,
+    "app.tasks.rank_tracking.schedule_rank_checks": MAINTENANCE_QUEUE,
+    "app.tasks.rank_tracking.poll_serp_tasks_ready": MAINTENANCE_QUEUE,
+    "app.tasks.maintenance.maintain_partitions": MAINTENANCE_QUEUE,
+    "app.tasks.maintenance.prune_raw_archive": MAINTENANCE_QUEUE,
+}
+
+
+def route(task_name, **options):
+    return celery_app.amqp.router.route(options, task_name)["queue"]
+
+
+@pytest.mark.parametrize("task_name, queue", sorted(EXPECTED_ROUTES.items()))
+def test_task_routes(task_name, queue):
+    assert route(task_name).name == queue
+
+
+def test_unrouted_tasks_and_overrides():
+    """Unlisted tasks go to the batch queue; an explicit queue wins"""
+    assert route("app.tasks.rank_tracking.some_new_task").name == BATCH_QUEUE
+    assert route("app.tasks.rank_tracking.check_keyword_ranks_batch", queue=INTERACTIVE_QUEUE).name == INTERACTIVE_QUEUE
+
+
+def test_every_periodic_task_runs_on_the_maintenance_queue():
+    for entry in celery_app.conf.beat_schedule.values():
+        assert route(entry["task"]).name == MAINTENANCE_QUEUE
+
+
+def test_each_task_is_delivered_to_exactly_one_queue():
+    """Queues must not share a binding, or a direct exchange copies every task into each of them"""
+    with Connection("memory://") as connection:
+        channel = connection.default_channel
+        for queue in celery_app.amqp.queues.values():
+            queue(channel).declare()
+
+        producer = connection.Producer()
+        for task_name in (
+            "app.tasks.rank_tracking.check_keyword_rank",
+            "app.tasks.rank_tracking.post_rank_check_tasks",
+            "app.tasks.maintenance.maintain_partitions",
+        ):
+            # Published the way Celery does: the routed queue's exchange and routing key
+            queue = route(task_name)
+            producer.publish({"task": task_name}, exchange=queue.exchange, routing_key=queue.routing_key)
+
+        sizes = {
+            name: channel.queue_declare(name, passive=True).message_count
+            for name in QUEUE_CONCURRENCY
+        }
+    assert sizes == {INTERACTIVE_QUEUE: 1, BATCH_QUEUE: 1, MAINTENANCE_QUEUE: 1}
+
+
+def test_worker_argv_per_queue():
+    assert worker_argv() == ["worker", "--loglevel=info", "-Q", "interactive,batch,maintenance"]
+    argv = worker_argv(BATCH_QUEUE)
+    assert argv[argv.index("-Q") + 1] == BATCH_QUEUE
+    assert argv[argv.index("-c") + 1] == str(QUEUE_CONCURRENCY[BATCH_QUEUE])
+    with pytest.raises(SystemExit):
+        worker_argv("default")
@@ -0,0 +1,32 @@
+"""
+Unit tests for the per-process provider credential cache.
+Run with: pytest backend/tests/test_credential_cache.py
+"""
+import json
+
+from app.services.credential_cache import CredentialCache
+
+
+def test_credential_cache_lru_ttl_and_invalidation():
+    """Cached services are evicted by size, age and invalidation messages"""
+    cache = CredentialCache(maxsize=2, ttl=60)
+    a, b, c = (("user-%s" % i, "dataforseo", "DataForSEOService") for i in "abc")
+
+    cache.put(a, "v1", "service-a", cache.generation)
+    cache.put(b, "v1", "service-b", cache.generation)
+    assert cache.get(a) == "service-a"  # a is now most recently used
+    cache.put(c, "v1", "service-c", cache.generation)
+    assert cache.get(b) is None
+    assert cache.get(a) == "service-a"
+
+    # A load that overlapped an invalidation is not cached
+    generation = cache.generation
+    cache._on_message({"data": json.dumps({"user_id": "user-a", "provider": "dataforseo"})})
+    assert cache.get(a) is None
+    cache.put(a, "v1", "stale-service", generation)
+    assert cache.get(a) is None
+    assert cache.get(c) == "service-c"
+
+    cache.ttl = 0
+    cache.put(a, "v2", "service-a2", cache.generation)
+    assert cache.get(a) is None
@@ -0,0 +1,511 @@
+"""
+Unit tests for the DataForSEO service layer.
+Run with: pytest backend/tests/test_dataforseo.py
+"""
+import asyncio
+import json
+import os
+from datetime import date
+
+import httpx
+import pytest
+
+from benchmarks.dataforseo_standin import create_app
+
+from app.core import async_runtime
+from app.core.config import settings
+from app.core.http import get_http_client, close_http_clients
+from app.services.backlinks import BacklinkService
+from app.services.dataforseo import DataForSEOService
+from app.services.provider_types import SerpItem
+from app.services import raw_archive
+from app.services.rate_limiter import RateLimiter
+from app.services.raw_archive import RawArchive
+from app.services.serp_cache import SerpCache
+from app.services.singleflight import SingleFlight
+
+
+def serp_task(items, status_code=20000, tag=None):
+    """Build a DataForSEO task envelope around SERP items"""
+    return {
+        "status_code": status_code,
+        "data": {"tag": tag} if tag else {},
+        "result": [{"items": items}],
+    }
+
+
+def organic(position, domain):
+    return {
+        "type": "organic",
+        "rank_absolute": position,
+        "url": f"https://{domain}/page",
+        "domain": domain,
+        "title": f"{domain} title",
+        "description": f"{domain} description",
+    }
+
+
+@pytest.mark.asyncio
+async def test_pooled_client_is_reused_on_same_loop():
+    """Every service on one loop shares a single keep-alive client"""
+    try:
+        first = get_http_client("dataforseo")
+        assert get_http_client("dataforseo") is first
+        assert DataForSEOService("login", "password").client is first
+        assert get_http_client("anthropic") is not first
+    finally:
+        await close_http_clients()
+    assert first.is_closed
+
+
+def test_async_runtime_keeps_pools_across_calls():
+    """Sync callers share one long-lived loop and its pooled client until shutdown"""
+    async def pooled_client():
+        return get_http_client("dataforseo")
+
+    async def fail():
+        raise ValueError("boom")
+
+    async_runtime.start_async_runtime()
+    try:
+        first = async_runtime.run_sync(pooled_client())
+        assert async_runtime.run_sync(pooled_client()) is first
+        with pytest.raises(ValueError):
+            async_runtime.run_sync(fail())
+        assert async_runtime.run_sync(pooled_client()) is first
+    finally:
+        async_runtime.stop_async_runtime()
+    assert first.is_closed
+    assert not async_runtime.async_runtime_running()
+
+
+@pytest.mark.asyncio
+async def test_get_serp_results_uses_injected_client():
+    """Injected clients are used instead of opening a new connection"""
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"tasks": [serp_task([organic(1, "example.com")])]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client)
+        result = await service.get_serp_results("seo tools")
+
+    assert result["success"] is True
+    assert result["results"][0]["domain"] == "example.com"
+    assert requests[0][0]["keyword"] == "seo tools"
+
+
+@pytest.mark.asyncio
+async def test_get_serp_results_batch_packs_100_tasks_per_request():
+    """Batches are chunked at 100 tasks and results keyed by caller id"""
+    posts = []
+
+    def handler(request):
+        tasks = json.loads(request.content)
+        posts.append(len(tasks))
+        return httpx.Response(200, json={"tasks": [
+            serp_task([organic(1, f"{task['keyword']}.com")], tag=task["tag"])
+            for task in tasks
+        ]})
+
+    requests = [{"id": f"kw-{i}", "keyword": f"keyword{i}"} for i in range(250)]
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client)
+        results = await service.get_serp_results_batch(requests)
+
+    assert sorted(posts) == [50, 100, 100]
+    assert len(results) == 250
+    assert results["kw-42"]["results"][0]["domain"] == "keyword42.com"
+
+
+@pytest.mark.asyncio
+async def test_get_serp_results_batch_reports_failed_tasks_per_id():
+    """A failed task does not fail the rest of its chunk"""
+    def handler(request):
+        tasks = json.loads(request.content)
+        return httpx.Response(200, json={"tasks": [
+            serp_task([], status_code=40501, tag=tasks[0]["tag"]),
+            serp_task([organic(3, "ok.com")], tag=tasks[1]["tag"]),
+        ]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client)
+        results = await service.get_serp_results_batch([
+            {"id": "bad", "keyword": "a"},
+            {"id": "good", "keyword": "b"},
+        ])
+
+    assert results["bad"]["success"] is False
+    assert results["good"]["results"][0]["position"] == 3
+
+
+@pytest.mark.asyncio
+async def test_standard_queue_round_trip():
+    """task_post ids map back to caller tags through tasks_ready and task_get"""
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/task_post"):
+            tasks = json.loads(request.content)
+            return httpx.Response(200, json={"tasks": [
+                {"id": f"task-{task['tag']}", "status_code": 20100, "data": {"tag": task["tag"]}}
+                for task in tasks
+            ]})
+        if path.endswith("/tasks_ready"):
+            return httpx.Response(200, json={"tasks": [{
+                "status_code": 20000,
+                "result": [{"id": "task-rank:1", "tag": "rank:1"}],
+            }]})
+        task_id = path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"tasks": [
+            serp_task([organic(7, "example.com")], tag=task_id[len("task-"):])
+        ]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client)
+        posted = await service.post_serp_tasks([{"id": "rank:1", "keyword": "seo tools"}])
+        ready = await service.get_ready_serp_tasks()
+        results = await service.get_serp_task_results([t["task_id"] for t in ready["tasks"]])
+
+    assert posted["rank:1"] == {"success": True, "task_id": "task-rank:1"}
+    assert ready["tasks"] == [{"task_id": "task-rank:1", "tag": "rank:1"}]
+    assert results["task-rank:1"]["tag"] == "rank:1"
+    assert results["task-rank:1"]["results"][0]["position"] == 7
+
+
+class FakeRedis:
+    """Minimal async stand-in for the Redis commands the SERP cache and singleflight use"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def eval(self, script, numkeys, key, token):
+        # Compare-and-delete, as used to release a singleflight lock
+        if self.store.get(key) == token.encode():
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_serp_cache_serves_repeat_requests_until_forced():
+    """Same-day repeats hit the cache; force_refresh goes back to the API"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"tasks": [serp_task([organic(2, "example.com")])]})
+
+    cache = SerpCache(ttl=60, redis_client=FakeRedis())
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, cache=cache)
+        first = await service.get_serp_results("SEO Tools ")
+        second = await service.get_serp_results("seo tools")
+        forced = await service.get_serp_results("seo tools", force_refresh=True)
+
+    assert len(calls) == 2
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["results"] == first["results"]
+    assert isinstance(second["results"][0], SerpItem)
+    assert "cached" not in forced
+
+
+@pytest.mark.asyncio
+async def test_unreadable_serp_cache_entry_falls_back_to_the_api():
+    """A truncated or foreign value under the key is a cache miss, not a failed fetch"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"tasks": [serp_task([organic(2, "example.com")])]})
+
+    redis = FakeRedis()
+    cache = SerpCache(ttl=60, redis_client=redis)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, cache=cache)
+        first = await service.get_serp_results("seo tools")
+        redis.store = {key: blob[:len(blob) // 2] for key, blob in redis.store.items()}  # truncated
+        second = await service.get_serp_results("seo tools")
+        redis.store = {key: b"not zlib at all" for key in redis.store}
+        third = await service.get_serp_results("seo tools")
+
+    assert len(calls) == 3
+    assert "cached" not in second and "cached" not in third
+    assert second["results"] == third["results"] == first["results"]
+
+
+@pytest.mark.asyncio
+async def test_failed_serp_task_is_not_cached():
+    """A task-level provider error is a failure, never cached as an empty SERP"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"tasks": [serp_task([], status_code=40501)]})
+
+    redis = FakeRedis()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, cache=SerpCache(ttl=60, redis_client=redis))
+        first = await service.get_serp_results("seo tools")
+        second = await service.get_serp_results("seo tools")
+
+    assert first["success"] is False
+    assert "40501" in first["error"]
+    assert second["success"] is False and "cached" not in second
+    assert len(calls) == 2
+    assert redis.store == {}
+
+
+class RecordingLimiter(RateLimiter):
+    """Limiter that grants every slot locally and records request outcomes"""
+
+    def __init__(self, **kwargs):
+        super().__init__("test", backoff=0, **kwargs)
+        self.outcomes = []
+
+    async def acquire(self):
+        return f"lease-{len(self.outcomes)}"
+
+    async def release(self, lease, outcome="ok"):
+        self.outcomes.append(outcome)
+
+
+@pytest.mark.asyncio
+async def test_throttled_requests_back_off_and_retry():
+    """429s and DataForSEO throttle codes are reported to the limiter and retried"""
+    responses = [
+        httpx.Response(429),
+        httpx.Response(200, json={"status_code": 40202, "tasks": []}),
+        httpx.Response(200, json={"status_code": 20000, "tasks": [serp_task([organic(1, "example.com")])]}),
+    ]
+
+    def handler(request):
+        return responses.pop(0)
+
+    limiter = RecordingLimiter(retries=3)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, limiter=limiter)
+        result = await service.get_serp_results("seo tools")
+
+    assert result["success"] is True
+    assert limiter.outcomes == ["throttled", "throttled", "ok"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_fails_open_without_redis():
+    """A Redis outage lets requests through instead of blocking them"""
+    class BrokenRedis:
+        def register_script(self, script):
+            async def run(keys, args):
+                raise ConnectionError("redis down")
+            return run
+
+    def handler(request):
+        return httpx.Response(200, json={"tasks": [serp_task([organic(1, "example.com")])]})
+
+    limiter = RateLimiter("test", redis_client=BrokenRedis())
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, limiter=limiter)
+        result = await service.get_serp_results("seo tools")
+
+    assert result["success"] is True
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request():
+    """Overlapping identical SERP requests in one process make a single upstream call"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"tasks": [serp_task([organic(1, "example.com")])]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, singleflight=SingleFlight(distributed=False))
+        first, second, other = await asyncio.gather(
+            service.get_serp_results("seo tools"),
+            service.get_serp_results(keyword="seo tools", location_code=2840),
+            service.get_serp_results("seo tools", location_code=2826),
+        )
+
+    assert len(calls) == 2
+    assert first is second
+    assert other is not first
+
+
+@pytest.mark.asyncio
+async def test_singleflight_shares_results_across_processes():
+    """A follower in another process picks up the leader's published result"""
+    redis = FakeRedis()
+    leader, follower = (SingleFlight(distributed=True, redis_client=redis) for _ in range(2))
+    follower.POLL_INTERVAL = 0.001
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"success": True, "results": [{"position": 1}]}
+
+    key = ["dataforseo/serp", ["seo tools"]]
+    first, second = await asyncio.gather(leader.do(key, fetch), follower.do(key, fetch))
+
+    assert len(calls) == 1
+    assert first == second
+    assert not any(k.startswith("singleflight:lock") for k in redis.store)
+
+
+@pytest.mark.asyncio
+async def test_typed_results_survive_cross_process_sharing():
+    """Results relayed through Redis come back as the same typed records"""
+    redis = FakeRedis()
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"tasks": [serp_task([organic(1, "example.com")])]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        leader, follower = (
+            DataForSEOService("login", "password", client=client,
+                              singleflight=SingleFlight(distributed=True, redis_client=redis))
+            for _ in range(2)
+        )
+        follower.singleflight.POLL_INTERVAL = 0.001
+        first, second = await asyncio.gather(
+            leader.get_serp_results("seo tools"), follower.get_serp_results("seo tools")
+        )
+
+    assert len(calls) == 1
+    assert isinstance(first["results"][0], SerpItem)
+    assert second["results"] == first["results"]
+    assert second["results"][0].url == "https://example.com/page"
+    assert dict(second["results"][0])["domain"] == "example.com"
+
+
+@pytest.mark.asyncio
+async def test_raw_responses_are_archived_once_per_content(tmp_path):
+    """Identical bodies share one archive object; every fetch is indexed"""
+    body = {"tasks": [serp_task([organic(1, "example.com"), {"type": "people_also_ask"}])]}
+
+    def handler(request):
+        return httpx.Response(200, json=body)
+
+    archive = RawArchive(str(tmp_path))
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        service = DataForSEOService("login", "password", client=client, archive=archive)
+        result = await service.get_serp_results("seo tools")
+        await service.get_serp_results("seo tools", force_refresh=True)
+
+    assert result["results"][0]["serp_features"] == ["people_also_ask"]
+
+    entries = list(archive.iter_index())
+    assert [e["endpoint"] for e in entries] == ["serp/google/organic/live/advanced"] * 2
+    assert entries[0]["digest"] == entries[1]["digest"]
+    assert len(list((tmp_path / "objects").rglob("*.*"))) == 1
+    assert json.loads(archive.get(entries[0]["digest"], entries[0]["codec"])) == body
+
+
+def test_raw_archive_prune_keeps_bodies_still_indexed(tmp_path):
+    """Pruning drops old index days and only the bodies nothing newer references"""
+    archive = RawArchive(str(tmp_path))
+    old_only = archive.put("serp", b'{"old": true}')
+    shared = archive.put("serp", b'{"shared": true}')
+    (tmp_path / "index" / f"{date.today().isoformat()}.jsonl").rename(tmp_path / "index" / "2026-01-01.jsonl")
+    archive.put("serp", b'{"shared": true}')
+    for digest in (old_only, shared):
+        path = next((tmp_path / "objects").rglob(f"{digest}.*"))
+        os.utime(path, (0, 0))
+
+    removed = archive.prune(date(2026, 2, 1))
+
+    assert removed == {"index_files": 1, "objects": 1}
+    assert [e["digest"] for e in archive.iter_index()] == [shared]
+    assert archive.get(shared, archive.codec) == b'{"shared": true}'
+    assert not list((tmp_path / "objects").rglob(f"{old_only}.*"))
+
+
+def test_raw_archive_is_opt_in_and_needs_an_absolute_dir(monkeypatch):
+    monkeypatch.setattr(raw_archive, "_archive", None)
+    monkeypatch.setattr(raw_archive.settings, "RAW_ARCHIVE_ENABLED", True)
+    monkeypatch.setattr(raw_archive.settings, "RAW_ARCHIVE_DIR", "data/raw_archive")
+    assert raw_archive.get_raw_archive() is None
+
+    monkeypatch.setattr(raw_archive.settings, "RAW_ARCHIVE_ENABLED", False)
+    monkeypatch.setattr(raw_archive.settings, "RAW_ARCHIVE_DIR", "/var/lib/seo-dashboard/raw_archive")
+    assert raw_archive.get_raw_archive() is None
+
+
+@pytest.mark.asyncio
+async def test_services_run_against_local_standin():
+    """The stand-in serves full SERPs, queued tasks and backlink data"""
+    transport = httpx.ASGITransport(app=create_app(seed=1))
+    async with httpx.AsyncClient(transport=transport) as client:
+        dataforseo = DataForSEOService("login", "password", client=client)
+        live = await dataforseo.get_serp_results("seo tools")
+        queued = await dataforseo.post_serp_tasks([{"id": "rank:1", "keyword": "seo tools"}])
+        ready = await dataforseo.get_ready_serp_tasks()
+        task = await dataforseo.get_serp_task_result(queued["rank:1"]["task_id"])
+        summary = await BacklinkService("login", "password", client=client).get_backlink_summary("example.com")
+
+    assert live["count"] == 100
+    assert [t["tag"] for t in ready["tasks"]] == ["rank:1"]
+    assert task["results"] == live["results"]
+    assert summary["success"] is True
+
+
+@pytest.mark.asyncio
+async def test_standin_throttles_are_retried():
+    """Throttle responses from the stand-in are absorbed by the limiter"""
+    app = create_app(throttle_rate=0.5, seed=3)
+    limiter = RecordingLimiter(retries=10)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app)) as client:
+        service = DataForSEOService("login", "password", client=client, limiter=limiter)
+        results = [await service.get_serp_results(f"keyword {i}") for i in range(5)]
+
+    assert all(r["success"] for r in results)
+    assert limiter.outcomes.count("throttled") == app.state.stats["throttled"] > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("streaming", [True, False])
+async def test_streaming_and_tree_parsers_agree(monkeypatch, streaming):
+    """Incremental parsing returns exactly what the tree parsers return"""
+    async def fetch_all():
+        transport = httpx.ASGITransport(app=create_app(seed=2))
+        async with httpx.AsyncClient(transport=transport) as client:
+            dataforseo = DataForSEOService("login", "password", client=client)
+            backlinks = BacklinkService("login", "password", client=client)
+            queued = await dataforseo.post_serp_tasks([{"id": "rank:1", "keyword": "seo tools"}])
+            return {
+                "serp": await dataforseo.get_serp_results("seo tools"),
+                "batch": await dataforseo.get_serp_results_batch([
+                    {"id": str(i), "keyword": f"keyword {i}"} for i in range(3)
+                ]),
+                "task": await dataforseo.get_serp_task_result(queued["rank:1"]["task_id"]),
+                "missing_task": await dataforseo.get_serp_task_result("unknown"),
+                "keywords": await dataforseo.get_keyword_data(["seo tools", "rank tracker"]),
+                "backlinks": await backlinks.get_backlinks("example.com", limit=50),
+                "domains": await backlinks.get_referring_domains("example.com", limit=50),
+            }
+
+    monkeypatch.setattr(settings, "STREAMING_PARSE_MIN_BYTES", 0)
+    monkeypatch.setattr(settings, "STREAMING_PARSE_ENABLED", streaming)
+    results = await fetch_all()
+    monkeypatch.setattr(settings, "STREAMING_PARSE_ENABLED", not streaming)
+    assert results == await fetch_all()
+    assert results["serp"]["results"][0]["serp_features"] is not None
+    assert results["missing_task"]["success"] is False
+
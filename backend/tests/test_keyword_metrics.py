@@ -0,0 +1,160 @@
+"""
+Tests for the shared keyword metrics store and the project refresh pipeline.
+Run with: pytest backend/tests/test_keyword_metrics.py
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every table on Base)
+from app.core.database import Base
+from app.models.keyword import Keyword
+from app.models.keyword_metrics import KeywordMetrics
+from app.models.project import Project
+from app.models.user import User
+from app.services import keyword_metrics
+from app.services.provider_types import KeywordData
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def add_project(db, keywords, refreshed_at=None):
+    user = User(email=f"{uuid.uuid4()}@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    project = Project(user_id=user.id, name="Site", domain="example.com")
+    db.add(project)
+    db.flush()
+    db.add_all([
+        Keyword(project_id=project.id, keyword_text=text, last_refreshed_at=refreshed_at)
+        for text in keywords
+    ])
+    db.commit()
+    return project.id
+
+
+class RecordingSession:
+    """Captures statements compiled for PostgreSQL instead of executing them"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt.compile(dialect=postgresql.dialect()))
+
+        class Result:
+            rowcount = 3
+        return Result()
+
+
+def test_stale_keyword_batches_page_by_keyset(db):
+    """Batches are distinct normalized text, in order, with no gaps or repeats"""
+    stale_after = datetime.utcnow() - timedelta(days=7)
+    project_id = add_project(db, [f"kw {i:02d}" for i in range(7)] + ["  KW 03 ", "kw 05"])
+    # Recently refreshed keywords are not stale
+    db.add(Keyword(project_id=project_id, keyword_text="fresh", last_refreshed_at=datetime.utcnow()))
+    db.commit()
+
+    batches = list(keyword_metrics.iter_stale_keyword_batches(db, project_id, stale_after, batch_size=3))
+
+    assert batches == [["kw 00", "kw 01", "kw 02"], ["kw 03", "kw 04", "kw 05"], ["kw 06"]]
+    assert keyword_metrics.count_stale_keywords(db, project_id, stale_after) == 7
+
+
+def test_stale_keyword_batches_survive_commits_between_batches(db):
+    """Keyset paging does not skip rows when a batch is marked refreshed mid-iteration"""
+    stale_after = datetime.utcnow() - timedelta(days=7)
+    project_id = add_project(db, ["a", "b", "c", "d"])
+
+    seen = []
+    for batch in keyword_metrics.iter_stale_keyword_batches(db, project_id, stale_after, batch_size=2):
+        seen.extend(batch)
+        db.query(Keyword).filter(Keyword.keyword_text.in_(batch)).update(
+            {Keyword.last_refreshed_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    assert seen == ["a", "b", "c", "d"]
+
+
+def test_fan_out_is_one_update_from_values():
+    """Every keyword's metrics land in a single UPDATE ... FROM (VALUES ...)"""
+    session = RecordingSession()
+    updated = keyword_metrics.fan_out_metrics(session, {
+        "seo tools": {"search_volume": 1000, "keyword_difficulty": 40, "cpc": 2.5, "competition": 0.3},
+        "rank tracker": {"search_volume": 90},
+    })
+
+    assert updated == 3
+    assert len(session.statements) == 1
+    sql = str(session.statements[0])
+    assert sql.startswith("UPDATE keywords SET")
+    assert "FROM (VALUES" in sql
+    assert "lower(trim(keywords.keyword_text)) = metric_values.keyword" in sql
+    params = list(session.statements[0].params.values())
+    assert "seo tools" in params and "rank tracker" in params
+    assert keyword_metrics.fan_out_metrics(session, {}) == 0
+    assert len(session.statements) == 1
+
+
+def test_store_metrics_upserts_one_row_per_keyword():
+    session = RecordingSession()
+    keyword_metrics.store_metrics(session, {"seo tools": {"search_volume": 1000}, "rank tracker": {}})
+
+    assert len(session.statements) == 1
+    sql = str(session.statements[0])
+    assert sql.startswith("INSERT INTO keyword_metrics")
+    assert "ON CONFLICT (keyword, location_code, language_code) DO UPDATE" in sql
+
+
+@pytest.mark.asyncio
+async def test_keywords_without_provider_data_get_a_marker():
+    """A keyword the provider has no item for is returned with empty metrics"""
+
+    class FakeDataForSEO:
+        async def get_keyword_data(self, keywords, location_code, language_code):
+            return {"success": True, "keywords": [
+                KeywordData(keyword="SEO Tools", search_volume=1000, cpc=2.5,
+                            competition=0.3, keyword_difficulty=40),
+            ]}
+
+    result = await keyword_metrics._fetch_metrics(FakeDataForSEO(), ["seo tools", "zzqx widget"], 2840, "en")
+
+    assert result["success"]
+    assert result["metrics"]["seo tools"].search_volume == 1000
+    assert result["metrics"]["zzqx widget"] == {}
+
+
+def test_no_data_marker_is_fresh_until_it_expires(db, monkeypatch):
+    monkeypatch.setattr(keyword_metrics.settings, "KEYWORD_METRICS_MAX_AGE_DAYS", 30)
+    monkeypatch.setattr(keyword_metrics.settings, "KEYWORD_METRICS_NO_DATA_MAX_AGE_DAYS", 7)
+    now = datetime.utcnow()
+    db.add_all([
+        KeywordMetrics(keyword="fresh marker", location_code=2840, language_code="en",
+                       fetched_at=now - timedelta(days=2)),
+        KeywordMetrics(keyword="expired marker", location_code=2840, language_code="en",
+                       fetched_at=now - timedelta(days=10)),
+        KeywordMetrics(keyword="seo tools", location_code=2840, language_code="en",
+                       search_volume=1000, fetched_at=now - timedelta(days=10)),
+    ])
+    db.commit()
+
+    fresh = keyword_metrics.get_fresh_metrics(db, ["fresh marker", "expired marker", "seo tools"])
+
+    assert set(fresh) == {"fresh marker", "seo tools"}
+    assert fresh["fresh marker"] == {field: None for field in keyword_metrics.METRIC_FIELDS}
@@ -0,0 +1,87 @@
+"""
+Tests for monthly partition naming, DDL and creation.
+Statements are recorded by a fake session instead of executed.
+Run with: pytest backend/tests/test_partitions.py
+"""
+from datetime import date
+
+from app.services import partitions
+
+
+class RecordingSession:
+    """Answers the partition listing and DEFAULT row checks, recording every statement"""
+
+    def __init__(self, existing, default_months=()):
+        self.existing = existing
+        self.default_months = {partitions._bound("rank_tracking", m) for m in default_months}
+        self.statements = []
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+
+        class Result:
+            rowcount = 4
+
+            def __init__(self, rows):
+                self.rows = rows
+
+            def __iter__(self):
+                return iter(self.rows)
+
+            def first(self):
+                return self.rows[0] if self.rows else None
+
+        if "pg_inherits" in sql:
+            return Result([(name,) for name in self.existing])
+        if sql.startswith("SELECT 1 FROM"):
+            return Result([(1,)] if any(f">= {bound}" in sql for bound in self.default_months) else [])
+        return Result([])
+
+
+def test_partition_names_and_bounds():
+    """Monthly partitions are named and bounded by calendar month"""
+    assert partitions.add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert partitions.add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+
+    name = partitions.partition_name("rank_tracking", date(2026, 12, 1))
+    assert name == "rank_tracking_2026_12"
+    assert partitions.partition_month("rank_tracking", name) == date(2026, 12, 1)
+    assert partitions.partition_month("rank_tracking", "rank_tracking_default") is None
+    assert partitions.partition_month("rank_tracking", "rank_tracking_weekly") is None
+
+    assert partitions.partition_ddl("rank_tracking", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS rank_tracking_2026_12 PARTITION OF rank_tracking "
+        "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+    )
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in partitions.partition_ddl(
+        "serp_snapshot_frames", date(2026, 12, 1), parent="serp_snapshot_frames_partitioned"
+    )
+
+
+def test_create_partitions_skips_existing_months():
+    db = RecordingSession(["rank_tracking_2026_12", "rank_tracking_default"])
+
+    created = partitions.create_partitions(db, "rank_tracking", date(2026, 12, 1), date(2027, 1, 1))
+
+    assert created == ["rank_tracking_2027_01"]
+    assert db.statements[-1].startswith("CREATE TABLE IF NOT EXISTS rank_tracking_2027_01 PARTITION OF")
+
+
+def test_create_partitions_moves_rows_out_of_default():
+    """A month with rows already in DEFAULT is built standalone, filled from DEFAULT, then attached"""
+    db = RecordingSession(["rank_tracking_default"], default_months=[date(2027, 1, 1)])
+
+    created = partitions.create_partitions(db, "rank_tracking", date(2027, 1, 1), date(2027, 2, 1))
+
+    assert created == ["rank_tracking_2027_01", "rank_tracking_2027_02"]
+    january = db.statements[2:5]
+    assert january[0] == "CREATE TABLE rank_tracking_2027_01 (LIKE rank_tracking INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    assert january[1].startswith("WITH moved AS (DELETE FROM rank_tracking_default WHERE checked_at >= '2027-01-01")
+    assert january[1].endswith("INSERT INTO rank_tracking_2027_01 SELECT * FROM moved")
+    assert january[2] == (
+        "ALTER TABLE rank_tracking ATTACH PARTITION rank_tracking_2027_01 "
+        "FOR VALUES FROM ('2027-01-01 00:00:00+00') TO ('2027-02-01 00:00:00+00')"
+    )
+    # February has nothing in DEFAULT, so it is created in place
+    assert db.statements[-1].startswith("CREATE TABLE IF NOT EXISTS rank_tracking_2027_02 PARTITION OF")
@@ -0,0 +1,286 @@
+"""
+Unit tests for bulk rank and snapshot writes (RankIngest).
+Statements are compiled for PostgreSQL and recorded instead of executed.
+Run with: pytest backend/tests/test_rank_ingest.py
+"""
+import uuid
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.rank_tracking import SearchEngine
+from app.services import rank_ingest
+from app.services.provider_types import SerpItem
+from app.services.rank_ingest import RankIngest
+
+TODAY = date(2026, 3, 10)
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql):
+        self.log.append(("cursor", sql))
+
+    def copy_expert(self, sql, buffer):
+        self.log.append(("copy", sql, buffer.getvalue()))
+
+    def close(self):
+        pass
+
+
+class RecordingSession:
+    """Records statements compiled for PostgreSQL; `driver` picks the COPY path or not"""
+
+    def __init__(self, driver="psycopg2"):
+        self.log = []
+        self.dialect = postgresql.dialect()
+        self.dialect.driver = driver
+
+    def execute(self, stmt, params=None):
+        self.log.append(("sql", str(stmt.compile(dialect=self.dialect)), params))
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=self.dialect)
+
+    def connection(self):
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: FakeCursor(self.log)))
+
+    def statements(self, kind="sql"):
+        return [entry for entry in self.log if entry[0] == kind]
+
+
+@pytest.fixture(autouse=True)
+def no_stored_keyframes(monkeypatch):
+    monkeypatch.setattr(rank_ingest, "latest_keyframes", lambda db, keyword_ids, before: {})
+
+
+def tracking(keyword_id, tracked_url="example.com"):
+    return SimpleNamespace(
+        keyword_id=keyword_id, project_id=uuid.UUID(int=1), tracked_url=tracked_url,
+        search_engine=SearchEngine.google, location_code=2840, language_code="en"
+    )
+
+
+def serp(*domains):
+    return [
+        SerpItem(i + 1, f"https://{d}/", d, f"{d} title", None, ["people_also_ask"])
+        for i, d in enumerate(domains)
+    ]
+
+
+def test_add_rank_queues_a_full_row():
+    ingest = RankIngest(TODAY)
+    keyword_id = uuid.uuid4()
+    row = ingest.add_rank(tracking(keyword_id), 3, datetime(2026, 3, 10, 3))
+
+    assert isinstance(row["id"], uuid.UUID)
+    assert row["keyword_id"] == keyword_id
+    assert (row["rank_position"], row["tracked_url"], row["checked_at"]) == (3, "example.com", datetime(2026, 3, 10, 3))
+    assert ingest.ranks == [row]
+    assert len(ingest) == 1
+
+
+def test_last_snapshot_or_reference_for_a_keyword_wins():
+    """A keyword holds one snapshot or one reference per batch"""
+    ingest = RankIngest(TODAY)
+    a, b = uuid.uuid4(), uuid.uuid4()
+
+    ingest.add_snapshot(a, serp("a.com"))
+    ingest.add_snapshot(a, serp("b.com", "a.com"))
+    ingest.add_reference(b, a)
+    assert list(ingest.snapshots) == [a]
+    assert ingest.snapshots[a][0] == ["people_also_ask"]
+    assert [row[2] for row in ingest.snapshots[a][1]] == ["b.com", "a.com"]
+
+    ingest.add_snapshot(b, serp("c.com"))
+    assert ingest.refs == {}
+    ingest.add_reference(a, b)
+    assert list(ingest.snapshots) == [b]
+    assert ingest.refs == {a: b}
+
+
+def test_daily_rows_roll_up_checks_per_day_and_url():
+    """Best, worst and the average ignore unranked checks; last follows checked_at, not arrival order"""
+    ingest = RankIngest(TODAY)
+    keyword_id = uuid.uuid4()
+    ingest.add_rank(tracking(keyword_id), 4, datetime(2026, 3, 10, 9))
+    ingest.add_rank(tracking(keyword_id), 7, datetime(2026, 3, 10, 3))
+    ingest.add_rank(tracking(keyword_id), None, datetime(2026, 3, 10, 6))
+    ingest.add_rank(tracking(keyword_id, "example.com/blog"), 9, datetime(2026, 3, 10, 3))
+    ingest.add_rank(tracking(keyword_id), 1, datetime(2026, 3, 11, 0, 30))
+
+    rows = {(row["day"], row["tracked_url"]): row for row in ingest.daily_rows()}
+
+    assert set(rows) == {
+        (date(2026, 3, 10), "example.com"), (date(2026, 3, 10), "example.com/blog"), (date(2026, 3, 11), "example.com")
+    }
+    day = rows[(date(2026, 3, 10), "example.com")]
+    assert (day["best_position"], day["worst_position"], day["last_position"]) == (4, 7, 4)
+    assert day["last_checked_at"] == datetime(2026, 3, 10, 9)
+    assert (day["position_sum"], day["ranked_checks"], day["checks"]) == (11, 2, 3)
+    assert rows[(date(2026, 3, 10), "example.com/blog")]["checks"] == 1
+    assert rows[(date(2026, 3, 11), "example.com")]["position_sum"] == 1
+
+
+def test_merge_daily_matches_the_upsert():
+    """merge_daily folds a later or earlier row the way _upsert_daily's SET clause does"""
+    stored = {
+        "best_position": 3, "worst_position": 6, "last_position": 6,
+        "last_checked_at": datetime(2026, 3, 10, 12), "position_sum": 9, "ranked_checks": 2, "checks": 3,
+    }
+    earlier = {
+        "best_position": None, "worst_position": None, "last_position": None,
+        "last_checked_at": datetime(2026, 3, 10, 1), "position_sum": 0, "ranked_checks": 0, "checks": 1,
+    }
+    later = {**earlier, "best_position": 1, "worst_position": 8, "last_position": 8,
+             "last_checked_at": datetime(2026, 3, 10, 18), "position_sum": 9, "ranked_checks": 2, "checks": 2}
+
+    assert RankIngest.merge_daily(stored, earlier) == {**stored, "checks": 4}
+    assert RankIngest.merge_daily(stored, later) == {
+        "best_position": 1, "worst_position": 8, "last_position": 8,
+        "last_checked_at": datetime(2026, 3, 10, 18), "position_sum": 18, "ranked_checks": 4, "checks": 5,
+    }
+
+    db = RecordingSession()
+    rank_ingest._upsert_daily(db, [{"keyword_id": uuid.uuid4(), "day": TODAY, "tracked_url": "example.com",
+                                    "project_id": uuid.uuid4(), **later}])
+    ((_, sql, _),) = db.statements()
+    assert "ON CONFLICT (keyword_id, day, tracked_url) DO UPDATE" in sql
+    assert "best_position = least(rank_daily.best_position, excluded.best_position)" in sql
+    assert "worst_position = greatest(rank_daily.worst_position, excluded.worst_position)" in sql
+    assert "position_sum = (rank_daily.position_sum + excluded.position_sum)" in sql
+    assert "ranked_checks = (rank_daily.ranked_checks + excluded.ranked_checks)" in sql
+    assert "last_position = CASE WHEN (excluded.last_checked_at >= rank_daily.last_checked_at)" in sql
+
+
+def test_merge_current_keeps_the_newest_check():
+    """A newer check moves the row on and keeps the old position; an older one is ignored"""
+    stored = {"rank_position": 4, "previous_position": 6, "checked_at": datetime(2026, 3, 10, 12)}
+    newer = {"rank_position": 2, "previous_position": None, "checked_at": datetime(2026, 3, 11, 3)}
+    older = {"rank_position": 9, "previous_position": None, "checked_at": datetime(2026, 3, 9, 3)}
+
+    assert RankIngest.merge_current(None, newer) == newer
+    assert RankIngest.merge_current(stored, newer) == {**newer, "previous_position": 4}
+    assert RankIngest.merge_current(stored, older) == stored
+
+
+def test_current_rows_split_repeats_into_rounds_oldest_first():
+    """Each round has one row per key, so upserting round after round chains previous_position"""
+    ingest = RankIngest(TODAY)
+    a, b = uuid.uuid4(), uuid.uuid4()
+    ingest.add_rank(tracking(a), 3, datetime(2026, 3, 10, 9))
+    ingest.add_rank(tracking(a), 5, datetime(2026, 3, 10, 3))
+    ingest.add_rank(tracking(b), None, datetime(2026, 3, 10, 6))
+    ingest.add_rank(tracking(a, "example.com/blog"), 7, datetime(2026, 3, 10, 12))
+
+    rounds = ingest.current_rows()
+
+    assert [[(row["keyword_id"], row["tracked_url"], row["rank_position"]) for row in rows] for rows in rounds] == [
+        [(a, "example.com", 5), (b, "example.com", None), (a, "example.com/blog", 7)],
+        [(a, "example.com", 3)],
+    ]
+    assert all(row["previous_position"] is None for rows in rounds for row in rows)
+    assert rounds[1][0]["rank_id"] == ingest.ranks[0]["id"]
+
+    stored = None
+    for rows in rounds:
+        for row in rows:
+            if (row["keyword_id"], row["tracked_url"]) == (a, "example.com"):
+                stored = RankIngest.merge_current(stored, row)
+    assert (stored["rank_position"], stored["previous_position"]) == (3, 5)
+
+
+def test_upsert_current_only_moves_forward():
+    """The ON CONFLICT update is guarded so an older check never replaces a newer one"""
+    ingest = RankIngest(TODAY)
+    ingest.add_rank(tracking(uuid.uuid4()), 3, datetime(2026, 3, 10, 9))
+    db = RecordingSession()
+
+    rank_ingest._upsert_current(db, ingest.current_rows()[0])
+
+    ((_, sql, _),) = db.statements()
+    assert sql.startswith("INSERT INTO current_rank")
+    assert "ON CONFLICT (project_id, keyword_id, tracked_url) DO UPDATE" in sql
+    assert "previous_position = current_rank.rank_position" in sql
+    assert "rank_position = excluded.rank_position" in sql
+    assert sql.endswith("WHERE excluded.checked_at >= current_rank.checked_at")
+
+
+def test_flush_writes_the_batch_and_resets_it():
+    ingest = RankIngest(TODAY)
+    a, b = uuid.uuid4(), uuid.uuid4()
+    ingest.add_rank(tracking(a), 2, datetime(2026, 3, 10, 3))
+    ingest.add_rank(tracking(b), None, datetime(2026, 3, 10, 3))
+    ingest.add_snapshot(a, serp("x.com", "example.com"))
+    ingest.add_reference(b, a)
+    db = RecordingSession()
+
+    counts = ingest.flush(db)
+
+    assert counts == {"ranks": 2, "frames": 1, "refs": 1}
+    assert len(ingest) == 0
+    sql = [entry[1] for entry in db.statements()]
+    assert sql[0].startswith("INSERT INTO rank_tracking")
+    assert len(db.statements()[0][2]) == 2  # one executemany for every rank row
+    assert sql[1].startswith("INSERT INTO rank_daily")
+    assert sql[2].startswith("INSERT INTO current_rank")
+    assert sql[3].startswith("DELETE FROM serp_snapshot_refs")  # a now has its own frame
+    assert sql[4].startswith("DELETE FROM serp_snapshot_frames")  # b now references a
+    assert sql[5].startswith("INSERT INTO serp_snapshot_frames")
+    assert "ON CONFLICT (keyword_id, snapshot_date) DO UPDATE" in sql[5]
+    assert sql[6].startswith("INSERT INTO serp_snapshot_refs")
+    assert len(sql) == 7
+
+
+def test_repeat_checks_in_a_batch_are_merged_before_upserting():
+    """One ON CONFLICT statement must not touch a row twice, so repeats are rolled up or split"""
+    ingest = RankIngest(TODAY)
+    keyword_id = uuid.uuid4()
+    ingest.add_rank(tracking(keyword_id), 5, datetime(2026, 3, 10, 3))
+    ingest.add_rank(tracking(keyword_id), 3, datetime(2026, 3, 10, 4))
+
+    (daily,) = ingest.daily_rows()
+    assert (daily["checks"], daily["best_position"], daily["worst_position"]) == (2, 3, 5)
+    assert [len(rows) for rows in ingest.current_rows()] == [1, 1]
+
+    db = RecordingSession()
+    ingest.flush(db)
+    current = [entry for entry in db.statements() if entry[1].startswith("INSERT INTO current_rank")]
+    assert len(current) == 2
+
+
+def test_large_snapshot_batches_use_copy_on_psycopg2(monkeypatch):
+    monkeypatch.setattr(rank_ingest.settings, "RANK_INGEST_COPY_MIN_ROWS", 2)
+    ingest = RankIngest(TODAY)
+    for _ in range(2):
+        ingest.add_snapshot(uuid.uuid4(), serp("a.com"))
+    db = RecordingSession("psycopg2")
+
+    ingest.flush(db)
+
+    (copy,) = db.statements("copy")
+    assert copy[1].startswith("COPY serp_snapshot_frames_stage (keyword_id, snapshot_date")
+    assert len(copy[2].splitlines()) == 2
+    merge = [sql for _, sql in db.statements("cursor") if sql.startswith("INSERT INTO serp_snapshot_frames")]
+    assert len(merge) == 1 and "ON CONFLICT (keyword_id, snapshot_date) DO UPDATE" in merge[0]
+    assert not any(sql.startswith("INSERT INTO serp_snapshot_frames") for _, sql, _ in db.statements())
+
+
+@pytest.mark.parametrize("driver, frames", [("psycopg", 2), ("psycopg2", 1)])
+def test_copy_falls_back_to_multi_row_upsert(monkeypatch, driver, frames):
+    """Other drivers, and batches under RANK_INGEST_COPY_MIN_ROWS, use INSERT ... ON CONFLICT"""
+    monkeypatch.setattr(rank_ingest.settings, "RANK_INGEST_COPY_MIN_ROWS", 2)
+    ingest = RankIngest(TODAY)
+    for _ in range(frames):
+        ingest.add_snapshot(uuid.uuid4(), serp("a.com"))
+    db = RecordingSession(driver)
+
+    ingest.flush(db)
+
+    assert db.statements("copy") == []
+    upserts = [sql for _, sql, _ in db.statements() if sql.startswith("INSERT INTO serp_snapshot_frames")]
+    assert len(upserts) == 1
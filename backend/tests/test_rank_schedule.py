@@ -0,0 +1,99 @@
+"""
+Unit tests for the nightly rank-check schedule.
+Run with: pytest backend/tests/test_rank_schedule.py
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+from app.services import rank_schedule
+from app.services.dataforseo import serp_signature
+
+
+def test_rank_schedule_spreads_checks_once_per_night(monkeypatch):
+    """Each SERP lands in exactly one tick per day, inside the window, in the owner's local time"""
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_START_HOUR", 2)
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_HOURS", 6.0)
+    monkeypatch.setattr(settings, "RANK_CHECK_TICK_MINUTES", 15)
+    monkeypatch.setattr(settings, "RANK_CHECK_LOCAL_TIME", True)
+    signatures = [serp_signature(f"keyword {i}", 2840, "en") for i in range(200)]
+    day = datetime(2026, 3, 10, tzinfo=timezone.utc)
+    ticks = [day + timedelta(minutes=15 * i) for i in range(96)]
+
+    def scheduled(signature, tz_name=None):
+        hits = [
+            at for tick in ticks
+            if (at := rank_schedule.next_check_at(signature, tick, tick + timedelta(minutes=15), tz_name))
+        ]
+        assert len(hits) == 1
+        return hits[0]
+
+    utc_times = [scheduled(s) for s in signatures]
+    assert all(day + timedelta(hours=2) <= at < day + timedelta(hours=8) for at in utc_times)
+    assert len({at.hour for at in utc_times}) == 6  # spread across the whole window
+    assert scheduled(signatures[0]) == utc_times[0]  # deterministic
+
+    # 02:00 in Chicago (CDT after 8 March) is 07:00 UTC
+    local = scheduled(signatures[0], "America/Chicago")
+    assert local - utc_times[0] == timedelta(hours=5)
+
+
+def test_adaptive_check_interval(monkeypatch):
+    """Volatile keywords stay nightly; stable ones back off up to the cap"""
+    monkeypatch.setattr(settings, "RANK_HISTORY_CHECKS", 5)
+    monkeypatch.setattr(settings, "RANK_VOLATILE_SPREAD", 3)
+    monkeypatch.setattr(settings, "RANK_CHECK_MAX_INTERVAL_DAYS", 7)
+    interval = rank_schedule.check_interval_days
+
+    assert interval(3, 4, 4) == 1  # not enough history yet
+    assert interval(5, 4, 9) == 1  # volatile
+    assert interval(5, 98, 101) == 1  # dropping in and out of the top 100
+    assert interval(5, 4, 5) == 2  # small moves
+    assert interval(5, 4, 4) == 7  # stable
+    assert interval(5, 101, 101) == 7  # not ranking
+    assert interval(5, 4, 4, max_interval_days=1) == 1  # project forces nightly
+    assert interval(5, 4, 4, max_interval_days=3) == 3  # project lowers the cap
+    assert interval(5, 4, 4, max_interval_days=30) == 7  # but cannot raise it
+
+    at = datetime(2026, 3, 10, 3, tzinfo=timezone.utc)
+    assert rank_schedule.is_check_due(None, 7, at)
+    assert not rank_schedule.is_check_due(datetime(2026, 3, 5, 3), 7, at)
+    # Slots drift within the window, so a check a few hours "early" still counts
+    assert rank_schedule.is_check_due(datetime(2026, 3, 3, 7), 7, at)
+
+
+def test_next_check_after_is_the_following_slot(monkeypatch):
+    """Stored slots step from one night's check time to the next"""
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_START_HOUR", 2)
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_HOURS", 6.0)
+    monkeypatch.setattr(settings, "RANK_CHECK_LOCAL_TIME", True)
+    signature = serp_signature("seo tools", 2840, "en")
+    tick = datetime(2026, 3, 10, tzinfo=timezone.utc)
+    at = next(
+        at for i in range(96)
+        if (at := rank_schedule.next_check_at(
+            signature, tick + timedelta(minutes=15 * i), tick + timedelta(minutes=15 * (i + 1))
+        ))
+    )
+
+    assert rank_schedule.next_check_after(signature, tick) == at
+    assert rank_schedule.next_check_after(signature, at) == at
+    assert rank_schedule.next_check_after(signature, at + timedelta(seconds=1)) == at + timedelta(days=1)
+    chicago = rank_schedule.next_check_after(signature, tick, "America/Chicago")
+    assert chicago - at == timedelta(hours=5)
+
+
+def test_ticks_outside_the_window_are_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_START_HOUR", 22)
+    monkeypatch.setattr(settings, "RANK_CHECK_WINDOW_HOURS", 6.0)
+    monkeypatch.setattr(settings, "RANK_CHECK_LOCAL_TIME", False)
+
+    def in_window(hour, minute=0):
+        start = datetime(2026, 3, 10, hour, minute, tzinfo=timezone.utc)
+        return rank_schedule.tick_in_window(start, start + timedelta(minutes=15))
+
+    # The window runs 22:00-04:00 UTC, across midnight
+    assert in_window(22) and in_window(0) and in_window(3, 45)
+    assert not in_window(4) and not in_window(12) and not in_window(21, 45)
+
+    monkeypatch.setattr(settings, "RANK_CHECK_LOCAL_TIME", True)
+    assert in_window(12)
@@ -0,0 +1,178 @@
+"""
+Tests for the rank tracking router's SERP and history endpoints.
+Run with: pytest backend/tests/test_rank_tracking_router.py
+"""
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every table on Base)
+from app.core.database import Base, get_db
+from app.models.keyword import Keyword
+from app.models.project import Project
+from app.models.rank_tracking import RankDaily, RankTracking, RankTrackingWeekly
+from app.models.serp_snapshot import SerpSnapshotFrame, SerpSnapshotRef, SerpSnapshotWeekly
+from app.models.user import User
+from app.routers import rank_tracking
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+PROJECT_ID = uuid.uuid4()
+
+
+def override_get_db():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+api = FastAPI()
+api.include_router(rank_tracking.router)
+api.dependency_overrides[get_db] = override_get_db
+api.dependency_overrides[rank_tracking.get_user_project] = lambda: None
+client = TestClient(api)
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    """Create tables before each test, drop after"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def rows(*domains):
+    return [[i + 1, f"https://{d}/", d, f"{d} title", None] for i, d in enumerate(domains)]
+
+
+def seed_shared_serp():
+    """Keyword A holds the SERP for two days; keyword B references it"""
+    db = TestingSessionLocal()
+    user = User(email="owner@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    db.add(Project(id=PROJECT_ID, user_id=user.id, name="Site", domain="example.com"))
+    a = Keyword(project_id=PROJECT_ID, keyword_text="seo tools")
+    b = Keyword(project_id=PROJECT_ID, keyword_text="SEO Tools")
+    db.add_all([a, b])
+    db.flush()
+    monday, tuesday = date(2026, 3, 9), date(2026, 3, 10)
+    db.add_all([
+        RankTracking(
+            keyword_id=a.id, project_id=PROJECT_ID, tracked_url="example.com",
+            rank_position=2, location_code=2840, language_code="en", checked_at=datetime(2026, 3, 10, 3)
+        ),
+        SerpSnapshotFrame(
+            keyword_id=a.id, snapshot_date=monday, is_keyframe=True, base_date=monday,
+            serp_features=["people_also_ask"], data={"items": rows("a.com", "example.com", "c.com")}
+        ),
+        SerpSnapshotFrame(
+            keyword_id=a.id, snapshot_date=tuesday, is_keyframe=False, base_date=monday,
+            serp_features=["people_also_ask"], data={"moved": [[1, 2], [2, 1]], "entered": [], "left": []}
+        ),
+        SerpSnapshotRef(keyword_id=b.id, source_keyword_id=a.id, snapshot_date=monday),
+        SerpSnapshotRef(keyword_id=b.id, source_keyword_id=a.id, snapshot_date=tuesday),
+    ])
+    db.commit()
+    ids = a.id, b.id
+    db.close()
+    return ids
+
+
+def test_latest_serp_follows_shared_snapshot():
+    """GET …/serp decodes the delta the keyword references"""
+    _, b = seed_shared_serp()
+    response = client.get(f"/api/projects/{PROJECT_ID}/rank-tracking/{b}/serp")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["snapshot_date"] == "2026-03-10"
+    assert [r["domain"] for r in body["results"]] == ["example.com", "a.com", "c.com"]
+
+
+def test_latest_serp_unknown_keyword_is_404():
+    response = client.get(f"/api/projects/{PROJECT_ID}/rank-tracking/{uuid.uuid4()}/serp")
+    assert response.status_code == 404
+
+
+def test_stop_tracking_hands_shared_serps_to_referencing_keyword():
+    """Untracking the keyword that holds a shared SERP keeps it for the others"""
+    a, b = seed_shared_serp()
+    response = client.delete(f"/api/projects/{PROJECT_ID}/rank-tracking/{a}")
+    assert response.status_code == 204
+
+    db = TestingSessionLocal()
+    assert db.query(SerpSnapshotFrame).filter(SerpSnapshotFrame.keyword_id == a).count() == 0
+    assert db.query(SerpSnapshotRef).count() == 0
+    db.close()
+
+    body = client.get(f"/api/projects/{PROJECT_ID}/rank-tracking/{b}/serp").json()
+    assert body["snapshot_date"] == "2026-03-10"
+    assert [r["domain"] for r in body["results"]] == ["example.com", "a.com", "c.com"]
+    assert body["results"][0]["title"] == "example.com title"
+
+
+def test_stop_tracking_clears_weekly_archives_no_one_references():
+    """Weekly rank rows go; a weekly SERP whose week another keyword references is handed over"""
+    a, b = seed_shared_serp()
+    db = TestingSessionLocal()
+    db.add_all([
+        RankTrackingWeekly(keyword_id=a, project_id=PROJECT_ID, tracked_url="example.com",
+                           week_start=date(2026, 2, 2), best_position=2, worst_position=3,
+                           position_sum=5, ranked_checks=2, checks=2),
+        SerpSnapshotWeekly(keyword_id=a, week_start=date(2026, 3, 9), snapshot_date=date(2026, 3, 9),
+                           items=rows("a.com")),
+        SerpSnapshotWeekly(keyword_id=a, week_start=date(2026, 2, 2), snapshot_date=date(2026, 2, 2),
+                           items=rows("b.com")),
+    ])
+    db.commit()
+    db.close()
+
+    assert client.delete(f"/api/projects/{PROJECT_ID}/rank-tracking/{a}").status_code == 204
+
+    db = TestingSessionLocal()
+    assert db.query(RankTrackingWeekly).count() == 0
+    assert db.query(SerpSnapshotWeekly.keyword_id, SerpSnapshotWeekly.week_start).all() == [(b, date(2026, 3, 9))]
+    db.close()
+
+
+def daily(keyword_id, day, tracked_url, positions, project_id=PROJECT_ID):
+    ranked = [p for p in positions if p is not None]
+    return RankDaily(
+        keyword_id=keyword_id, day=day, tracked_url=tracked_url, project_id=project_id,
+        best_position=min(ranked, default=None), worst_position=max(ranked, default=None),
+        last_position=positions[-1], last_checked_at=datetime.combine(day, datetime.min.time()),
+        position_sum=sum(ranked), ranked_checks=len(ranked), checks=len(positions)
+    )
+
+
+def test_rank_history_is_the_daily_average_position():
+    """One entry per day: the average over every ranked check of the project's tracked URLs"""
+    a, _ = seed_shared_serp()
+    today = datetime.utcnow().date()
+    db = TestingSessionLocal()
+    db.add_all([
+        daily(a, today - timedelta(days=2), "example.com", [2, 3]),
+        daily(a, today - timedelta(days=2), "example.com/blog", [8, None]),
+        daily(a, today - timedelta(days=1), "example.com", [None]),
+        daily(a, today, "example.com", [6], project_id=uuid.uuid4()),
+        daily(a, today - timedelta(days=40), "example.com", [1]),
+    ])
+    db.commit()
+    db.close()
+
+    body = client.get(f"/api/projects/{PROJECT_ID}/rank-tracking/{a}/history?days=30").json()
+
+    assert body["history"] == [
+        {"date": str(today - timedelta(days=2)), "position": 4},
+        {"date": str(today - timedelta(days=1)), "position": None},
+    ]
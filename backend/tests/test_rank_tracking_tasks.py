@@ -0,0 +1,399 @@
+"""
+Tests for the rank-check Celery tasks, run synchronously against SQLite.
+DataForSEO is a mock transport and RankIngest is replaced by a recorder,
+so the tests cover batching and ID mapping rather than the PostgreSQL writes.
+Run with: pytest backend/tests/test_rank_tracking_tasks.py
+"""
+import json
+import uuid
+from datetime import date, datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (registers every table on Base)
+from app.core.database import Base
+from app.models.api_credential import ApiCredential
+from app.models.keyword import Keyword
+from app.models.project import Project
+from app.models.rank_tracking import CurrentRank, RankDaily, RankTracking
+from app.models.user import User
+from app.services.dataforseo import DataForSEOService
+from app.tasks import rank_tracking
+
+engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@event.listens_for(engine, "connect")
+def add_postgres_functions(connection, record):
+    """least/greatest as PostgreSQL defines them (NULLs ignored)"""
+    def pick(choose):
+        return lambda *values: choose((v for v in values if v is not None), default=None)
+    connection.create_function("least", -1, pick(min))
+    connection.create_function("greatest", -1, pick(max))
+
+
+class RecordingIngest:
+    """Stands in for RankIngest; keeps what each flush would have written"""
+
+    flushed = []
+
+    def __init__(self):
+        self.ranks, self.snapshots, self.refs = [], [], []
+
+    def add_rank(self, tracking, rank_position, checked_at=None):
+        self.ranks.append((str(tracking.keyword_id), rank_position))
+
+    def add_snapshot(self, keyword_id, serp_results):
+        self.snapshots.append(str(keyword_id))
+
+    def add_reference(self, keyword_id, source_keyword_id):
+        self.refs.append((str(keyword_id), str(source_keyword_id)))
+
+    def flush(self, db):
+        RecordingIngest.flushed.append(self)
+
+
+def organic(position, domain):
+    return {"type": "organic", "rank_absolute": position, "url": f"https://{domain}/page", "domain": domain}
+
+
+def serp_task(tag, keyword, status_code=20000):
+    """A SERP where example.com ranks at a position derived from the keyword"""
+    return {
+        "id": f"task-{tag}",
+        "status_code": status_code,
+        "data": {"tag": tag, "keyword": keyword},
+        "result": [{"items": [organic(1, "other.com"), organic(len(keyword.strip()), "example.com")]}],
+    }
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """Database, provider calls and ingest recorder shared by the task tests"""
+    Base.metadata.create_all(bind=engine)
+    RecordingIngest.flushed = []
+    provider = {"posts": [], "fail": set()}
+
+    def handler(request):
+        if "handler" in provider:
+            return provider["handler"](request)
+        tasks = json.loads(request.content) if request.method == "POST" else []
+        provider["posts"].append((request.url.path, tasks))
+        return httpx.Response(200, json={"tasks": [
+            serp_task(task["tag"], task["keyword"], 40501 if task["keyword"] in provider["fail"] else 20000)
+            for task in tasks
+        ]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service = DataForSEOService("login", "password", client=client)
+    monkeypatch.setattr(rank_tracking, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(rank_tracking, "RankIngest", RecordingIngest)
+    monkeypatch.setattr(rank_tracking, "get_dataforseo_service", lambda db, user_id: service)
+    yield provider
+    Base.metadata.drop_all(bind=engine)
+
+
+def seed(keywords, user_email="owner@example.com", timezone=None, current=True):
+    """
+    A project tracking example.com for each keyword text.
+    With current=False the checks are only in rank_tracking, as before the
+    current_rank backfill.
+    Returns (user_id, project_id, keyword_ids) as UUIDs: SQLite only binds
+    UUID objects, where PostgreSQL also takes the strings Celery delivers.
+    """
+    db = TestingSessionLocal()
+    user = User(email=user_email, password_hash="x", timezone=timezone)
+    db.add(user)
+    db.flush()
+    db.add(ApiCredential(user_id=user.id, provider="dataforseo", credentials_encrypted="x"))
+    project = Project(user_id=user.id, name="Site", domain="example.com")
+    db.add(project)
+    db.flush()
+    keyword_ids = []
+    for text in keywords:
+        keyword = Keyword(project_id=project.id, keyword_text=text)
+        db.add(keyword)
+        db.flush()
+        tracking = dict(
+            keyword_id=keyword.id, project_id=project.id, tracked_url="example.com",
+            rank_position=5, location_code=2840, language_code="en", checked_at=datetime(2026, 3, 1, 3)
+        )
+        db.add(RankTracking(**tracking))
+        if current:
+            db.add(CurrentRank(rank_id=uuid.uuid4(), **tracking))
+        keyword_ids.append(keyword.id)
+    db.commit()
+    ids = user.id, project.id, keyword_ids
+    db.close()
+    return ids
+
+
+def test_batch_check_fetches_each_serp_once_and_maps_ranks_back(env):
+    """Keywords sharing a SERP are fetched once; every keyword gets its own rank"""
+    user_id, _, (seo, seo_dup, tracker) = seed(["seo tools", " SEO Tools", "rank tracker"])
+    unknown = uuid.uuid4()
+
+    result = rank_tracking.check_keyword_ranks_batch([seo, seo_dup, tracker, unknown], user_id)
+    seo, seo_dup, tracker = str(seo), str(seo_dup), str(tracker)
+
+    assert result["success"] is True
+    posted = [task for _, tasks in env["posts"] for task in tasks]
+    assert sorted(task["keyword"].strip().lower() for task in posted) == ["rank tracker", "seo tools"]
+    # Result tags come back as the representative keyword's id
+    (representative,) = {task["tag"] for task in posted} - {tracker}
+    (other,) = {seo, seo_dup} - {representative}
+    assert result["rank_positions"] == {seo: 9, seo_dup: 9, tracker: 12}
+    assert (result["checked"], result["keywords_updated"], result["failed"]) == (3, 3, 1)
+
+    (ingest,) = RecordingIngest.flushed
+    assert sorted(ingest.ranks) == sorted([(seo, 9), (seo_dup, 9), (tracker, 12)])
+    assert sorted(ingest.snapshots) == sorted([representative, tracker])
+    assert ingest.refs == [(other, representative)]
+
+
+def test_batch_check_reports_failed_tasks_by_keyword(env):
+    """A failed SERP task is reported for its keyword and nothing is stored for it"""
+    user_id, _, (seo, tracker) = seed(["seo tools", "rank tracker"])
+    env["fail"].add("rank tracker")
+
+    result = rank_tracking.check_keyword_ranks_batch([seo, tracker], user_id)
+
+    assert result["rank_positions"] == {str(seo): 9}
+    assert [error["keyword_id"] for error in result["errors"]] == [str(tracker)]
+    assert RecordingIngest.flushed[0].ranks == [(str(seo), 9)]
+
+
+def test_batch_check_reads_keywords_missing_from_current_rank(env):
+    """Keywords not backfilled into current_rank are checked from their raw rank_tracking rows"""
+    user_id, _, (backlog,) = seed(["rank tracker"], current=False)
+    _, _, (current,) = seed(["seo tools"], "second@example.com")
+
+    result = rank_tracking.check_keyword_ranks_batch([backlog, current], user_id)
+
+    assert result["rank_positions"] == {str(backlog): 12, str(current): 9}
+    assert sorted(RecordingIngest.flushed[0].ranks) == sorted([(str(backlog), 12), (str(current), 9)])
+
+
+def test_project_check_splits_keywords_into_batches(env, monkeypatch):
+    user_id, project_id, keyword_ids = seed([f"keyword {i}" for i in range(5)])
+    queued = []
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        rank_tracking.check_keyword_ranks_batch, "apply_async",
+        lambda args, queue: queued.append((args, queue)) or type("Result", (), {"id": "task"})()
+    )
+
+    result = rank_tracking.check_project_ranks(project_id, user_id)
+
+    assert result["total_keywords"] == 5
+    assert [len(args[0]) for args, _ in queued] == [2, 2, 1]
+    assert sorted(k for args, _ in queued for k in args[0]) == sorted(map(str, keyword_ids))
+    assert {queue for _, queue in queued} == {"interactive"}
+
+
+class RecordingGroup:
+    """Stands in for celery.group; keeps each published group's task signatures"""
+
+    published = []
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+
+    def apply_async(self):
+        RecordingGroup.published.append(self.tasks)
+
+
+def test_sweep_streams_one_check_per_unique_serp_in_groups(env, monkeypatch):
+    """Checks are deduplicated across users, batched per user and published in groups"""
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_MODE", "standard")
+    monkeypatch.setattr(rank_tracking.settings, "RANK_POST_BATCH_SIZE", 2)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_ENQUEUE_GROUP_SIZE", 2)
+    first_user, _, _ = seed(["seo tools", "rank tracker", "serp api"], "first@example.com")
+    second_user, _, _ = seed(["SEO tools", "backlink checker", "keyword planner"], "second@example.com")
+
+    result = rank_tracking.daily_rank_check_job()
+
+    assert result == {
+        "success": True, "mode": "standard",
+        "total_keywords": 6, "unique_serps": 5, "tasks_queued": 3,
+    }
+    assert [len(tasks) for tasks in RecordingGroup.published] == [2, 1]
+    tasks = [task for published in RecordingGroup.published for task in published]
+    assert {task.task for task in tasks} == {"app.tasks.rank_tracking.post_rank_check_tasks"}
+    batches = sorted((str(task.args[1]), len(task.args[0])) for task in tasks)
+    # "SEO tools" shares a SERP with "seo tools", so whichever user comes second has two checks left
+    assert sorted(size for _, size in batches) == [1, 2, 2]
+    assert {user for user, _ in batches} == {str(first_user), str(second_user)}
+
+
+def test_sweep_reads_keywords_missing_from_current_rank(env, monkeypatch):
+    """Keywords whose checks are only in rank_tracking are swept once, like the rest"""
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_MODE", "standard")
+    seed(["seo tools", "rank tracker"])
+    seed(["serp api", "backlink checker"], "second@example.com", current=False)
+
+    result = rank_tracking.daily_rank_check_job()
+
+    assert (result["total_keywords"], result["unique_serps"]) == (4, 4)
+    keywords = [keyword_id for tasks in RecordingGroup.published for task in tasks for keyword_id in task.args[0]]
+    assert len(keywords) == len(set(keywords)) == 4
+
+
+def test_sweep_skips_users_without_credentials(env, monkeypatch):
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    seed(["seo tools"])
+    db = TestingSessionLocal()
+    db.query(ApiCredential).update({ApiCredential.is_active: False})
+    db.commit()
+    db.close()
+
+    result = rank_tracking.daily_rank_check_job()
+
+    assert (result["total_keywords"], result["tasks_queued"]) == (0, 0)
+    assert RecordingGroup.published == []
+
+
+def test_standard_queue_round_trip_through_tasks(env):
+    """Posted checks come back through tasks_ready and are fanned out by tag"""
+    user_id, _, (seo, seo_dup) = seed(["seo tools", "Seo Tools"])
+    queue = {}
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/task_post"):
+            posted = []
+            for task in json.loads(request.content):
+                queue[f"task-{len(queue)}"] = task
+                posted.append({"id": f"task-{len(queue) - 1}", "status_code": 20100, "data": {"tag": task["tag"]}})
+            return httpx.Response(200, json={"tasks": posted})
+        if path.endswith("/tasks_ready"):
+            return httpx.Response(200, json={"tasks": [{"status_code": 20000, "result": [
+                {"id": task_id, "tag": task["tag"]} for task_id, task in queue.items()
+            ]}]})
+        task = queue.pop(path.rsplit("/", 1)[-1])
+        return httpx.Response(200, json={"tasks": [serp_task(task["tag"], task["keyword"])]})
+
+    env["handler"] = handler
+
+    posted = rank_tracking.post_rank_check_tasks([seo], user_id)
+    assert posted == {"success": True, "posted": 1, "failed": 0}
+    assert [task["tag"] for task in queue.values()] == [f"rank:{seo}"]
+
+    polled = rank_tracking.poll_serp_tasks_ready()
+
+    assert polled == {"success": True, "accounts": 1, "ingested": 1, "keywords_updated": 2, "failed": 0}
+    assert queue == {}
+    (ingest,) = RecordingIngest.flushed
+    assert sorted(ingest.ranks) == sorted([(str(seo), 9), (str(seo_dup), 9)])
+    assert ingest.refs == [(str(seo_dup), str(seo))]
+
+
+def test_schedule_tick_reads_only_keywords_whose_slot_has_come(env, monkeypatch):
+    """A tick reads unscheduled or due keywords and moves each on to its next nightly slot"""
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_LOCAL_TIME", False)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_ADAPTIVE", False)
+    _, _, (seo, tracker, later) = seed(["seo tools", "rank tracker", "serp api"])
+    db = TestingSessionLocal()
+    db.query(Keyword).filter(Keyword.id == later).update({Keyword.next_rank_check_at: datetime(2026, 3, 11, 3)})
+    db.commit()
+    db.close()
+    tick = "2026-03-10T03:00:00+00:00"
+
+    result = rank_tracking.schedule_rank_checks(tick)
+
+    assert result["success"] is True
+    assert result["total_keywords"] == 2
+    db = TestingSessionLocal()
+    scheduled = dict(db.query(Keyword.id, Keyword.next_rank_check_at))
+    db.close()
+    assert scheduled[later] == datetime(2026, 3, 11, 3)
+    for keyword_id in (seo, tracker):
+        assert datetime(2026, 3, 10, 3, 15) <= scheduled[keyword_id] < datetime(2026, 3, 11, 8)
+
+    # The same tick again has nothing left to read
+    assert rank_tracking.schedule_rank_checks(tick)["total_keywords"] == 0
+
+
+def test_schedule_tick_checks_slots_missed_by_earlier_ticks(env, monkeypatch):
+    """A stored slot before the tick is enqueued now, not just moved on to tomorrow"""
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_LOCAL_TIME", False)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_ADAPTIVE", False)
+    _, _, (missed, _) = seed(["seo tools", "rank tracker"])
+    db = TestingSessionLocal()
+    db.query(Keyword).filter(Keyword.id == missed).update({Keyword.next_rank_check_at: datetime(2026, 3, 10, 2, 20)})
+    db.commit()
+    db.close()
+    # Neither keyword's slot falls in this tick
+    tick = "2026-03-10T03:00:00+00:00"
+
+    result = rank_tracking.schedule_rank_checks(tick)
+
+    assert (result["total_keywords"], result["tasks_queued"]) == (2, 1)
+    ((task,),) = RecordingGroup.published
+    assert task.args[0] == [str(missed)]
+    assert "countdown" not in task.options
+    db = TestingSessionLocal()
+    scheduled = dict(db.query(Keyword.id, Keyword.next_rank_check_at))
+    db.close()
+    assert all(at > datetime(2026, 3, 10, 3, 15) for at in scheduled.values())
+
+
+def test_schedule_tick_outside_the_window_skips_the_database(env, monkeypatch):
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_LOCAL_TIME", False)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_WINDOW_START_HOUR", 2)
+    monkeypatch.setattr(rank_tracking, "SessionLocal", None)
+
+    result = rank_tracking.schedule_rank_checks("2026-03-10T12:00:00+00:00")
+
+    assert result["success"] is True
+    assert result["total_keywords"] == 0
+
+
+def test_adaptive_tick_judges_volatility_from_daily_rollups(env, monkeypatch):
+    """Stable keywords back off, volatile or new ones are checked; only due keywords are read"""
+    RecordingGroup.published = []
+    monkeypatch.setattr(rank_tracking, "group", RecordingGroup)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_LOCAL_TIME", False)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_ADAPTIVE", True)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_HISTORY_CHECKS", 5)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_VOLATILE_SPREAD", 3)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_MAX_INTERVAL_DAYS", 7)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_WINDOW_HOURS", 24.0)
+    monkeypatch.setattr(rank_tracking.settings, "RANK_CHECK_TICK_MINUTES", 24 * 60)
+    _, project_id, (stable, volatile, new, not_due) = seed(["stable", "volatile", "new", "not due"])
+
+    db = TestingSessionLocal()
+    yesterday = date(2026, 3, 9)
+    history = {stable: [4, 4, 4, 4, 4], volatile: [4, 4, 4, 4, None], not_due: [9, 2, 9, 2, 9]}
+    for keyword_id, positions in history.items():
+        for ago, position in enumerate(positions):
+            db.add(RankDaily(
+                keyword_id=keyword_id, project_id=project_id, tracked_url="example.com",
+                day=yesterday - timedelta(days=ago), best_position=position, worst_position=position,
+                last_position=position, last_checked_at=datetime(2026, 3, 9, 3) - timedelta(days=ago)
+            ))
+    db.query(CurrentRank).update({CurrentRank.checked_at: datetime(2026, 3, 9, 3)})
+    db.query(Keyword).filter(Keyword.id == not_due).update({Keyword.next_rank_check_at: datetime(2026, 3, 12)})
+    db.commit()
+    db.close()
+
+    # One tick covering the whole day's window
+    result = rank_tracking.schedule_rank_checks("2026-03-10T02:00:00+00:00")
+
+    assert (result["total_keywords"], result["checks_avoided"]) == (3, 1)
+    queued = {keyword_id for tasks in RecordingGroup.published for task in tasks for keyword_id in task.args[0]}
+    assert queued == {str(volatile), str(new)}
@@ -0,0 +1,36 @@
+"""
+Unit tests for SERP snapshot keyframe/delta encoding.
+Run with: pytest backend/tests/test_serp_delta.py
+"""
+from datetime import date
+
+from app.core.config import settings
+from app.services import serp_delta
+from app.services.provider_types import SerpItem
+
+
+def test_serp_delta_round_trip(monkeypatch):
+    """Deltas decode back to the day's SERP; big changes fall back to a keyframe"""
+    monkeypatch.setattr(settings, "SERP_KEYFRAME_INTERVAL_DAYS", 7)
+    monkeypatch.setattr(settings, "SERP_DELTA_MAX_RATIO", 0.5)
+
+    def serp(urls, title="t"):
+        return serp_delta.pack_results(
+            SerpItem(i + 1, f"https://{u}.com/", f"{u}.com", title, None) for i, u in enumerate(urls)
+        )
+
+    monday = serp(["a", "b", "c", "d", "e", "f"])
+    tuesday = serp(["b", "a", "c", "x", "e", "f"])  # a/b swap, d replaced by x
+    tuesday[4][3] = "new title"  # e changed its title
+
+    delta = serp_delta.encode_delta(monday, tuesday)
+    assert delta["moved"] == [[2, 1], [1, 2]]
+    assert [row[1] for row in delta["entered"]] == ["https://x.com/", "https://e.com/"]
+    assert sorted(delta["left"]) == [4, 5]
+    assert serp_delta.apply_delta(monday, delta) == tuesday
+
+    keyframe = (date(2026, 3, 9), monday)
+    assert serp_delta.encode_frame(tuesday, date(2026, 3, 10), keyframe) == (False, date(2026, 3, 9), delta)
+    # Keyframe too old, or most of the SERP replaced
+    assert serp_delta.encode_frame(tuesday, date(2026, 3, 16), keyframe)[0]
+    assert serp_delta.encode_frame(serp(["p", "q", "r", "s", "e", "f"]), date(2026, 3, 10), keyframe)[0]